@@ -0,0 +1,157 @@
+# Vectorized Grid World for the Security Bot
+# Thousands of Kenobis training side by side - one NumPy call steps them all!
+import numpy as np
+
+from grid_env import (
+    GRID_SIZE,
+    ACTION_DELTAS,
+    check_grid_size,
+    REWARD_FOOD,
+    REWARD_STEP,
+    REWARD_WALL,
+    REWARD_CLOSER,
+    REWARD_FARTHER,
+)
+
+# Row/column change for each action, ready for fancy indexing
+ACTION_ROWS = np.array([d[0] for d in ACTION_DELTAS], dtype=np.int64)
+ACTION_COLS = np.array([d[1] for d in ACTION_DELTAS], dtype=np.int64)
+
+
+class BatchGridWorld:
+    """
+    N independent grid worlds stepped together with array operations.
+
+    Same rules as GridWorldEnv (walls end the episode, food respawns, distance
+    shaping). Episodes that hit a wall - or run out of steps when max_steps is
+    set - reset automatically inside step().
+    """
+
+    def __init__(self, num_envs, max_steps=None, seed=None, grid_size=GRID_SIZE):
+        """
+        Args:
+            num_envs: How many grids to run in parallel
+            max_steps: Optional step limit per episode (None = only walls end episodes)
+            seed: Seed for the shared random generator
+            grid_size: Side of every (square) grid; Kenobi starts in the center
+        """
+        if num_envs < 1:
+            raise ValueError(f"num_envs must be at least 1, got {num_envs}")
+        grid_size = check_grid_size(grid_size)
+        self.num_envs = num_envs
+        self.max_steps = max_steps
+        self.rng = np.random.default_rng(seed)
+        self.grid_size = grid_size
+        self.start_row = self.start_col = grid_size // 2
+
+        self.robot_row = np.full(num_envs, self.start_row, dtype=np.int64)
+        self.robot_col = np.full(num_envs, self.start_col, dtype=np.int64)
+        self.food_row = np.zeros(num_envs, dtype=np.int64)
+        self.food_col = np.zeros(num_envs, dtype=np.int64)
+        self.score = np.zeros(num_envs, dtype=np.int64)
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+        self.episode_count = np.ones(num_envs, dtype=np.int64)
+
+        # Filled in by every step() for the episodes that just finished
+        self.episode_ended = np.zeros(num_envs, dtype=bool)  # wall hit or step limit
+        self.truncated = np.zeros(num_envs, dtype=bool)      # step limit only
+        self.final_scores = np.zeros(num_envs, dtype=np.int64)
+        self.final_states = np.zeros((num_envs, 4), dtype=np.int64)
+
+        self.spawn_food(np.ones(num_envs, dtype=bool))
+
+    def spawn_food(self, mask):
+        """Spawn food (not on the robot) for every grid selected by mask - no retry loop."""
+        idx = np.flatnonzero(mask)
+        if idx.size == 0:
+            return
+        # Pick one of the size*size - 1 free cells, then skip over the robot's cell
+        size = self.grid_size
+        cells = self.rng.integers(0, size * size - 1, size=idx.size)
+        robot_cells = self.robot_row[idx] * size + self.robot_col[idx]
+        cells += cells >= robot_cells
+        self.food_row[idx] = cells // size
+        self.food_col[idx] = cells % size
+
+    def reset(self, mask=None):
+        """Reset the grids selected by mask (all of them by default) and return the states."""
+        if mask is None:
+            mask = np.ones(self.num_envs, dtype=bool)
+        self.robot_row[mask] = self.start_row
+        self.robot_col[mask] = self.start_col
+        self.score[mask] = 0
+        self.steps[mask] = 0
+        self.episode_count[mask] += 1
+        self.spawn_food(mask)
+        return self.get_state()
+
+    def step(self, actions):
+        """
+        Step every grid at once. Takes an int array of actions (0-3), one per grid.
+        Returns (states, rewards, dones) where states already reflect any auto-resets.
+        """
+        actions = np.asarray(actions)
+        robot_row = self.robot_row
+        robot_col = self.robot_col
+        food_row = self.food_row
+        food_col = self.food_col
+
+        new_row = robot_row + ACTION_ROWS[actions]
+        new_col = robot_col + ACTION_COLS[actions]
+
+        # Wall check for every grid (check_wall_collision)
+        size = self.grid_size
+        wall = (new_row < 0) | (new_row >= size) | (new_col < 0) | (new_col >= size)
+
+        # Distance shaping (calculate_distance_reward)
+        old_dist = np.abs(robot_row - food_row) + np.abs(robot_col - food_col)
+        new_dist = np.abs(new_row - food_row) + np.abs(new_col - food_col)
+        rewards = np.where(new_dist < old_dist, REWARD_CLOSER,
+                           np.where(new_dist > old_dist, REWARD_FARTHER, 0.0)) + REWARD_STEP
+
+        ate = (new_dist == 0) & ~wall
+        rewards[ate] = REWARD_FOOD
+        rewards[wall] = REWARD_WALL
+
+        # Only grids that didn't hit a wall actually move
+        np.copyto(robot_row, new_row, where=~wall)
+        np.copyto(robot_col, new_col, where=~wall)
+        self.score += ate
+        self.spawn_food(ate)
+
+        self.steps += 1
+        if self.max_steps is not None:
+            np.greater_equal(self.steps, self.max_steps, out=self.truncated)
+            self.truncated &= ~wall
+        ended = wall | self.truncated
+        self.episode_ended = ended
+
+        if ended.any():
+            self.final_scores[ended] = self.score[ended]
+            self.final_states[ended] = self.get_state()[ended]
+            self.reset(ended)
+
+        return self.get_state(), rewards, wall
+
+    def get_state(self):
+        """Return an (N, 4) array of (robot_row, robot_col, food_row, food_col)."""
+        return np.stack((self.robot_row, self.robot_col, self.food_row, self.food_col), axis=1)
+
+    def get_relative_state(self):
+        """Return an (N, 2) array of (delta_row, delta_col) from robot to food."""
+        return np.stack((self.food_row - self.robot_row, self.food_col - self.robot_col), axis=1)
+
+    def get_simple_state(self):
+        """Return an (N, 2) array of directions to food, each -1/0/1."""
+        return np.sign(self.get_relative_state())
+
+    def get_optimal_actions(self):
+        """Kenobi's cheat sheet for every grid: vertical moves first, then horizontal."""
+        simple = self.get_simple_state()
+        dir_row = simple[:, 0]
+        dir_col = simple[:, 1]
+        return np.select(
+            [dir_row == -1, dir_row == 1, dir_col == -1, dir_col == 1],
+            [0, 1, 2, 3],
+            default=0,
+        )
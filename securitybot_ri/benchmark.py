@@ -0,0 +1,361 @@
+# Benchmarks for the Security Bot
+# How fast is Kenobi, really? Times the hot paths and catches slowdowns!
+"""
+Usage:
+    python benchmark.py                           # run everything, write benchmark_results.json
+    python benchmark.py --quick                   # smaller workloads for a fast check
+    python benchmark.py --save-baseline           # also store the results as the baseline
+    python benchmark.py --baseline old.json       # compare against another baseline file
+
+Every metric records its value, its unit and whether higher is better.
+When a baseline exists, metrics that got worse by more than --tolerance
+(default 20%) are flagged and the script exits with status 1.
+Baselines are machine specific, so keep one per machine.
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from batch_env import BatchGridWorld
+from grid_env import GridWorldEnv
+from q_agent import QLearningAgent
+from state_encoding import make_encoding, STATE_GETTERS as STATE_VIEWS
+
+DEFAULT_OUTPUT = "benchmark_results.json"
+DEFAULT_BASELINE = "benchmark_baseline.json"
+SPARSE_REWARDS = {"closer": 0.0, "farther": 0.0}  # food and walls only - no hints on the way
+
+
+def _best_of(repeats, func):
+    """Run func() a few times and keep the fastest wall time."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+class Results:
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit, higher_is_better=True):
+        self.metrics[name] = {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+        shown = f"{value:,.1f}" if abs(value) >= 100 else f"{value:.4g}"  # small timings keep their digits
+        print(f"  {name:45s} {shown:>16} {unit}")
+
+
+def bench_env(results, steps, repeats):
+    actions = [random.randrange(4) for _ in range(steps)]
+
+    def run_headless():
+        env = GridWorldEnv(seed=0)
+        step, reset = env.step, env.reset
+        for action in actions:
+            if step(action)[2]:
+                reset()
+
+    results.add("env.step.headless", steps / _best_of(repeats, run_headless), "steps/s")
+
+    batch = BatchGridWorld(4096, max_steps=30, seed=0)
+    batch_actions = np.random.default_rng(0).integers(0, 4, size=(max(1, steps // 4096), 4096))
+
+    def run_batch():
+        for row in batch_actions:
+            batch.step(row)
+
+    results.add("env.step.batch4096", batch_actions.size / _best_of(repeats, run_batch), "steps/s")
+    _bench_rendered_env(results, min(steps, 2000), repeats)
+
+
+def _bench_rendered_env(results, steps, repeats):
+    """Steps with the real Tk renderer attached - only when a display is available."""
+    try:
+        import tkinter as tk
+        from renderer import GridRenderer
+        window = tk.Tk()
+    except Exception as exc:  # no tkinter or no display
+        print(f"  {'env.step.rendered':45s} skipped ({exc.__class__.__name__})")
+        return
+    try:
+        canvas = tk.Canvas(window, width=400, height=420)
+        canvas.pack()
+        renderer = GridRenderer(canvas)
+        env = GridWorldEnv(seed=0)
+        env.add_observer(lambda env, event: renderer.render(env))
+        actions = [random.randrange(4) for _ in range(steps)]
+
+        def run():
+            for action in actions:
+                if env.step(action)[2]:
+                    env.reset()
+                window.update_idletasks()
+
+        results.add("env.step.rendered", steps / _best_of(repeats, run), "steps/s")
+    finally:
+        window.destroy()
+
+
+def _transitions(kind, count):
+    """Random but valid transitions for a state view."""
+    env = GridWorldEnv(seed=1)
+    get_state = getattr(env, STATE_VIEWS[kind])
+    rng = random.Random(1)
+    data = []
+    state = get_state()
+    for _ in range(count):
+        action = rng.randrange(4)
+        _, reward, done = env.step(action)
+        next_state = get_state()
+        data.append((state, action, reward, next_state, done))
+        if done:
+            env.reset()
+            next_state = get_state()
+        state = next_state
+    return data
+
+
+def bench_agent(results, updates, repeats):
+    for kind in STATE_VIEWS:
+        transitions = _transitions(kind, updates)
+        states = [t[0] for t in transitions]
+        for backend, encoding in (("dict", None), ("dense", make_encoding(kind))):
+            agent = QLearningAgent(learning_rate=0.5, discount=0.9, encoding=encoding, seed=0)
+            learn = agent.learn
+
+            def run_learn():
+                for state, action, reward, next_state, done in transitions:
+                    learn(state, action, reward, next_state, done)
+
+            results.add(f"agent.learn.{backend}.{kind}", updates / _best_of(repeats, run_learn), "updates/s")
+
+            for regime, epsilon in (("exploit", 0.0), ("explore", 1.0)):
+                agent.epsilon = epsilon
+                choose = agent.choose_action
+
+                def run_choose():
+                    for state in states:
+                        choose(state)
+
+                results.add(f"agent.choose_action.{backend}.{kind}.{regime}",
+                            updates / _best_of(repeats, run_choose), "decisions/s")
+
+        # batched API on the dense table
+        agent = QLearningAgent(learning_rate=0.5, discount=0.9, encoding=make_encoding(kind), seed=0)
+        arrays = [np.array(column) for column in zip(*transitions)]
+        results.add(f"agent.learn_batch.dense.{kind}",
+                    updates / _best_of(repeats, lambda: agent.learn_batch(*arrays)), "updates/s")
+        results.add(f"agent.choose_actions.dense.{kind}",
+                    updates / _best_of(repeats, lambda: agent.choose_actions(arrays[0])), "decisions/s")
+
+
+def bench_train(results, episodes, repeats):
+    import train  # headless import - no window is opened
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()), tempfile.TemporaryDirectory() as tmp:
+            train.train(episodes=episodes, visualize=False, filename=os.path.join(tmp, "q.qtb"))
+
+    results.add("train.headless", episodes / _best_of(repeats, run), "episodes/s")
+
+    from telemetry import Telemetry
+
+    def run_instrumented():
+        with contextlib.redirect_stdout(io.StringIO()), tempfile.TemporaryDirectory() as tmp:
+            train.train(episodes=episodes, visualize=False, filename=os.path.join(tmp, "q.qtb"),
+                        telemetry=Telemetry(os.path.join(tmp, "telemetry.jsonl")))
+
+    results.add("train.headless.telemetry", episodes / _best_of(repeats, run_instrumented), "episodes/s")
+
+
+def _episodes_to_converge(solution, kind, planning_steps, planning, seed, max_episodes, check_every, tol,
+                          trace_lambda=0.0, rewards=None, exploration_bonus=0.0):
+    """Episodes until the greedy policy's regret from the start cell drops to tol (max_episodes + 1 if never)."""
+    import train  # same hyperparameters as a real training run
+    grid_size = solution.grid_size
+    agent = QLearningAgent(**train.TRAIN_PARAMS, encoding=make_encoding(kind, grid_size), seed=seed,
+                           planning_steps=planning_steps, planning=planning, trace_lambda=trace_lambda,
+                           exploration_bonus=exploration_bonus)
+    env = GridWorldEnv(seed=seed, grid_size=grid_size, rewards=rewards)
+    get_state = getattr(env, STATE_VIEWS[kind])
+    for episode in range(1, max_episodes + 1):
+        env.reset()
+        state = get_state()
+        agent.reset_traces()  # like train() - the simple view often starts where the last episode ended
+        for _ in range(30):
+            action = agent.choose_action(state)
+            _, reward, done = env.step(action)
+            next_state = get_state()
+            agent.learn(state, action, reward, next_state, done)
+            state = next_state
+            if done:
+                break
+        agent.decay_epsilon()
+        if episode % check_every == 0 and solution.regret(agent)["start"] <= tol:
+            return episode
+    return max_episodes + 1
+
+
+def bench_planning(results, max_episodes, seeds=3, kind="relative", grid_size=8, planning_steps=10,
+                   exploration_bonus=0.1):
+    """
+    Sample efficiency: real episodes to converge, plain learn() vs Dyna-Q vs
+    prioritized sweeping, with shaped and with sparse rewards. Every run gets
+    the same exploration bonus - without it planning makes the tried moves look
+    so good that the untried ones never get a turn - so only planning differs.
+    """
+    import solver
+    for reward_label, rewards in (("shaped", None), ("sparse", SPARSE_REWARDS)):
+        solution = solver.solve(grid_size, rewards=rewards)
+        for label, steps, planning in (("plain", 0, "sweeping"), ("dyna", planning_steps, "dyna"),
+                                       ("sweeping", planning_steps, "sweeping")):
+            start = time.perf_counter()
+            episodes = [_episodes_to_converge(solution, kind, steps, planning, seed, max_episodes, 10, 0.5,
+                                              rewards=rewards, exploration_bonus=exploration_bonus)
+                        for seed in range(seeds)]
+            elapsed = time.perf_counter() - start
+            name = f"{reward_label}.{label}.{kind}.g{grid_size}"
+            results.add(f"planning.episodes_to_converge.{name}", sum(episodes) / seeds, "episodes",
+                        higher_is_better=False)
+            results.add(f"planning.wall_time.{name}", elapsed / seeds, "s", higher_is_better=False)
+
+
+def bench_traces(results, max_episodes, seeds=3, kinds=("simple", "relative"), grid_size=8, trace_lambda=0.5):
+    """
+    Sparse rewards (no closer/farther shaping): episodes to converge, one-step Q vs Q(lambda).
+
+    lambda=0.5 is where traces pay off on the simple view - 8x8 grid, 12 seeds:
+    one-step 69 episodes, lambda 0.5 32, lambda 0.8 30. The relative view is the
+    counterexample kept next to it: it can't see the walls, so a trace spreads
+    every crash over moves that are fine almost everywhere else (same 12 seeds:
+    one-step 609, lambda 0.5 667, 0.8 about twice that) - traces stay off by default.
+    """
+    import solver
+    sparse = SPARSE_REWARDS
+    solution = solver.solve(grid_size, rewards=sparse)  # regret against the problem Kenobi is actually given
+    for kind, (label, lam) in itertools.product(kinds, (("one_step", 0.0), (f"lambda{trace_lambda:g}", trace_lambda))):
+        start = time.perf_counter()
+        episodes = [_episodes_to_converge(solution, kind, 0, "sweeping", seed, max_episodes, 10, 0.5,
+                                          trace_lambda=lam, rewards=sparse)
+                    for seed in range(seeds)]
+        elapsed = time.perf_counter() - start
+        results.add(f"traces.episodes_to_converge.sparse.{label}.{kind}.g{grid_size}", sum(episodes) / seeds,
+                    "episodes", higher_is_better=False)
+        results.add(f"traces.wall_time.sparse.{label}.{kind}.g{grid_size}", elapsed / seeds, "s",
+                    higher_is_better=False)
+
+
+def bench_checkpoint(results, grid_sizes, repeats):
+    for grid_size in grid_sizes:
+        for kind in STATE_VIEWS:
+            if kind == "simple" and grid_size != grid_sizes[0]:
+                continue  # the simple view doesn't depend on the grid size
+            encoding = make_encoding(kind, grid_size)
+            agent = QLearningAgent(encoding=encoding, seed=0)
+            agent.q_table.values[:] = np.random.default_rng(0).random(agent.q_table.values.shape)
+            agent.q_table.visited[:] = True
+            label = f"{kind}.g{grid_size}"
+
+            measured = []  # (name, value, unit) - reported once the save/load chatter is over
+            with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+                filename = os.path.join(tmp, "q.qtb")
+                measured.append((f"checkpoint.save.{label}", _best_of(repeats, lambda: agent.save(filename)), "s"))
+                measured.append((f"checkpoint.size.{label}", os.path.getsize(filename), "bytes"))
+                for mmap in (False, True):
+                    mode = "mmap" if mmap else "read"
+                    tracemalloc.start()
+                    elapsed = _best_of(repeats, lambda: QLearningAgent().load(filename, mmap=mmap))
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    measured.append((f"checkpoint.load.{mode}.{label}", elapsed, "s"))
+                    measured.append((f"checkpoint.load_peak_memory.{mode}.{label}", peak, "bytes"))
+            for name, value, unit in measured:
+                results.add(name, value, unit, higher_is_better=False)
+
+
+def compare(current, baseline, tolerance):
+    """Return a list of (name, old, new, change) for metrics that got worse than tolerance."""
+    regressions = []
+    for name, metric in current.items():
+        old = baseline.get(name)
+        if old is None or not old["value"]:
+            continue
+        change = (metric["value"] - old["value"]) / old["value"]
+        worse = -change if metric["higher_is_better"] else change
+        if worse > tolerance:
+            regressions.append((name, old["value"], metric["value"], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Kenobi's hot paths")
+    parser.add_argument("--quick", action="store_true", help="smaller workloads")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="allowed slowdown before flagging (0.20 = 20%%)")
+    parser.add_argument("--grid-sizes", type=int, nargs="+", default=[8, 16, 32])
+    args = parser.parse_args(argv)
+
+    scale = 10 if args.quick else 1
+    repeats = 2 if args.quick else 3
+    seeds = 3 if args.quick else 12  # learning curves are noisy - a handful of seeds can rank them either way
+    results = Results()
+
+    print("\n=== Environment ===")
+    bench_env(results, 200_000 // scale, repeats)
+    print("\n=== Agent ===")
+    bench_agent(results, 100_000 // scale, repeats)
+    print("\n=== Training ===")
+    bench_train(results, 2_000 // scale, repeats)
+    print("\n=== Planning ===")
+    bench_planning(results, 1_000 // scale, seeds=seeds)
+    print("\n=== Eligibility traces ===")
+    bench_traces(results, 2_000 // scale, seeds=seeds)
+    print("\n=== Checkpoints ===")
+    bench_checkpoint(results, args.grid_sizes, repeats)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "numpy": np.__version__, "cpus": os.cpu_count()},
+        "quick": args.quick,
+        "metrics": results.metrics,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    status = 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results.metrics, baseline["metrics"], args.tolerance)
+        if regressions:
+            status = 1
+            print(f"\n!!! {len(regressions)} regression(s) against {args.baseline}:")
+            for name, old, new, change in regressions:
+                print(f"  {name:45s} {old:,.4g} -> {new:,.4g} ({change:+.0%})")
+        else:
+            print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,308 @@
+# Binary checkpoints for Kenobi's brain
+# A compact file format that can be memory-mapped - no pickle, no waiting!
+"""
+Checkpoint layout (all little-endian):
+
+    b"KQTB" | uint16 version | uint32 header length | JSON header | zero padding
+    data, starting at the next 64-byte boundary:
+        dense backend: values (n_states, 4) in the header dtype, then visited (n_states,) uint8
+        dict backend:  states (n_states, state_width) int64, then values (n_states, 4) float64,
+                       then visit counts (n_states,) int64 when the header has "max_states"
+                       (a size-capped SparseQTable)
+
+Incremental saves append records to "<checkpoint>.delta":
+
+    b"KQTD" | float64 epsilon | uint64 count | uint32 state width | rows | values (count, 4)
+
+where rows are int64 state indices (dense, width 0) or (count, width) int64
+states (dict). A size-capped SparseQTable writes instead
+
+    b"KQTS" | float64 epsilon | uint64 count | uint32 state width | uint64 evicted count
+           | evicted states (evicted, width) | states (count, width) | values (count, 4) | visits (count,)
+
+so states evicted since the last save are dropped on load (before the rows
+are inserted, so replaying never evicts anything itself). Visit counts come
+along for the changed rows; states only looked up since then keep the count
+of the save before, which only nudges which states get evicted next. Records are
+replayed in order on load, so later rows win. When more than max_states
+states were evicted since the last save, append_delta writes a full
+checkpoint instead - listing them all would cost more.
+"""
+import json
+import os
+import struct
+
+import numpy as np
+
+from q_tables import DenseQTable, SparseQTable, NUM_ACTIONS
+from state_encoding import StateEncoding
+
+MAGIC = b"KQTB"
+DELTA_MAGIC = b"KQTD"
+SPARSE_DELTA_MAGIC = b"KQTS"
+VERSION = 1
+ALIGNMENT = 64  # data starts on a 64-byte boundary so it maps cleanly
+
+_PREAMBLE = struct.Struct("<4sHI")       # magic, version, header length
+_DELTA_RECORD = struct.Struct("<4sdQI")  # magic, epsilon, row count, state width
+_EVICTED_COUNT = struct.Struct("<Q")     # KQTS records: evicted state count
+
+HYPERPARAMETERS = ("lr", "discount", "epsilon_decay", "epsilon_min")
+
+
+class CheckpointError(ValueError):
+    """Raised when a checkpoint file is not one we can read."""
+
+
+def delta_filename(filename):
+    return filename + ".delta"
+
+
+def _data_offset(header_length):
+    end = _PREAMBLE.size + header_length
+    return (end + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _dict_arrays(q_table, states=None):
+    """Dict Q-table (or some of its states) -> (states int64 array, values float64 array)."""
+    states = list(q_table) if states is None else [s for s in states if s in q_table]
+    if not states:
+        return np.zeros((0, 0), dtype=np.int64), np.zeros((0, NUM_ACTIONS), dtype=np.float64)
+    try:
+        state_array = np.array(states, dtype=np.int64)
+    except (TypeError, ValueError) as exc:
+        raise CheckpointError("dict checkpoints need states that are equal-length tuples of ints") from exc
+    if state_array.ndim != 2:
+        raise CheckpointError("dict checkpoints need states that are equal-length tuples of ints")
+    values = np.array([q_table[s] for s in states], dtype=np.float64).reshape(-1, NUM_ACTIONS)
+    return state_array, values
+
+
+def _build_header(agent, dict_states=None):
+    header = {
+        "hyperparameters": {name: getattr(agent, name) for name in HYPERPARAMETERS},
+        "epsilon": agent.epsilon,
+    }
+    if agent.encoding is not None:
+        encoding = agent.encoding
+        header.update(
+            backend="dense",
+            encoding={
+                "name": encoding.name,
+                "grid_size": encoding.grid_size,
+                "dims": list(encoding.dims),
+                "offsets": list(encoding.offsets),
+            },
+            dtype=agent.q_table.values.dtype.str,
+            n_states=encoding.n_states,
+        )
+    else:
+        header.update(
+            backend="dict",
+            dtype=np.dtype(np.float64).str,
+            n_states=dict_states.shape[0],
+            state_width=dict_states.shape[1],
+        )
+        if isinstance(agent.q_table, SparseQTable):
+            # a capped table: its limits, and the visit counts stored after the values
+            header.update(max_states=agent.q_table.max_states, eviction=agent.q_table.eviction)
+    return header
+
+
+def save_checkpoint(agent, filename):
+    """Write a full checkpoint (atomically) and drop any old delta log."""
+    if agent.encoding is None:
+        states, values = _dict_arrays(agent.q_table)
+        header = _build_header(agent, states)
+    else:
+        header = _build_header(agent)
+    header_bytes = json.dumps(header).encode("utf-8")
+    offset = _data_offset(len(header_bytes))
+
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (offset - f.tell()))
+        if header["backend"] == "dense":
+            table = agent.q_table
+            np.ascontiguousarray(table.values).tofile(f)
+            table.visited.astype(np.uint8).tofile(f)
+        else:
+            states.tofile(f)
+            values.tofile(f)
+            if "max_states" in header:
+                visits = agent.q_table.visits
+                np.array([visits[s] for s in agent.q_table], dtype=np.int64).tofile(f)
+    os.replace(tmp_filename, filename)
+
+    if os.path.exists(delta_filename(filename)):
+        os.remove(delta_filename(filename))
+    _clear_dirty(agent)
+
+
+def append_delta(agent, filename):
+    """Append only the rows changed since the last save. Returns how many were written."""
+    capped = isinstance(agent.q_table, SparseQTable)
+    if capped and agent.evicted_states is None:
+        save_checkpoint(agent, filename)  # too many evictions to list - start over from a full checkpoint
+        return len(agent.q_table)
+    if agent.encoding is not None:
+        table = agent.q_table
+        rows = table.changed_rows().astype(np.int64)
+        values = np.ascontiguousarray(table.values[rows])
+        width = 0
+    else:
+        rows, values = _dict_arrays(agent.q_table, agent.dirty_states)
+        width = rows.shape[1]
+
+    with open(delta_filename(filename), "ab") as f:
+        if capped:
+            # re-inserted since their eviction? then they're simply among the rows
+            evicted = [s for s in agent.evicted_states if s not in agent.q_table]
+            width = max(width, len(evicted[0]) if evicted else 0)
+            evicted = np.array(evicted, dtype=np.int64).reshape(len(evicted), width)
+            visits = agent.q_table.visits
+            f.write(_DELTA_RECORD.pack(SPARSE_DELTA_MAGIC, agent.epsilon, len(rows), width))
+            f.write(_EVICTED_COUNT.pack(len(evicted)))
+            evicted.tofile(f)
+            rows.tofile(f)
+            values.tofile(f)
+            np.array([visits[tuple(s)] for s in rows.tolist()], dtype=np.int64).tofile(f)
+        else:
+            f.write(_DELTA_RECORD.pack(DELTA_MAGIC, agent.epsilon, len(rows), width))
+            rows.tofile(f)
+            values.tofile(f)
+    _clear_dirty(agent)
+    return len(rows)
+
+
+def _clear_dirty(agent):
+    if agent.encoding is not None:
+        agent.q_table.clear_dirty()
+    else:
+        agent.dirty_states.clear()
+        agent.evicted_states = set()
+
+
+def read_header(filename):
+    """Return (header dict, byte offset of the data section)."""
+    with open(filename, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) != _PREAMBLE.size:
+            raise CheckpointError(f"{filename} is too short to be a checkpoint")
+        magic, version, header_length = _PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise CheckpointError(f"{filename} is not a Q-table checkpoint")
+        if version != VERSION:
+            raise CheckpointError(f"{filename} has checkpoint version {version}, expected {VERSION}")
+        header = json.loads(f.read(header_length).decode("utf-8"))
+    return header, _data_offset(header_length)
+
+
+def load_checkpoint(agent, filename, mmap=False):
+    """
+    Load a checkpoint (plus its delta log) into agent.
+
+    With mmap=True a dense table is memory-mapped copy-on-write: the agent can
+    start answering right away, pages are read from disk as they are touched,
+    and any learning afterwards never writes back into the file.
+    """
+    header, offset = read_header(filename)
+    for name, value in header["hyperparameters"].items():
+        setattr(agent, name, value)
+    agent.epsilon = header["epsilon"]
+    n_states = header["n_states"]
+    dtype = np.dtype(header["dtype"])
+
+    if header["backend"] == "dense":
+        enc = header["encoding"]
+        encoding = StateEncoding(enc["name"], enc["dims"], enc["offsets"], enc["grid_size"])
+        visited_offset = offset + n_states * NUM_ACTIONS * dtype.itemsize
+        if mmap:
+            values = np.memmap(filename, dtype=dtype, mode="c", offset=offset, shape=(n_states, NUM_ACTIONS))
+            visited = np.memmap(filename, dtype=np.bool_, mode="c", offset=visited_offset, shape=(n_states,))
+        else:
+            values = np.fromfile(filename, dtype=dtype, count=n_states * NUM_ACTIONS, offset=offset)
+            values = values.reshape(n_states, NUM_ACTIONS)
+            visited = np.fromfile(filename, dtype=np.uint8, count=n_states, offset=visited_offset).astype(bool)
+        agent.encoding = encoding
+        agent.q_table = DenseQTable.from_arrays(encoding, values, visited)
+    else:
+        width = header["state_width"]
+        states = np.fromfile(filename, dtype=np.int64, count=n_states * width, offset=offset)
+        values = np.fromfile(filename, dtype=np.float64, count=n_states * NUM_ACTIONS,
+                             offset=offset + states.nbytes)
+        agent.encoding = None
+        states = list(map(tuple, states.reshape(n_states, width).tolist()))
+        values = values.reshape(n_states, NUM_ACTIONS).tolist()
+        if "max_states" in header:
+            visits = np.fromfile(filename, dtype=np.int64, count=n_states,
+                                 offset=offset + n_states * (width + NUM_ACTIONS) * 8)
+            agent.q_table = SparseQTable(header["max_states"], header["eviction"], on_evict=agent._forget_state)
+            agent.q_table.load(states, values, visits.tolist())
+        else:
+            agent.q_table = dict(zip(states, values))
+        agent.dirty_states = set()
+
+    _replay_deltas(agent, header, delta_filename(filename))
+    _clear_dirty(agent)  # what we just loaded is what's on disk
+
+
+def _replay_deltas(agent, header, filename):
+    if not os.path.exists(filename):
+        return
+    dtype = np.dtype(header["dtype"])
+    with open(filename, "rb") as f:
+        while True:
+            record = f.read(_DELTA_RECORD.size)
+            if len(record) < _DELTA_RECORD.size:
+                break  # end of log (or a torn final record from a crash - skip it)
+            magic, epsilon, count, width = _DELTA_RECORD.unpack(record)
+            if magic == SPARSE_DELTA_MAGIC:
+                if not _replay_sparse_record(agent, f, count, width):
+                    break
+                agent.epsilon = epsilon
+                continue
+            if magic != DELTA_MAGIC:
+                raise CheckpointError(f"{filename} has a corrupt delta record")
+            if agent.encoding is not None:
+                rows = np.fromfile(f, dtype=np.int64, count=count)
+                values = np.fromfile(f, dtype=dtype, count=count * NUM_ACTIONS)
+                if len(values) < count * NUM_ACTIONS:
+                    break
+                agent.q_table.values[rows] = values.reshape(count, NUM_ACTIONS)
+                agent.q_table.visited[rows] = True
+            else:
+                states = np.fromfile(f, dtype=np.int64, count=count * width)
+                values = np.fromfile(f, dtype=np.float64, count=count * NUM_ACTIONS)
+                if len(values) < count * NUM_ACTIONS:
+                    break
+                states = states.reshape(count, width).tolist()
+                for state, q_values in zip(map(tuple, states), values.reshape(count, NUM_ACTIONS).tolist()):
+                    agent.q_table[state] = q_values
+            agent.epsilon = epsilon
+
+
+def _replay_sparse_record(agent, f, count, width):
+    """Apply one KQTS record to a capped table. Returns False for a torn record."""
+    table = agent.q_table
+    if not isinstance(table, SparseQTable):
+        raise CheckpointError(f"{f.name} has capped-table deltas for a checkpoint without max_states")
+    evicted_count = f.read(_EVICTED_COUNT.size)
+    if len(evicted_count) < _EVICTED_COUNT.size:
+        return False
+    (evicted_count,) = _EVICTED_COUNT.unpack(evicted_count)
+    evicted = np.fromfile(f, dtype=np.int64, count=evicted_count * width)
+    states = np.fromfile(f, dtype=np.int64, count=count * width)
+    values = np.fromfile(f, dtype=np.float64, count=count * NUM_ACTIONS)
+    visits = np.fromfile(f, dtype=np.int64, count=count)
+    if len(visits) < count or len(evicted) < evicted_count * width:
+        return False
+    # drop first: the live table had already made room for these rows, so inserting never evicts
+    for state in map(tuple, evicted.reshape(evicted_count, width).tolist()):
+        if state in table:
+            del table[state]
+    states = list(map(tuple, states.reshape(count, width).tolist()))
+    table.load(states, values.reshape(count, NUM_ACTIONS).tolist(), visits.tolist())
+    return True
@@ -0,0 +1,273 @@
+# Convergence monitor for the Security Bot
+# Is Kenobi still learning anything? If not, school's out early!
+"""
+Usage:
+    monitor = ConvergenceMonitor(window=10, patience=3)
+    monitor.instrument(agent)                    # wrap the agent's table updates
+    ...
+    if monitor.end_episode(episode, env.score, steps):
+        break                                    # converged - stop training
+    ...
+    monitor.close()
+    monitor.report(planned_episodes)
+
+Every window episodes the monitor closes a window and checks:
+
+- max |dQ|:        the biggest single Q-value change made by an update
+                   (lr * TD error - no table scan needed)
+- policy changes:  how many states changed their greedy action. Only states
+                   touched in the window are re-checked, against the greedy
+                   action remembered for them (ties -> lowest action, like
+                   compile_policy; untouched states can't have changed)
+- score change:    how far the window's average score moved from the last window's
+
+A window passes when every criterion that is switched on (not None) holds.
+After patience passing windows in a row (and at least min_episodes episodes)
+training has converged: action="stop" ends it, action="decay" keeps going
+with epsilon_decay lowered to fast_decay so exploration dies out quickly.
+Every write to the table counts, not just the state a learn call was given:
+the pairs an eligibility trace updates along with it and imagined planning
+backups move Q too, and stopping while they still do would stop too early.
+"""
+import time
+
+import numpy as np
+
+from event_log import events
+
+ACTIONS = ("stop", "decay")
+
+
+class ConvergenceMonitor:
+    """
+    Tracks how much Kenobi is still changing, one window of episodes at a time.
+
+    Args:
+        window: Episodes per window
+        patience: Passing windows in a row needed to call it converged
+        max_delta_q: A window passes only if no Q-value moved more than this (None = don't check)
+        max_policy_changes: ...and at most this many greedy actions changed (None = don't check)
+        score_tolerance: ...and the average score moved at most this much (None = don't check)
+        min_episodes: Never converge before this many episodes
+        action: "stop" ends training, "decay" switches to fast_decay
+        fast_decay: epsilon_decay used after converging with action="decay"
+    """
+
+    def __init__(self, window=10, patience=3, max_delta_q=None, max_policy_changes=0, score_tolerance=None,
+                 min_episodes=0, action="stop", fast_decay=0.5):
+        if action not in ACTIONS:
+            raise ValueError(f"unknown convergence action {action!r}, expected one of {ACTIONS}")
+        if window < 1 or patience < 1:
+            raise ValueError("window and patience must be at least 1")
+        self.window = window
+        self.patience = patience
+        self.max_delta_q = max_delta_q
+        self.max_policy_changes = max_policy_changes
+        self.score_tolerance = score_tolerance
+        self.min_episodes = min_episodes
+        self.action = action
+        self.fast_decay = fast_decay
+
+        self.agent = None
+        self.touched = set()       # states (dict tables) or rows (dense) learned since the window opened
+        self._td = [0.0, 0.0]      # largest and smallest TD error this window - a list the wrappers update in place
+        self._greedy = None        # dense: greedy action per row; dict: {state: greedy action}
+        self._wrapped = []
+        self._scores = []          # this window's episode scores
+        self._steps = 0            # env steps over the whole run
+        self._last_score = None    # previous window's average score
+        self.streak = 0            # passing windows in a row
+        self.episodes = 0
+        self.converged_at = None   # episode where convergence was declared
+        self.history = []          # one dict per closed window
+        self._started = None
+        self._elapsed = None
+
+    # ---- hooks -------------------------------------------------------------
+
+    def instrument(self, agent):
+        """
+        Wrap the agent's table updates to note touched states and the biggest |dQ|:
+        _update (every real learn step, traced or not), _backup (planning) and learn_batch.
+        """
+        self.agent = agent
+        self._started = time.perf_counter()
+        touched = self.touched
+        td = self._td
+        dense = agent.encoding is not None
+        if dense:
+            self._greedy = np.zeros(agent.encoding.n_states, dtype=np.int8)  # all-zero rows act 0
+            encode = agent.encoding.encode
+        else:
+            self._greedy = {}
+
+        update = agent._update
+        traced = bool(agent.trace_lambda)
+
+        def tracked_update(state, action, reward, next_state, done):
+            if traced and agent.traces:
+                # every pair still holding a trace moves by step * trace (<= step) along with this one
+                if dense:
+                    touched.update(slot // 4 for slot in agent.traces)
+                else:
+                    touched.update(pair[0] for pair in agent.traces)
+            td_error = update(state, action, reward, next_state, done)
+            # dQ is lr * TD error, so the extremes are all we need - lr is applied once per window
+            if td_error > td[0]:
+                td[0] = td_error
+            elif td_error < td[1]:
+                td[1] = td_error
+            touched.add(encode(state) if dense else state)
+            return td_error
+
+        backup = agent._backup
+
+        def tracked_backup(pair):
+            td_error = backup(pair)
+            if td_error > td[0]:
+                td[0] = td_error
+            elif td_error < td[1]:
+                td[1] = td_error
+            touched.add(encode(pair[0]) if dense else pair[0])
+            return td_error
+
+        learn_batch = agent.learn_batch
+
+        def tracked_learn_batch(states, actions, rewards, next_states, dones, weights=None):
+            td_errors = learn_batch(states, actions, rewards, next_states, dones, weights=weights)
+            if len(td_errors):
+                # weights only ever shrink a step; grouped duplicates can move a bit further than one TD error
+                td[0] = max(td[0], float(td_errors.max()))
+                td[1] = min(td[1], float(td_errors.min()))
+                if dense:
+                    touched.update(agent._state_indices(states).tolist())
+                else:
+                    touched.update(map(tuple, np.asarray(states).tolist()))
+            return td_errors
+
+        self._wrap(agent, "_update", tracked_update)
+        self._wrap(agent, "_backup", tracked_backup)
+        self._wrap(agent, "learn_batch", tracked_learn_batch)
+        return self
+
+    def _wrap(self, obj, name, wrapper):
+        # same trick as Telemetry: an instance attribute shadows the method
+        setattr(obj, name, wrapper)
+        self._wrapped.append((obj, name, wrapper))
+
+    def uninstrument(self):
+        """Put the original methods back (unless someone wrapped them again since)."""
+        for obj, name, wrapper in self._wrapped:
+            if obj.__dict__.get(name) is wrapper:
+                delattr(obj, name)
+        self._wrapped = []
+
+    # ---- windows -----------------------------------------------------------
+
+    def _policy_changes(self):
+        """Re-check the greedy action of the touched states only."""
+        touched = self.touched
+        if not touched:
+            return 0
+        table = self.agent.q_table
+        if self.agent.encoding is not None:
+            rows = np.fromiter(touched, dtype=np.int64, count=len(touched))
+            best = table.values[rows].argmax(axis=1).astype(np.int8)
+            changes = int(np.count_nonzero(best != self._greedy[rows]))
+            self._greedy[rows] = best
+            return changes
+        greedy = self._greedy
+        changes = 0
+        for state in touched:
+            if state not in table:  # evicted from a capped table since
+                greedy.pop(state, None)
+                continue
+            q_values = table[state]  # plain indexing: doesn't count as a visit
+            best = q_values.index(max(q_values))
+            if greedy.get(state, 0) != best:
+                changes += 1
+                greedy[state] = best
+        return changes
+
+    def end_episode(self, episode, score, steps):
+        """
+        Count one finished episode; closes a window every window episodes.
+        Returns True when training should stop.
+        """
+        self.episodes = episode
+        self._scores.append(score)
+        self._steps += steps
+        if len(self._scores) < self.window:
+            return False
+
+        changes = self._policy_changes()
+        max_delta_q = self.agent.lr * float(max(self._td[0], -self._td[1]))
+        avg_score = sum(self._scores) / len(self._scores)
+        score_change = None if self._last_score is None else abs(avg_score - self._last_score)
+        passed = ((self.max_delta_q is None or max_delta_q <= self.max_delta_q)
+                  and (self.max_policy_changes is None or changes <= self.max_policy_changes)
+                  and (self.score_tolerance is None
+                       or (score_change is not None and score_change <= self.score_tolerance)))
+        self.streak = self.streak + 1 if passed else 0
+        self.history.append(dict(episode=episode, max_delta_q=max_delta_q, policy_changes=changes,
+                                 touched=len(self.touched), avg_score=avg_score, passed=passed))
+        events.debug("converge", "Ep {episode:5d} | max |dQ| {dq:.4f} | {changes} policy changes "
+                     "in {touched} states | avg score {score:.2f}{mark}",
+                     episode=episode, dq=max_delta_q, changes=changes, touched=len(self.touched),
+                     score=avg_score, mark=" | pass" if passed else "")
+
+        # fresh window - clear in place, the wrappers hold on to these
+        self.touched.clear()
+        self._td[:] = [0.0, 0.0]
+        self._scores = []
+        self._last_score = avg_score
+
+        if self.converged_at is not None or self.streak < self.patience or episode < self.min_episodes:
+            return False
+        self.converged_at = episode
+        if self.action == "stop":
+            events.info("converge", "Converged at episode {episode} - stopping early", episode=episode)
+            return True
+        self.agent.epsilon_decay = min(self.agent.epsilon_decay, self.fast_decay)
+        events.info("converge", "Converged at episode {episode} - epsilon now decays by {decay} per episode",
+                    episode=episode, decay=self.agent.epsilon_decay)
+        return False
+
+    def close(self):
+        """Unwrap the agent and stop the clock."""
+        self.uninstrument()
+        if self._started is not None:
+            self._elapsed = time.perf_counter() - self._started
+
+    # ---- results -----------------------------------------------------------
+
+    def summary(self, planned_episodes=None):
+        """Where it converged and (with planned_episodes) what stopping early saved."""
+        elapsed = self._elapsed
+        if elapsed is None:  # still running
+            elapsed = time.perf_counter() - self._started if self._started is not None else 0.0
+        result = {"episodes": self.episodes, "converged_at": self.converged_at, "windows": len(self.history),
+                  "steps": self._steps, "seconds": elapsed}
+        if planned_episodes and self.episodes:
+            skipped = max(planned_episodes - self.episodes, 0)
+            result.update(
+                planned_episodes=planned_episodes,
+                episodes_saved=skipped,
+                fraction_saved=skipped / planned_episodes,
+                # the skipped episodes would have cost about what the ones we ran did
+                steps_saved_estimate=round(skipped * self._steps / self.episodes),
+                seconds_saved_estimate=skipped * elapsed / self.episodes,
+            )
+        return result
+
+    def report(self, planned_episodes=None):
+        """Print the convergence summary."""
+        s = self.summary(planned_episodes)
+        print("\n=== Convergence ===")
+        if s["converged_at"] is None:
+            print(f"  Not converged after {s['episodes']} episodes ({s['windows']} windows)")
+        else:
+            print(f"  Converged at episode {s['converged_at']} ({self.action})")
+        if s.get("episodes_saved"):
+            print(f"  Saved {s['episodes_saved']} of {s['planned_episodes']} episodes ({s['fraction_saved']:.0%}) "
+                  f"- about {s['steps_saved_estimate']:,} steps, {s['seconds_saved_estimate']:.2f}s")
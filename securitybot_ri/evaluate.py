@@ -0,0 +1,356 @@
+# Policy evaluation for the Security Bot
+# Five test episodes prove nothing - thousands of them, with error bars, do!
+"""
+Runs saved policies over many seeded episodes and reports, with confidence
+intervals:
+
+    score           foods eaten per episode
+    wall-hit rate   share of episodes that ended in a wall
+    steps to food   steps until the first food (episodes that found one)
+    optimal agree   share of moves that match get_optimal_action (with food on a
+                    diagonal two moves are equally good and the cheat sheet
+                    picks the vertical one, so a perfect policy can score < 100%)
+    gap to optimal  cheat-sheet policy's score minus this one's (paired, see below)
+
+Episodes are played in rounds: one BatchGridWorld of `batch` grids where
+every grid plays exactly one episode (letting auto-reset pick up new episodes
+would favour short ones). Round r always uses the r-th seed spawned from
+--seed, and every policy plays round r on the same seed, so policies are
+compared episode by episode (paired differences have much tighter intervals
+than two separate means). Rounds can run in a worker pool; results are
+consumed in round order, so where evaluation stops never depends on --workers.
+
+Evaluation stops once the interval that matters is tight enough (half-width
+<= precision): the score for one policy, or the score difference to the first
+policy when comparing several - a difference whose interval already excludes
+zero is decided right away. That check runs after every round, so the real
+error rate of a "decided" call is somewhat above 1 - confidence; raise
+--confidence or --min-episodes when the call matters.
+
+Usage:
+    python evaluate.py q_table.qtb                      # one checkpoint (or .kpol policy)
+    python evaluate.py old.qtb new.qtb --precision 0.02 # which one is better?
+    python evaluate.py dict.qtb --state relative --grid-size 32 --workers 4
+"""
+import argparse
+import json
+import math
+import os
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+
+from batch_env import BatchGridWorld
+from grid_env import GRID_SIZE
+from policy import MAGIC as POLICY_MAGIC, compile_policy, load_policy
+from state_encoding import STATE_GETTERS
+
+METRICS = ("score", "wall_hit", "steps_to_food", "optimal_agree")
+
+# An estimate with its confidence interval
+Estimate = namedtuple("Estimate", "mean low high n")
+
+
+class OptimalPolicy:
+    """get_optimal_action as a batch policy - the yardstick for the gap to optimal."""
+
+    kind = "simple"
+
+    def __init__(self, grid_size=GRID_SIZE):
+        self.grid_size = grid_size
+
+    def __repr__(self):
+        return f"OptimalPolicy(grid_size={self.grid_size})"
+
+    def act_batch(self, states):
+        states = np.asarray(states)
+        dir_row = states[:, 0]
+        dir_col = states[:, 1]
+        return np.select([dir_row == -1, dir_row == 1, dir_col == -1, dir_col == 1], [0, 1, 2, 3], default=0)
+
+
+def evaluate_agent(agent, kind="simple", grid_size=GRID_SIZE, **options):
+    """Compile a live agent's greedy policy and evaluate it (options as for evaluate())."""
+    return evaluate([compile_policy(agent, kind, grid_size)], ["trained agent"], **options)
+
+
+def load_any(filename, kind=None, grid_size=None):
+    """A compiled policy from a .kpol file or a checkpoint (compiled on the spot)."""
+    with open(filename, "rb") as f:
+        magic = f.read(len(POLICY_MAGIC))
+    if magic == POLICY_MAGIC:
+        policy = load_policy(filename)
+        if kind is not None:
+            policy.kind = kind
+        if grid_size is not None:
+            policy.grid_size = grid_size
+    else:
+        from q_agent import QLearningAgent
+        agent = QLearningAgent()
+        if not agent.load(filename):
+            raise FileNotFoundError(f"no checkpoint at {filename}")
+        policy = compile_policy(agent, kind, grid_size)
+        if kind is not None and policy.kind is None:
+            policy.kind = kind
+    if policy.kind is None:
+        raise ValueError(f"{filename} doesn't record its state view - pass kind (--state)")
+    policy.grid_size = policy.grid_size or grid_size or GRID_SIZE
+    return policy
+
+
+def play_round(policy, seed, episodes, max_steps=30):
+    """
+    One round: `episodes` grids, each playing exactly one episode of at most
+    max_steps steps. Returns {metric: per-episode array}.
+    """
+    env = BatchGridWorld(episodes, max_steps=max_steps, seed=seed, grid_size=policy.grid_size)
+    get_state = getattr(env, STATE_GETTERS[policy.kind])
+    active = np.ones(episodes, dtype=bool)
+    steps = np.zeros(episodes, dtype=np.int64)
+    agree = np.zeros(episodes, dtype=np.int64)
+    first_food = np.zeros(episodes, dtype=np.int64)  # 0 = no food yet
+    scores = np.zeros(episodes, dtype=np.int64)
+    walls = np.zeros(episodes, dtype=bool)
+    state = get_state()
+    for step in range(1, max_steps + 1):
+        actions = policy.act_batch(state)
+        agree += active & (actions == env.get_optimal_actions())
+        _, _, wall = env.step(actions)
+        state = get_state()
+        ended = env.episode_ended
+        score = np.where(ended, env.final_scores, env.score)  # ended grids have already reset
+        first_food[active & (first_food == 0) & (score > 0)] = step
+        steps += active
+        finished = active & ended
+        scores[finished] = env.final_scores[finished]
+        walls[finished] = wall[finished]
+        active &= ~ended
+        if not active.any():
+            break
+    return {
+        "score": scores.astype(np.float64),
+        "wall_hit": walls.astype(np.float64),
+        "steps_to_food": np.where(first_food > 0, first_food, np.nan),
+        "optimal_agree": agree / np.maximum(steps, 1),
+    }
+
+
+def mean_interval(values, z):
+    """Normal-approximation interval for a mean (NaNs - e.g. no food found - are left out)."""
+    values = values[~np.isnan(values)]
+    n = len(values)
+    if n == 0:
+        return Estimate(math.nan, math.nan, math.nan, 0)
+    mean = float(values.mean())
+    half = z * float(values.std(ddof=1)) / math.sqrt(n) if n > 1 else math.inf
+    return Estimate(mean, mean - half, mean + half, n)
+
+
+def rate_interval(values, z):
+    """Wilson score interval for a 0/1 rate - stays sensible when the rate is 0 or 1."""
+    n = len(values)
+    if n == 0:
+        return Estimate(math.nan, math.nan, math.nan, 0)
+    p = float(values.mean())
+    denominator = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denominator
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return Estimate(p, center - half, center + half, n)
+
+
+def _half_width(estimate):
+    return (estimate.high - estimate.low) / 2
+
+
+class Evaluation:
+    """Per-episode results of every policy so far, and the intervals built from them."""
+
+    def __init__(self, labels, z):
+        self.labels = labels
+        self.z = z
+        self._rounds = [{metric: [] for metric in METRICS} for _ in labels]
+        self.episodes = 0
+        self.rounds = 0
+        self.seconds = 0.0
+        self.n_compared = len(labels)  # policies compared against the first (the rest is the yardstick)
+        self.vs_optimal = False
+
+    def add(self, results):
+        """One round's results - a list with one {metric: array} per policy."""
+        for store, result in zip(self._rounds, results):
+            for metric in METRICS:
+                store[metric].append(result[metric])
+        self.episodes += len(results[0]["score"])
+        self.rounds += 1
+
+    def values(self, i, metric):
+        return np.concatenate(self._rounds[i][metric])
+
+    def estimate(self, i, metric):
+        interval = rate_interval if metric == "wall_hit" else mean_interval
+        return interval(self.values(i, metric), self.z)
+
+    def difference(self, i, j, metric="score"):
+        """Paired interval for policy i minus policy j (same seeds, episode by episode)."""
+        return mean_interval(self.values(i, metric) - self.values(j, metric), self.z)
+
+
+# ---- worker pool ------------------------------------------------------------
+
+_worker_policies = None
+
+
+def _init_worker(policies):
+    global _worker_policies
+    _worker_policies = policies
+
+
+def _pool_round(seed, episodes, max_steps):
+    return [play_round(policy, seed, episodes, max_steps) for policy in _worker_policies]
+
+
+def evaluate(policies, labels=None, precision=0.05, confidence=0.95, min_episodes=1000, max_episodes=200_000,
+             batch=1000, workers=1, seed=0, max_steps=30, vs_optimal=True):
+    """
+    Evaluate policies (anything with kind, grid_size and act_batch) round by
+    round until the stopping rule is met. Returns an Evaluation; with
+    vs_optimal the cheat-sheet policy is added last as "optimal".
+    """
+    policies = list(policies)
+    labels = list(labels) if labels is not None else [repr(p) for p in policies]
+    n_compared = len(policies)
+    if vs_optimal:
+        policies.append(OptimalPolicy(policies[0].grid_size))
+        labels.append("optimal")
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    evaluation = Evaluation(labels, z)
+    max_rounds = max(1, math.ceil(max_episodes / batch))
+    # one seed per round, whatever order or process the rounds run in
+    round_seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(max_rounds)]
+
+    def settled():
+        if evaluation.episodes < min_episodes:
+            return False
+        if n_compared == 1:
+            return _half_width(evaluation.estimate(0, "score")) <= precision
+        for i in range(1, n_compared):
+            difference = evaluation.difference(i, 0)
+            if difference.low <= 0 <= difference.high and _half_width(difference) > precision:
+                return False  # can't tell them apart yet
+        return True
+
+    started = time.perf_counter()
+    if workers <= 1:
+        for round_seed in round_seeds:
+            evaluation.add([play_round(policy, round_seed, batch, max_steps) for policy in policies])
+            if settled():
+                break
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(policies,)) as pool:
+            pending = deque()
+            next_round = 0
+            while pending or next_round < max_rounds:
+                while next_round < max_rounds and len(pending) < 2 * workers:  # keep every worker busy
+                    pending.append(pool.submit(_pool_round, round_seeds[next_round], batch, max_steps))
+                    next_round += 1
+                evaluation.add(pending.popleft().result())  # strictly in round order
+                if settled():
+                    for future in pending:
+                        future.cancel()
+                    break
+    evaluation.seconds = time.perf_counter() - started
+    evaluation.n_compared = n_compared
+    evaluation.vs_optimal = vs_optimal
+    return evaluation
+
+
+def _format(estimate, digits=2, percent=False):
+    if estimate.n == 0:
+        return "-"
+    scale = 100 if percent else 1
+    unit = "%" if percent else ""
+    return (f"{estimate.mean * scale:.{digits}f}{unit} "
+            f"± {_half_width(estimate) * scale:.{digits}f}{unit}")
+
+
+def summary(evaluation):
+    """Plain dict of every estimate - what --json writes."""
+    rows = []
+    optimal = len(evaluation.labels) - 1 if evaluation.vs_optimal else None
+    for i, label in enumerate(evaluation.labels):
+        row = {"policy": label}
+        for metric in METRICS:
+            row[metric] = evaluation.estimate(i, metric)._asdict()
+        if optimal is not None and i != optimal:
+            row["gap_to_optimal"] = evaluation.difference(optimal, i)._asdict()
+        if 0 < i < evaluation.n_compared:
+            row["vs_first"] = evaluation.difference(i, 0)._asdict()
+        rows.append(row)
+    return {"episodes": evaluation.episodes, "rounds": evaluation.rounds, "seconds": evaluation.seconds,
+            "confidence_z": evaluation.z, "policies": rows}
+
+
+def report(evaluation):
+    """Print the table, and the verdict when comparing."""
+    print(f"\n=== Evaluation: {evaluation.episodes:,} episodes per policy in {evaluation.seconds:.2f}s "
+          f"({evaluation.rounds} rounds) ===")
+    print(f"  {'policy':24s} {'score':>14s} {'wall-hit':>16s} {'steps to food':>15s} {'optimal agree':>16s} "
+          f"{'gap to optimal':>15s}")
+    optimal = len(evaluation.labels) - 1 if evaluation.vs_optimal else None
+    for i, label in enumerate(evaluation.labels):
+        gap = "" if optimal is None or i == optimal else _format(evaluation.difference(optimal, i))
+        print(f"  {label[-24:]:24s} {_format(evaluation.estimate(i, 'score')):>14s} "
+              f"{_format(evaluation.estimate(i, 'wall_hit'), 1, percent=True):>16s} "
+              f"{_format(evaluation.estimate(i, 'steps_to_food'), 1):>15s} "
+              f"{_format(evaluation.estimate(i, 'optimal_agree'), 1, percent=True):>16s} {gap:>15s}")
+    for i in range(1, evaluation.n_compared):
+        difference = evaluation.difference(i, 0)
+        if difference.low > 0:
+            verdict = "better"
+        elif difference.high < 0:
+            verdict = "worse"
+        else:
+            verdict = "no significant difference"
+        print(f"  {evaluation.labels[i]} vs {evaluation.labels[0]}: score {_format(difference)} -> {verdict}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate (and compare) Kenobi's saved policies")
+    parser.add_argument("policies", nargs="+", help="checkpoints (.qtb) or compiled policies (.kpol); "
+                                                    "several are compared against the first")
+    parser.add_argument("--state", choices=list(STATE_GETTERS), default=None,
+                        help="state view, for dict checkpoints (dense ones know theirs)")
+    parser.add_argument("--grid-size", type=int, default=None)
+    parser.add_argument("--precision", type=float, default=0.05,
+                        help="stop once the score (or score difference) is known to +- this")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--min-episodes", type=int, default=1000)
+    parser.add_argument("--max-episodes", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=1000, help="episodes per round (grids stepped together)")
+    parser.add_argument("--workers", type=int, default=1, help="processes running rounds (1 = no pool)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-steps", type=int, default=30)
+    parser.add_argument("--no-optimal", action="store_true", help="skip the gap to get_optimal_action")
+    parser.add_argument("--json", metavar="FILE", default=None, help="also write the results here")
+    args = parser.parse_args(argv)
+
+    try:
+        policies = [load_any(name, args.state, args.grid_size) for name in args.policies]
+    except (OSError, ValueError) as exc:
+        parser.exit(1, f"{parser.prog}: {exc}\n")
+    if len({policy.grid_size for policy in policies}) > 1:
+        parser.error("all policies must play the same grid size")
+    labels = [os.path.basename(name) for name in args.policies]
+    evaluation = evaluate(policies, labels, args.precision, args.confidence, args.min_episodes, args.max_episodes,
+                          args.batch, args.workers, args.seed, args.max_steps, not args.no_optimal)
+    report(evaluation)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary(evaluation), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
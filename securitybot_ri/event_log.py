@@ -0,0 +1,187 @@
+# Event log for the Security Bot
+# Kenobi talks a lot - this keeps his chatter from slowing him down!
+"""
+A small structured logger for the game and training loops.
+
+    from event_log import events, INFO
+    events.info("food", "FOOD COLLECTED! Score: {score}", score=env.score)
+
+- Every record has an event name, a level and some fields. The message is
+  only formatted if the record is actually written.
+- Per-event rate limits (records per second) and sampling (keep 1 in N) stop
+  chatty events from flooding the terminal; suppressed records are counted
+  and summarized instead.
+- Lines are buffered and written in batches: a burst of records costs one
+  write, while a lone record (e.g. a GUI move at human speed) still shows up
+  right away.
+
+configure("quiet" | "normal" | "verbose") sets up the shared `events` log;
+add_verbosity_arguments() gives an argparse parser matching --quiet/--verbose.
+"""
+import atexit
+import json
+import sys
+import threading
+import time
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING"}
+
+# normal mode: busy events are capped at this many lines per second.
+# "progress" is deliberately not here - the loops already print it only every
+# few episodes, and the buffer batches its writes, so every line still shows.
+DEFAULT_RATE_LIMITS = {
+    "move": 20,
+    "episode": 5,
+    "food": 5,
+    "wall": 5,
+}
+
+VERBOSITY = {
+    "quiet": dict(level=WARNING, rate_limits={}),
+    "normal": dict(level=INFO, rate_limits=DEFAULT_RATE_LIMITS),
+    "verbose": dict(level=DEBUG, rate_limits={}),
+}
+
+
+class EventLog:
+    """
+    Buffered, rate-limited event logger.
+
+    level        - records below this level are dropped right away
+    rate_limits  - {event: max records per second} (token bucket, burst = rate)
+    sample       - {event: n} keeps only every n-th record of that event
+    fmt          - "text" prints the message, "json" prints one JSON object per line
+    buffer_lines - write once this many lines are waiting...
+    flush_interval - ...or once this many seconds passed since the last write
+
+    Safe to share between threads (the live training worker logs while the
+    window does): one lock guards the buffer, the counters and the writes.
+    """
+
+    def __init__(self, level=INFO, rate_limits=None, sample=None, fmt="text", stream=None,
+                 buffer_lines=256, flush_interval=0.25):
+        self._lock = threading.RLock()  # reentrant: log() flushes while holding it
+        self.configure(level, rate_limits, sample, fmt, stream)
+        self.buffer_lines = buffer_lines
+        self.flush_interval = flush_interval
+        self._lines = []
+        self._last_flush = 0.0
+
+    def configure(self, level=INFO, rate_limits=None, sample=None, fmt="text", stream=None):
+        if fmt not in ("text", "json"):
+            raise ValueError(f"unknown event log format {fmt!r}, expected 'text' or 'json'")
+        with self._lock:
+            self._configure(level, rate_limits, sample, fmt, stream)
+
+    def _configure(self, level, rate_limits, sample, fmt, stream):
+        self.level = level
+        self.rate_limits = dict(rate_limits or {})
+        self.sample = dict(sample or {})
+        self.fmt = fmt
+        self.stream = stream  # None = whatever sys.stdout is when we write
+        self._buckets = {}    # event -> [tokens, last refill time]
+        self._seen = {}       # event -> records seen (for sampling)
+        self.suppressed = {}  # event -> records dropped by rate limits / sampling
+
+    def enabled(self, level):
+        """Cheap check for callers that want to skip building a record at all."""
+        return level >= self.level
+
+    def _allow(self, event, now):
+        every = self.sample.get(event)
+        if every:
+            seen = self._seen.get(event, 0)
+            self._seen[event] = seen + 1
+            if seen % every:
+                return False
+        rate = self.rate_limits.get(event)
+        if rate:
+            bucket = self._buckets.get(event)
+            if bucket is None:
+                bucket = self._buckets[event] = [float(rate), now]
+            tokens = min(float(rate), bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if tokens < 1.0:
+                bucket[0] = tokens
+                return False
+            bucket[0] = tokens - 1.0
+        return True
+
+    def log(self, level, event, message="", **fields):
+        """Record one event. Returns True if it was kept."""
+        if level < self.level:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            if (self.sample or self.rate_limits) and not self._allow(event, now):
+                self.suppressed[event] = self.suppressed.get(event, 0) + 1
+                return False
+            if self.fmt == "json":
+                record = {"time": time.time(), "level": LEVEL_NAMES.get(level, level), "event": event}
+                record.update(fields)
+                if message:
+                    record["message"] = message.format(**fields)
+                self._lines.append(json.dumps(record))
+            else:
+                self._lines.append(message.format(**fields) if message else event)
+            if len(self._lines) >= self.buffer_lines or now - self._last_flush >= self.flush_interval:
+                self.flush()
+        return True
+
+    def debug(self, event, message="", **fields):
+        return self.log(DEBUG, event, message, **fields)
+
+    def info(self, event, message="", **fields):
+        return self.log(INFO, event, message, **fields)
+
+    def warning(self, event, message="", **fields):
+        return self.log(WARNING, event, message, **fields)
+
+    def flush(self, summary=False):
+        """Write every buffered line; summary=True also reports what was suppressed."""
+        with self._lock:
+            if summary and self.suppressed:
+                counts = ", ".join(f"{event} x{count}" for event, count in sorted(self.suppressed.items()))
+                self._lines.append(f"(quieted to save time: {counts})")
+                self.suppressed = {}
+            self._last_flush = time.monotonic()
+            if not self._lines:
+                return
+            lines, self._lines = self._lines, []
+            stream = self.stream or sys.stdout
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+
+    def close(self):
+        self.flush(summary=True)
+
+
+# The log everybody shares - normal verbosity until an entry point says otherwise
+events = EventLog(**VERBOSITY["normal"])
+atexit.register(events.close)
+
+
+def configure(verbosity="normal", fmt="text", stream=None):
+    """Set up the shared log for quiet, normal or verbose runs."""
+    events.flush()
+    events.configure(fmt=fmt, stream=stream, **VERBOSITY[verbosity])
+    return events
+
+
+def add_verbosity_arguments(parser):
+    """Add --quiet / --verbose / --log-format to an argparse parser."""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--quiet", "-q", dest="verbosity", action="store_const", const="quiet",
+                       help="only warnings - fastest for long headless runs")
+    group.add_argument("--verbose", "-v", dest="verbosity", action="store_const", const="verbose",
+                       help="every event, no rate limits")
+    parser.set_defaults(verbosity="normal")
+    parser.add_argument("--log-format", choices=["text", "json"], default="text",
+                        help="event log output: plain text or JSON lines")
+
+
+def configure_from_args(args):
+    return configure(args.verbosity, fmt=args.log_format)
@@ -0,0 +1,219 @@
+# Headless Grid World for the Security Bot
+# Kenobi's training arena without any windows - no Tk, no canvas, just pure speed!
+import operator
+import random
+
+# 16x16 grid by default, Kenobi starts in the center
+GRID_SIZE = 16
+START_ROW = GRID_SIZE // 2
+START_COL = GRID_SIZE // 2
+
+# Reward values (tune these for your RL algorithm)
+REWARD_FOOD = 10.0      # Reward for collecting food
+REWARD_STEP = 0.0       # No step penalty
+REWARD_WALL = -10.0     # Penalty for hitting a wall (ends episode)
+REWARD_CLOSER = 2.0     # STRONG bonus for moving closer to food
+REWARD_FARTHER = -2.0   # STRONG penalty for moving away from food
+
+# Names GridWorldEnv(rewards={...}) understands, e.g. {"wall": -20.0}
+REWARD_NAMES = ("food", "step", "wall", "closer", "farther")
+
+
+def reward_values(rewards=None):
+    """{name: value} for every REWARD_NAMES entry, with rewards overriding the defaults."""
+    values = {"food": REWARD_FOOD, "step": REWARD_STEP, "wall": REWARD_WALL,
+              "closer": REWARD_CLOSER, "farther": REWARD_FARTHER}
+    for name, value in (rewards or {}).items():
+        if name not in values:
+            raise ValueError(f"unknown reward {name!r}, expected one of {REWARD_NAMES}")
+        values[name] = value
+    return values
+
+
+def check_grid_size(grid_size):
+    """grid_size as an int, or ValueError - a grid needs room for Kenobi and his food."""
+    try:
+        grid_size = operator.index(grid_size)  # ints (NumPy's too), but no floats
+    except TypeError:
+        raise ValueError(f"grid_size must be an integer, got {grid_size!r}") from None
+    if grid_size < 2:
+        raise ValueError(f"grid_size must be at least 2, got {grid_size}")
+    return grid_size
+
+# Actions: 0=up, 1=down, 2=left, 3=right -> (row change, column change)
+ACTION_DELTAS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+class GridWorldEnv:
+    """
+    Pure-Python grid world with a reset()/step() API.
+
+    Holds the same game rules as gui_main but keeps all state on the instance,
+    so you can run as many environments per process as you like.
+    Observers are optional callbacks ``observer(env, event)`` fired after every
+    change, where event is one of "reset", "step", "food" or "wall".
+    The GUI attaches itself as an observer - headless runs attach nothing.
+    grid_size sets the side of the square grid; Kenobi starts in its center.
+    rewards overrides some of the REWARD_* values for this env only.
+    """
+
+    def __init__(self, seed=None, grid_size=GRID_SIZE, rewards=None):
+        grid_size = check_grid_size(grid_size)
+        self.rng = random.Random(seed)  # every environment gets its own dice!
+        self.grid_size = grid_size
+        self.start_row = self.start_col = grid_size // 2
+        self.robot_row = self.start_row
+        self.robot_col = self.start_col
+        self.food_row = 0
+        self.food_col = 0
+        self.score = 0
+        self.last_reward = 0  # Track the most recent reward for RL training
+        self.episode_done = False
+        self.episode_count = 1
+        self.observers = []
+        self.set_rewards(rewards)
+        self.spawn_food()
+
+    def set_rewards(self, rewards=None):
+        """Use these reward values (missing names keep the module defaults)."""
+        values = reward_values(rewards)
+        self.reward_food = values["food"]
+        self.reward_step = values["step"]
+        self.reward_wall = values["wall"]
+        self.reward_closer = values["closer"]
+        self.reward_farther = values["farther"]
+
+    def add_observer(self, observer):
+        """Attach a callback that is told about every reset and step."""
+        self.observers.append(observer)
+
+    def remove_observer(self, observer):
+        """Detach a previously attached observer."""
+        self.observers.remove(observer)
+
+    def _notify(self, event):
+        for observer in self.observers:
+            observer(self, event)
+
+    def spawn_food(self):
+        """Spawn food at a random position (not on robot)."""
+        randrange = self.rng.randrange
+        size = self.grid_size
+        while True:
+            food_row = randrange(size)
+            food_col = randrange(size)
+            # Make sure food doesn't spawn on robot!!
+            if food_row != self.robot_row or food_col != self.robot_col:
+                break
+        self.food_row = food_row
+        self.food_col = food_col
+
+    def reset(self):
+        """Reset game state for new episode and return the starting state."""
+        self.robot_row = self.start_row
+        self.robot_col = self.start_col
+        self.score = 0
+        self.last_reward = 0
+        self.episode_done = False
+        self.episode_count += 1
+        self.spawn_food()
+        if self.observers:
+            self._notify("reset")
+        return (self.robot_row, self.robot_col, self.food_row, self.food_col)
+
+    def step(self, action):
+        """
+        RL-friendly step function. Takes an action (0-3) and returns (state, reward, done).
+        Actions: 0=up, 1=down, 2=left, 3=right
+        """
+        # Everything is inlined here - this is the hot path of every training run!
+        row = self.robot_row
+        col = self.robot_col
+        d_row, d_col = ACTION_DELTAS[action]
+        new_row = row + d_row
+        new_col = col + d_col
+        size = self.grid_size
+
+        # Check for wall collision
+        if new_row < 0 or new_row >= size or new_col < 0 or new_col >= size:
+            reward = self.last_reward = self.reward_wall
+            self.episode_done = True
+            if self.observers:
+                self._notify("wall")
+            return (row, col, self.food_row, self.food_col), reward, True
+
+        # Move is valid, update position
+        self.robot_row = new_row
+        self.robot_col = new_col
+        food_row = self.food_row
+        food_col = self.food_col
+
+        if new_row == food_row and new_col == food_col:
+            # Yummy! Collect the food and spawn a new one
+            self.score += 1
+            reward = self.reward_food
+            self.spawn_food()
+            event = "food"
+        else:
+            # Add distance-based shaping (only if didn't eat food)
+            old_dist = abs(row - food_row) + abs(col - food_col)
+            new_dist = abs(new_row - food_row) + abs(new_col - food_col)
+            reward = self.reward_step
+            if new_dist < old_dist:
+                reward += self.reward_closer
+            elif new_dist > old_dist:
+                reward += self.reward_farther
+            event = "step"
+
+        self.last_reward = reward
+        if self.observers:
+            self._notify(event)
+        return (new_row, new_col, self.food_row, self.food_col), reward, False
+
+    def check_wall_collision(self, new_row, new_col):
+        """Check if movement would hit a wall. Returns True if wall hit."""
+        size = self.grid_size
+        return new_row < 0 or new_row >= size or new_col < 0 or new_col >= size
+
+    def get_distance_to_food(self, row, col):
+        """Calculate Manhattan distance from position to food."""
+        return abs(row - self.food_row) + abs(col - self.food_col)
+
+    def calculate_distance_reward(self, old_row, old_col, new_row, new_col):
+        """Reward for moving closer to food, penalty for moving away."""
+        old_dist = self.get_distance_to_food(old_row, old_col)
+        new_dist = self.get_distance_to_food(new_row, new_col)
+        if new_dist < old_dist:
+            return self.reward_closer  # Got closer!
+        elif new_dist > old_dist:
+            return self.reward_farther  # Moved away
+        return 0  # Same distance
+
+    def get_state(self):
+        """Return current state tuple for RL: (robot_row, robot_col, food_row, food_col)."""
+        return (self.robot_row, self.robot_col, self.food_row, self.food_col)
+
+    def get_relative_state(self):
+        """Return (delta_row, delta_col) from Kenobi to the food."""
+        return (self.food_row - self.robot_row, self.food_col - self.robot_col)
+
+    def get_simple_state(self):
+        """Simplified state - just the DIRECTION to food, 9 possible states."""
+        delta_row = self.food_row - self.robot_row
+        delta_col = self.food_col - self.robot_col
+        dir_row = 0 if delta_row == 0 else (1 if delta_row > 0 else -1)
+        dir_col = 0 if delta_col == 0 else (1 if delta_col > 0 else -1)
+        return (dir_row, dir_col)
+
+    def get_optimal_action(self):
+        """Returns the BEST action to take right now (Kenobi's cheat sheet)."""
+        dir_row, dir_col = self.get_simple_state()
+        if dir_row == -1:
+            return 0  # go up
+        elif dir_row == 1:
+            return 1  # go down
+        elif dir_col == -1:
+            return 2  # go left
+        elif dir_col == 1:
+            return 3  # go right
+        return 0  # shouldn't happen, Kenobi is confused but let's go up anyway!
@@ -0,0 +1,190 @@
+# Live training view for the Security Bot
+# Kenobi trains at full speed in the background while the window keeps up as best it can!
+import threading
+from collections import deque, namedtuple
+
+import tkinter as tk
+
+from grid_env import GridWorldEnv, GRID_SIZE
+from state_encoding import STATE_GETTERS
+from event_log import events
+
+# Everything the window needs to draw one frame - cheap to build, safe to hand across threads
+Snapshot = namedtuple(
+    "Snapshot",
+    "robot_row robot_col food_row food_col score episode_count last_reward epsilon avg_score",
+)
+
+
+class TrainingWorker(threading.Thread):
+    """
+    Runs the training loop in a background thread against its own env.
+
+    After every step it drops a Snapshot into a small bounded queue
+    (a deque with maxlen, so when the window falls behind the oldest frames
+    fall off the end and training never waits on the GUI).
+    """
+
+    def __init__(self, agent, episodes=1000, max_steps=30, max_frames=4, report_every=5, seed=None,
+                 grid_size=GRID_SIZE, state_kind="simple"):
+        super().__init__(daemon=True)
+        self.grid_size = grid_size
+        self.state_kind = state_kind
+        self.agent = agent
+        self.episodes = episodes
+        self.max_steps = max_steps
+        self.report_every = report_every
+        self.seed = seed
+        self.frames = deque(maxlen=max_frames)
+        self.scores = []
+        self.avg_score = 0.0
+        self.episode = 0
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        """Ask the worker to finish after the current episode."""
+        self._stop_event.set()
+
+    def run(self):
+        agent = self.agent
+        env = GridWorldEnv(seed=self.seed, grid_size=self.grid_size)
+        get_state = getattr(env, STATE_GETTERS[self.state_kind])
+        push = self.frames.append
+
+        for episode in range(1, self.episodes + 1):
+            if self._stop_event.is_set():
+                break
+            env.reset()
+            state = get_state()
+            for _ in range(self.max_steps):
+                action = agent.choose_action(state)
+                _, reward, done = env.step(action)
+                next_state = get_state()
+                agent.learn(state, action, reward, next_state, done)
+                state = next_state
+                push(Snapshot(env.robot_row, env.robot_col, env.food_row, env.food_col, env.score,
+                              episode, reward, agent.epsilon, self.avg_score))
+                if done:
+                    break
+
+            agent.decay_epsilon()
+            self.scores.append(env.score)
+            self.episode = episode
+            if episode % self.report_every == 0:
+                recent = self.scores[-self.report_every:]
+                self.avg_score = sum(recent) / len(recent)
+                events.info("progress", "Ep {episode:3d} | Avg Score: {avg:.1f} | Epsilon: {epsilon:.2f}",
+                            episode=episode, avg=self.avg_score, epsilon=agent.epsilon)
+
+
+class FramePacer:
+    """
+    Paces a visualized loop (train, test, demos) from Tk's event loop.
+
+    wait(ms) schedules an after() callback and lets Tk run until it fires, so
+    the window keeps redrawing and answering clicks in between frames - a plain
+    update() plus a blocking after(ms) sleep froze it, close button included.
+    Closing the window only sets closed and ends the current wait: the loop sees
+    it, stops, and whoever runs it still gets to save before close_window().
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.closed = False
+        self._waiting = False
+        self._tick = tk.BooleanVar(window)
+        window.protocol("WM_DELETE_WINDOW", self._close)
+
+    def wait(self, ms):
+        """Let Tk run for ms milliseconds; False once the window has been closed."""
+        if self.closed:
+            return False
+        self.window.after(ms, self._tick.set, True)
+        self._waiting = True
+        try:
+            self.window.wait_variable(self._tick)
+        finally:
+            self._waiting = False
+        return not self.closed
+
+    def _close(self):
+        self.closed = True
+        if self._waiting:
+            self._tick.set(True)  # wake up the wait() - its loop wraps up, then closes the window
+        else:
+            self.close_window()  # no loop running (e.g. the final mainloop) - just go
+
+    def close_window(self):
+        """Destroy the window (once the loop is done with it)."""
+        self.closed = True
+        try:
+            self.window.destroy()
+        except tk.TclError:
+            pass  # already gone
+
+
+class LiveTrainingView:
+    """
+    Shows a TrainingWorker's progress without ever blocking Tk.
+
+    An after() callback polls the worker's frame queue, draws only the newest
+    snapshot (older ones are stale and get dropped) and reschedules itself
+    until the worker is done. Closing the window stops the worker after its
+    episode and still calls on_finish, so an early close keeps what Kenobi learned.
+    """
+
+    def __init__(self, window, renderer, worker, poll_ms=33, on_finish=None):
+        self.window = window
+        self.renderer = renderer
+        self.worker = worker
+        self.poll_ms = poll_ms  # ~30 frames per second
+        self.on_finish = on_finish
+        self._finished = False
+        self.status = tk.Label(window, text="Kenobi is warming up...", font=("Arial", 10))
+        self.status.pack()
+
+    def start(self):
+        self.window.protocol("WM_DELETE_WINDOW", self._close)
+        self.worker.start()
+        self.window.after(self.poll_ms, self._poll)
+
+    def _close(self):
+        """The window's close button: let Kenobi finish his episode, keep his brain, then go."""
+        self.worker.stop()
+        self.worker.join()
+        self._finish()
+        self.window.destroy()
+
+    def _finish(self):
+        if self._finished:
+            return
+        self._finished = True
+        if self.on_finish is not None:
+            self.on_finish(self.worker)
+
+    def _poll(self):
+        frames = self.worker.frames
+        if frames:
+            snapshot = frames.pop()  # newest frame wins
+            frames.clear()           # everything older is stale
+            self._show(snapshot)
+
+        if self.worker.is_alive():
+            self.window.after(self.poll_ms, self._poll)
+            return
+
+        worker = self.worker
+        try:
+            self.status.config(text=f"Training done! {worker.episode} episodes | "
+                                    f"Last Avg Score: {worker.avg_score:.1f}")
+        except tk.TclError:
+            return  # window closed - _close() has finished up already
+        self._finish()
+
+    def _show(self, snapshot):
+        self.renderer.draw(snapshot)
+        try:
+            self.status.config(text=f"Ep {snapshot.episode_count} | Avg Score: {snapshot.avg_score:.1f} | "
+                                    f"Epsilon: {snapshot.epsilon:.2f} | Last Reward: {snapshot.last_reward:.1f}")
+        except tk.TclError:
+            pass  # window was closed
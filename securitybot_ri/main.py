@@ -1,32 +1,41 @@
 # import main libraries for the RL vision board
 import random
+from move_history import BufferedHistoryWriter, generate_moves
 # define the directions, player should beable to use WASD keys in the end.
 DIRECTIONS = {1: "up", 2: "left", 3: "down", 4: "right"} #0123? vs 1234?
 HISTORY_FILE = "mvmnt_hist.txt" # create the new file which will be looped into the main function for the robot to learn
+BINARY_HISTORY_FILE = "mvmnt_hist.bin" # compact 2-bits-per-move version for really long recordings
+ANNOUNCE_LIMIT = 100 # the robot only announces each move for short runs - millions of prints would take forever!
 
 # automated moves for the robot kenobi to move in, the robot might eventually get hungry as the game progresses?!
-def automate_moves(moves=100):
-    """Move automatically a specified number of times."""
+def automate_moves(moves=100, filename=None, fmt="text"):
+    """Move automatically a specified number of times (fmt="binary" records to BINARY_HISTORY_FILE)."""
+    if filename is None: # each format gets its own file, so a binary run never lands in the text history
+        filename = BINARY_HISTORY_FILE if fmt == "binary" else HISTORY_FILE
     print(f"\nI am about to move {moves} times and record the movements!")
-    for _ in range(moves): # using the range function to randomize WASD
-        direction_number = random.randint(1, 4)
-        print(f"I moved {DIRECTIONS[direction_number]}") # robot declares the move!
-        with open(HISTORY_FILE, "a") as f: # open the file for the move history
-            f.write(str(direction_number) + ",") # write into the mvmnt_hist.txt file
+    direction_numbers = generate_moves(moves) # draw every random WASD move in one go
+    if moves <= ANNOUNCE_LIMIT:
+        for direction_number in direction_numbers.tolist():
+            print(f"I moved {DIRECTIONS[direction_number]}") # robot declares the move!
+    # one buffered writer for the whole run instead of reopening the file every move
+    with BufferedHistoryWriter(filename, fmt=fmt) as history:
+        history.write_many(direction_numbers) # write into the mvmnt_hist file
     print("Automated moves complete!") # print when the automation is complete!
 
 
 def kenobi_moves(): # manual moves as the option for the user
     """Interactive mode: move one step at a time with user confirmation."""
     should_continue = "yes" # yes, as an option vs no
-    while should_continue.lower() in ["yes", "y"]:
-        # yes before random number moves on the grid
-        direction_number = random.randint(1, 4)
-        print(f"\nI moved {DIRECTIONS[direction_number]}") #directions moved
-        with open(HISTORY_FILE, "a") as f: # open file to still write the created move
-            f.write(str(direction_number) + ",") # writing into file
-        print("I just wrote the movement down in the history file!") # declaration to affirm new file is created!
-        should_continue = input("\nWould you like me to move again? (yes/no): ") # boolean logic for the robots next move.
+    # keep the history file open for the whole session, but flush every move - keypresses are slow anyway
+    with BufferedHistoryWriter(HISTORY_FILE) as history:
+        while should_continue.lower() in ["yes", "y"]:
+            # yes before random number moves on the grid
+            direction_number = random.randint(1, 4)
+            print(f"\nI moved {DIRECTIONS[direction_number]}") #directions moved
+            history.write(direction_number) # writing into the history buffer
+            history.flush() # ...and straight onto disk, so the next line is true
+            print("I just wrote the movement down in the history file!") # declaration to affirm new file is created!
+            should_continue = input("\nWould you like me to move again? (yes/no): ") # boolean logic for the robots next move.
 
 # the main function that completes the app and initiates the functionality of the project.
 def main():
@@ -35,9 +44,12 @@ def main():
     print("I can move in the following directions (WASD mapped to 1234):")
     print("1 - up | 2 - left | 3 - down | 4 - right\n")
     # interactive or autmomated mode?!
-    mode = input("Choose mode - (1) Interactive or (2) Automated: ").strip()
+    mode = input("Choose mode - (1) Interactive, (2) Automated or (3) Automated long run, binary history: ").strip()
     if mode == "2":
         automate_moves()
+    elif mode == "3":
+        moves = input("How many moves? (default 1000000): ").strip()
+        automate_moves(int(moves) if moves.isdigit() else 1_000_000, fmt="binary") # 2 bits per move in mvmnt_hist.bin
     else:
         kenobi_moves()
 
@@ -0,0 +1,231 @@
+# Movement history recording for the Security Bot
+# Kenobi's diary - buffered, compact, and ready for millions of moves!
+"""
+Two history formats:
+
+text   - the original "N," per move (N = 1 up, 2 left, 3 down, 4 right), e.g. "1,4,3,"
+binary - b"KMVH" | uint8 version | uint8 bits per move (2) | uint16 reserved | uint64 move count
+         followed by the moves packed 4 per byte, first move in the highest two bits
+         (stored as direction number - 1)
+"""
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"KMVH"
+VERSION = 1
+BITS_PER_MOVE = 2
+MOVES_PER_BYTE = 8 // BITS_PER_MOVE
+_HEADER = struct.Struct("<4sBBHQ")  # magic, version, bits per move, reserved, move count
+_SHIFTS = np.array([6, 4, 2, 0], dtype=np.uint8)  # where each of the 4 moves sits in a byte
+
+DEFAULT_BUFFER_MOVES = 1 << 16  # flush to disk every 64k moves
+_SEPARATORS = np.frombuffer(b",\n", dtype=np.uint8)
+
+
+class HistoryFormatError(ValueError):
+    """Raised when a binary history file has a bad header."""
+
+
+def generate_moves(count, rng=None):
+    """Draw count random direction numbers (1-4) in one vectorized call."""
+    rng = rng if rng is not None else np.random.default_rng()
+    return rng.integers(1, 5, size=count, dtype=np.uint8)
+
+
+def pack_moves(moves):
+    """Direction numbers (1-4) -> bytes holding 4 moves each (last byte zero-padded)."""
+    codes = np.asarray(moves, dtype=np.uint8) - 1
+    padded = np.zeros(-(-len(codes) // MOVES_PER_BYTE) * MOVES_PER_BYTE, dtype=np.uint8)
+    padded[:len(codes)] = codes
+    return np.bitwise_or.reduce(padded.reshape(-1, MOVES_PER_BYTE) << _SHIFTS, axis=1).astype(np.uint8)
+
+
+def unpack_moves(packed, count):
+    """Bytes from pack_moves -> the first count direction numbers (1-4)."""
+    packed = np.asarray(packed, dtype=np.uint8)
+    codes = (packed[:, None] >> _SHIFTS) & 0b11
+    return codes.reshape(-1)[:count] + 1
+
+
+class BufferedHistoryWriter:
+    """
+    Appends moves to a history file, batching them in memory and writing in
+    chunks - one syscall per chunk instead of an open/close per move.
+
+    Use it as a context manager so the last partial chunk (and, for binary
+    files, the move count in the header) always gets written.
+    """
+
+    def __init__(self, filename, fmt="text", buffer_moves=DEFAULT_BUFFER_MOVES):
+        if fmt not in ("text", "binary"):
+            raise ValueError(f"unknown history format {fmt!r}, expected 'text' or 'binary'")
+        self.filename = filename
+        self.fmt = fmt
+        self.buffer_moves = buffer_moves
+        self._pending = []  # list of uint8 arrays waiting to be written
+        self._pending_count = 0
+        if fmt == "text":
+            self._file = open(filename, "ab")
+            self.count = 0  # moves written by this writer
+        else:
+            self._open_binary()
+
+    def _open_binary(self):
+        exists = os.path.exists(self.filename) and os.path.getsize(self.filename) > 0
+        self._file = open(self.filename, "r+b" if exists else "w+b")
+        if not exists:
+            self.count = 0
+            self._file.write(_HEADER.pack(MAGIC, VERSION, BITS_PER_MOVE, 0, 0))
+            return
+        self.count = _read_binary_header(self._file, self.filename)
+        # A partly filled last byte gets pulled back into the buffer so new
+        # moves pack in right after the old ones.
+        leftover = self.count % MOVES_PER_BYTE
+        data_end = _HEADER.size + -(-self.count // MOVES_PER_BYTE)
+        if leftover:
+            self._file.seek(data_end - 1)
+            last = np.frombuffer(self._file.read(1), dtype=np.uint8)
+            self._pending.append(unpack_moves(last, leftover))
+            self._pending_count = leftover
+            self.count -= leftover
+            data_end -= 1
+        self._file.seek(data_end)
+        self._file.truncate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, direction_number):
+        """Record one move."""
+        self.write_many(np.array([direction_number], dtype=np.uint8))
+
+    def write_many(self, moves):
+        """Record a whole array of moves at once."""
+        moves = np.asarray(moves, dtype=np.uint8)
+        self._pending.append(moves)
+        self._pending_count += len(moves)
+        if self._pending_count >= self.buffer_moves:
+            self.flush(final=False)
+
+    def flush(self, final=True):
+        """
+        Write buffered moves to disk. Binary files only write whole bytes
+        unless final=True, so the packing never has gaps in the middle.
+        """
+        if not self._pending:
+            if final and self.fmt == "binary":
+                self._write_binary_count()
+                self._file.flush()
+            return
+        moves = np.concatenate(self._pending)
+        if self.fmt == "text":
+            # "1,4,3," - each move is its digit plus a comma
+            text = np.empty(len(moves) * 2, dtype=np.uint8)
+            text[0::2] = moves + ord("0")
+            text[1::2] = ord(",")
+            self._file.write(text.tobytes())
+            self.count += len(moves)
+            self._pending, self._pending_count = [], 0
+        else:
+            ready = len(moves) if final else len(moves) - len(moves) % MOVES_PER_BYTE
+            self._file.write(pack_moves(moves[:ready]).tobytes())
+            self.count += ready
+            rest = moves[ready:]
+            self._pending = [rest] if len(rest) else []
+            self._pending_count = len(rest)
+            if final:
+                self._write_binary_count()
+        self._file.flush()
+
+    def _write_binary_count(self):
+        position = self._file.tell()
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(MAGIC, VERSION, BITS_PER_MOVE, 0, self.count))
+        self._file.seek(position)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush(final=True)
+        self._file.close()
+
+
+def _read_binary_header(f, filename):
+    header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise HistoryFormatError(f"{filename} is too short to be a binary history file")
+    magic, version, bits, _, count = _HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION or bits != BITS_PER_MOVE:
+        raise HistoryFormatError(f"{filename} is not a version {VERSION} binary history file")
+    return count
+
+
+def is_binary_history(filename):
+    with open(filename, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def iter_moves(filename, chunk_moves=DEFAULT_BUFFER_MOVES):
+    """
+    Stream the moves in a history file (text or binary) as uint8 arrays of
+    direction numbers, never holding more than one chunk in memory.
+    Binary files are memory-mapped; text files are read chunk by chunk.
+    """
+    if is_binary_history(filename):
+        yield from _iter_binary(filename, chunk_moves)
+    else:
+        yield from _iter_text(filename, chunk_moves)
+
+
+def _iter_binary(filename, chunk_moves):
+    with open(filename, "rb") as f:
+        count = _read_binary_header(f, filename)
+    if count == 0:
+        return
+    n_bytes = -(-count // MOVES_PER_BYTE)
+    packed = np.memmap(filename, dtype=np.uint8, mode="r", offset=_HEADER.size, shape=(n_bytes,))
+    chunk_bytes = max(1, chunk_moves // MOVES_PER_BYTE)
+    for start in range(0, n_bytes, chunk_bytes):
+        block = packed[start:start + chunk_bytes]
+        yield unpack_moves(block, min(len(block) * MOVES_PER_BYTE, count - start * MOVES_PER_BYTE))
+
+
+def _iter_text(filename, chunk_moves):
+    # A move is a digit 1-4 with a separator (comma, newline or start of file)
+    # before it and a comma after it. Anything else in the file - like the
+    # robot's chatter - is skipped.
+    chunk_bytes = max(2, chunk_moves * 2)
+    carry = np.frombuffer(b",", dtype=np.uint8)
+    with open(filename, "rb") as f:
+        while True:
+            chunk = f.read(chunk_bytes)
+            at_end = not chunk
+            data = np.concatenate((carry, np.frombuffer(chunk or b",", dtype=np.uint8)))
+            middle = data[1:-1]
+            is_move = ((middle >= ord("1")) & (middle <= ord("4"))
+                       & (data[2:] == ord(",")) & np.isin(data[:-2], _SEPARATORS))
+            moves = middle[is_move] - ord("0")
+            if len(moves):
+                yield moves.astype(np.uint8)
+            if at_end:
+                return
+            carry = data[-2:]
+
+
+def read_moves(filename):
+    """Load a whole history file into one array (fine for small files)."""
+    chunks = list(iter_moves(filename))
+    return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.uint8)
+
+
+def count_moves(filename):
+    """Number of moves in a history file - instant for binary files."""
+    if is_binary_history(filename):
+        with open(filename, "rb") as f:
+            return _read_binary_header(f, filename)
+    return sum(len(chunk) for chunk in _iter_text(filename, DEFAULT_BUFFER_MOVES))
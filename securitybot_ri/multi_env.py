@@ -0,0 +1,365 @@
+# Crowded Grid World for the Security Bot
+# A whole team of Kenobis and a buffet of snacks - and it doesn't slow down as the crowd grows!
+"""
+MultiGridWorldEnv: M robots and F foods on one board.
+
+Everything is found through grid-sized index arrays, never by looping over
+the entities:
+
+    robot_at[cell] / food_at[cell]  who is on a cell (-1 = nobody): a move's
+                                    collision check is one look-up
+    free cells                      an indexed set (list + position array, swap
+                                    removal), so spawning picks a random free
+                                    cell in O(1) - no retry loop, however full the board
+    nearest food                    a Manhattan ring search outwards on food_at that
+                                    stops at the first food - about cells / F look-ups,
+                                    so it gets cheaper as foods are added. After a move
+                                    only two rings need checking (the distance changes
+                                    by one). With few foods (2 * F * F <= cells) scanning
+                                    the F food cells twice is cheaper, so that's used
+                                    instead: either way at most ~sqrt(cells) work per
+                                    move, whatever M and F are
+
+Rules per robot, taken in order 0..M-1 each step:
+    - a wall ends that robot's episode (reward "wall") and takes it off the board
+    - moving into another robot is blocked: the robot stays put, reward "step"
+    - landing on a food eats it (reward "food"); the food respawns on a free cell
+    - otherwise "step" plus calculate_distance_reward-style shaping against
+      the robot's nearest food ("closer" / "farther")
+The episode is over when every robot has hit a wall (or the caller's step limit).
+
+Usage:
+    env = MultiGridWorldEnv(robots=8, foods=20, grid_size=32, seed=0)
+    env.reset()
+    rewards, dones = env.step([agent.choose_action(s) for s in env.get_relative_states()])
+
+    python multi_env.py bench                  # per-move cost as the board fills up
+    python multi_env.py train --robots 8 --foods 20 --grid-size 32
+"""
+import argparse
+import random
+import time
+
+from grid_env import GRID_SIZE, ACTION_DELTAS, check_grid_size, reward_values
+
+
+class MultiGridWorldEnv:
+    """
+    Grid world with several robots and several foods, indexed by cell.
+    Cells are numbered row * grid_size + col; robot r is on robot_cell[r] and
+    food f on food_cell[f]. active[r] turns False when robot r hits a wall.
+    """
+
+    def __init__(self, robots=2, foods=3, grid_size=GRID_SIZE, seed=None, rewards=None):
+        if robots < 1 or foods < 1:
+            raise ValueError(f"need at least one robot and one food, got {robots} and {foods}")
+        grid_size = check_grid_size(grid_size)
+        if robots + foods > grid_size * grid_size:
+            raise ValueError(f"{robots} robots and {foods} foods don't fit on a {grid_size}x{grid_size} grid")
+        self.n_robots = robots
+        self.n_foods = foods
+        self.grid_size = grid_size
+        self.ring_search = 2 * foods * foods > grid_size * grid_size  # see the module docstring
+        self.rng = random.Random(seed)
+        values = reward_values(rewards)
+        self.reward_food = values["food"]
+        self.reward_step = values["step"]
+        self.reward_wall = values["wall"]
+        self.reward_closer = values["closer"]
+        self.reward_farther = values["farther"]
+
+        cells = grid_size * grid_size
+        self.robot_at = [-1] * cells
+        self.food_at = [-1] * cells
+        self.robot_cell = [0] * robots
+        self.food_cell = [0] * foods
+        self.active = [True] * robots
+        self.scores = [0] * robots
+        self.episode_done = False
+        self.episode_count = 0
+        self._free = []              # free cells, in no particular order
+        self._free_pos = [-1] * cells  # cell -> its position in _free (-1 = occupied)
+        self.reset()
+
+    # ---- free-cell index ----------------------------------------------------
+
+    def _take(self, cell):
+        """Mark cell occupied: swap it with the last free cell and pop - O(1)."""
+        free = self._free
+        pos = self._free_pos
+        i = pos[cell]
+        last = free[-1]
+        free[i] = last
+        pos[last] = i
+        free.pop()
+        pos[cell] = -1
+
+    def _release(self, cell):
+        """Mark cell free again."""
+        self._free_pos[cell] = len(self._free)
+        self._free.append(cell)
+
+    def _random_free_cell(self):
+        free = self._free
+        return free[self.rng.randrange(len(free))]
+
+    # ---- episodes -------------------------------------------------------------
+
+    def reset(self):
+        """Robot 0 starts in the center, the other robots and every food on random free cells."""
+        size = self.grid_size
+        cells = size * size
+        self.robot_at = [-1] * cells
+        self.food_at = [-1] * cells
+        self._free = list(range(cells))
+        self._free_pos = list(range(cells))
+        for r in range(self.n_robots):
+            cell = (size // 2) * size + size // 2 if r == 0 else self._random_free_cell()
+            self._take(cell)
+            self.robot_at[cell] = r
+            self.robot_cell[r] = cell
+        for f in range(self.n_foods):
+            self._spawn_food(f)
+        self.active = [True] * self.n_robots
+        self.scores = [0] * self.n_robots
+        self.episode_done = False
+        self.episode_count += 1
+
+    def _spawn_food(self, f):
+        cell = self._random_free_cell()
+        self._take(cell)
+        self.food_at[cell] = f
+        self.food_cell[f] = cell
+
+    def step(self, actions):
+        """
+        Move every active robot (actions: one 0-3 per robot, ignored for robots
+        already out). Returns (rewards, dones): per-robot lists, where dones[r]
+        is True once robot r has hit a wall.
+        """
+        size = self.grid_size
+        robot_at = self.robot_at
+        food_at = self.food_at
+        robot_cell = self.robot_cell
+        active = self.active
+        rewards = [0.0] * self.n_robots
+        for r, action in enumerate(actions):
+            if not active[r]:
+                continue
+            cell = robot_cell[r]
+            row, col = divmod(cell, size)
+            d_row, d_col = ACTION_DELTAS[action]
+            new_row = row + d_row
+            new_col = col + d_col
+
+            if new_row < 0 or new_row >= size or new_col < 0 or new_col >= size:
+                # crashed - off the board for the rest of the episode
+                rewards[r] = self.reward_wall
+                active[r] = False
+                robot_at[cell] = -1
+                self._release(cell)
+                continue
+
+            new_cell = new_row * size + new_col
+            if robot_at[new_cell] != -1:
+                rewards[r] = self.reward_step  # bumped into a teammate - stays put
+                continue
+
+            food = food_at[new_cell]
+            if food == -1:
+                old_dist = self._nearest_food(row, col)[0]
+            robot_at[cell] = -1
+            self._release(cell)
+            robot_at[new_cell] = r
+            robot_cell[r] = new_cell
+            if food != -1:
+                # Yummy! Eat it and put a new one on a free cell (maybe the one just left)
+                food_at[new_cell] = -1
+                self.scores[r] += 1
+                rewards[r] = self.reward_food
+                self._spawn_food(food)
+                continue
+            self._take(new_cell)
+            # one move changes the distance to any food by exactly 1, so the
+            # nearest food is now old_dist - 1, old_dist or old_dist + 1 away
+            new_dist = (self._distance_after_move(new_row, new_col, old_dist) if self.ring_search
+                        else self._nearest_food(new_row, new_col)[0])
+            reward = self.reward_step
+            if new_dist < old_dist:
+                reward += self.reward_closer
+            elif new_dist > old_dist:
+                reward += self.reward_farther
+            rewards[r] = reward
+
+        self.episode_done = not any(active)
+        return rewards, [not a for a in active]
+
+    # ---- nearest food ----------------------------------------------------------
+
+    def _nearest_food(self, row, col):
+        """(distance, food row, food col) of the closest food (ties: first found)."""
+        size = self.grid_size
+        if not self.ring_search:
+            best = None
+            for cell in self.food_cell:
+                food_row, food_col = divmod(cell, size)
+                dist = abs(food_row - row) + abs(food_col - col)
+                if best is None or dist < best[0]:
+                    best = (dist, food_row, food_col)
+            return best
+        # walk the diamonds |dr| + |dc| = k for k = 1, 2, ... and stop at the first food
+        for k in range(1, 2 * size - 1):
+            found = self._food_on_ring(row, col, k)
+            if found is not None:
+                return (k, *found)
+        raise RuntimeError("no food on the board")  # can't happen: foods always respawn
+
+    def _food_on_ring(self, row, col, k):
+        """(row, col) of a food exactly k steps from (row, col), or None - O(k) look-ups."""
+        size = self.grid_size
+        food_at = self.food_at
+        for d_row in range(max(-k, -row), min(k, size - 1 - row) + 1):
+            r = row + d_row
+            base = r * size
+            rest = k - abs(d_row)
+            c = col + rest
+            if c < size and food_at[base + c] != -1:
+                return r, c
+            c = col - rest
+            if rest and c >= 0 and food_at[base + c] != -1:
+                return r, c
+        return None
+
+    def _distance_after_move(self, row, col, old_dist):
+        """Nearest-food distance from (row, col), one move after it was old_dist: check two rings."""
+        if old_dist > 1 and self._food_on_ring(row, col, old_dist - 1) is not None:
+            return old_dist - 1
+        if self._food_on_ring(row, col, old_dist) is not None:
+            return old_dist
+        return old_dist + 1
+
+    def get_robot_positions(self):
+        return [divmod(cell, self.grid_size) for cell in self.robot_cell]
+
+    def get_states(self):
+        """Per robot: (robot_row, robot_col, nearest_food_row, nearest_food_col), like get_state()."""
+        states = []
+        for row, col in self.get_robot_positions():
+            _, food_row, food_col = self._nearest_food(row, col)
+            states.append((row, col, food_row, food_col))
+        return states
+
+    def get_relative_states(self):
+        """Per robot: (delta_row, delta_col) to its nearest food, like get_relative_state()."""
+        return [(food_row - row, food_col - col) for row, col, food_row, food_col in self.get_states()]
+
+    def get_simple_states(self):
+        """Per robot: direction to its nearest food, each -1/0/1, like get_simple_state()."""
+        return [((d_row > 0) - (d_row < 0), (d_col > 0) - (d_col < 0)) for d_row, d_col in self.get_relative_states()]
+
+    def check_invariants(self):
+        """Debug check: the index arrays, the free set and the entity lists all agree."""
+        cells = self.grid_size * self.grid_size
+        for cell in range(cells):
+            robot, food = self.robot_at[cell], self.food_at[cell]
+            assert robot == -1 or food == -1, f"cell {cell} holds a robot and a food"
+            assert (self._free_pos[cell] != -1) == (robot == -1 and food == -1), f"cell {cell} free-set mismatch"
+            if self._free_pos[cell] != -1:
+                assert self._free[self._free_pos[cell]] == cell
+        for r, cell in enumerate(self.robot_cell):
+            assert (self.robot_at[cell] == r) == self.active[r]
+        for f, cell in enumerate(self.food_cell):
+            assert self.food_at[cell] == f
+
+
+# Per-robot state view getters, matching state_encoding.STATE_GETTERS
+MULTI_STATE_GETTERS = {
+    "simple": "get_simple_states",
+    "relative": "get_relative_states",
+    "full": "get_states",
+}
+
+
+def bench(grid_size=64, moves=20_000, seed=0):
+    """Microseconds per robot move as robots and foods are added - should stay flat (or drop)."""
+    cells = grid_size * grid_size
+    print(f"{grid_size}x{grid_size} grid, {moves:,} moves per row")
+    print(f"  {'robots':>7s} {'foods':>7s} {'board full':>10s} {'us/move':>8s}")
+    rng = random.Random(seed)
+    for robots, foods in ((1, 1), (1, 16), (16, 16), (64, 256), (256, 1024), (cells // 4, cells // 4),
+                          (cells // 2, cells // 3)):
+        env = MultiGridWorldEnv(robots, foods, grid_size, seed=seed, rewards={"wall": 0.0})
+        done_moves = 0
+        start = time.perf_counter()
+        while done_moves < moves:
+            env.step([rng.randrange(4) for _ in range(robots)])
+            done_moves += sum(env.active)
+            if env.episode_done or sum(env.active) < robots // 2 + 1:
+                env.reset()
+        elapsed = time.perf_counter() - start
+        print(f"  {robots:7d} {foods:7d} {(robots + foods) / cells:10.0%} {elapsed / done_moves * 1e6:8.2f}")
+
+
+def train_multi(episodes=500, robots=4, foods=6, grid_size=16, state_kind="relative", max_steps=60, seed=None):
+    """
+    Every robot learns into one shared Q-table (independent learners, one brain).
+    Returns (agent, average team score per episode).
+    """
+    from train import make_agent
+    agent = make_agent(state_kind, grid_size)
+    env = MultiGridWorldEnv(robots, foods, grid_size, seed=seed)
+    get_states = getattr(env, MULTI_STATE_GETTERS[state_kind])
+    choose, learn = agent.choose_action, agent.learn
+    team_scores = []
+    for _ in range(episodes):
+        env.reset()
+        states = get_states()
+        for _ in range(max_steps):
+            active = list(env.active)
+            actions = [choose(s) if a else 0 for s, a in zip(states, active)]
+            rewards, dones = env.step(actions)
+            next_states = get_states()
+            for r in range(robots):
+                if active[r]:
+                    learn(states[r], actions[r], rewards[r], next_states[r], dones[r])
+            states = next_states
+            if env.episode_done:
+                break
+        agent.decay_epsilon()
+        team_scores.append(sum(env.scores))
+    return agent, team_scores
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Many Kenobis, many snacks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    b = commands.add_parser("bench", help="per-move cost as the board fills up")
+    b.add_argument("--grid-size", type=int, default=64)
+    b.add_argument("--moves", type=int, default=20_000)
+    t = commands.add_parser("train", help="train one shared brain for the whole team")
+    t.add_argument("--episodes", type=int, default=500)
+    t.add_argument("--robots", type=int, default=4)
+    t.add_argument("--foods", type=int, default=6)
+    t.add_argument("--grid-size", type=int, default=16)
+    t.add_argument("--state", choices=list(MULTI_STATE_GETTERS), default="relative")
+    t.add_argument("--max-steps", type=int, default=60)
+    t.add_argument("--seed", type=int, default=None)
+    t.add_argument("--output", default=None, help="save the shared brain here")
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        bench(args.grid_size, args.moves)
+        return
+    start = time.perf_counter()
+    agent, scores = train_multi(args.episodes, args.robots, args.foods, args.grid_size, args.state,
+                                args.max_steps, args.seed)
+    elapsed = time.perf_counter() - start
+    window = max(1, len(scores) // 10)
+    print(f"{len(scores)} episodes in {elapsed:.2f}s | team score: first {window} avg "
+          f"{sum(scores[:window]) / window:.1f}, last {window} avg {sum(scores[-window:]) / window:.1f}")
+    if args.output:
+        agent.save(args.output)
+
+
+if __name__ == "__main__":
+    main()
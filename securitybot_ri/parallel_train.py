@@ -0,0 +1,217 @@
+# Parallel training for the Q-Learning Security Bot
+# A whole squad of Kenobis training at once, all sharing one brain!
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import time
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import event_log
+from event_log import events
+from grid_env import GRID_SIZE, GridWorldEnv
+from q_agent import QLearningAgent
+from state_encoding import make_encoding, STATE_GETTERS
+from train import DENSE_STATE_LIMIT, TRAIN_PARAMS  # same settings as train(), so a parallel run learns the same way
+
+SCORE_CHUNK = 50  # workers send their scores home in chunks, not one message per episode
+POLL_SECONDS = 1.0  # how long the parent waits for a message before checking on the workers
+
+
+class WorkerError(RuntimeError):
+    """A training worker raised an exception or died."""
+
+
+def _attach(name, shape, dtype):
+    """Open an existing shared memory block as a NumPy array."""
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _worker(worker_id, values_name, visited_name, shape, dtype, state_kind, grid_size, params,
+            episodes, max_steps, seed, results):
+    """
+    One Kenobi in the squad. Plays its own episodes against its own env and
+    writes Q-updates straight into the shared table (Hogwild style - no locks,
+    the occasional lost update is fine for tabular Q-learning).
+    """
+    values_shm, values = _attach(values_name, shape, dtype)
+    visited_shm, visited = _attach(visited_name, (shape[0],), np.bool_)
+    try:
+        _train_worker(worker_id, values, visited, state_kind, grid_size, params, episodes, max_steps, seed, results)
+    except BaseException:
+        # tell the parent what went wrong instead of leaving it waiting for a "done" that never comes
+        results.put((worker_id, "error", traceback.format_exc()))
+        raise
+    finally:
+        # every view into the shared buffers has to go before we can close them
+        del values, visited
+        try:
+            values_shm.close()
+            visited_shm.close()
+        except BufferError:
+            pass  # a traceback still holds a view - the process is on its way out anyway
+
+
+def _train_worker(worker_id, values, visited, state_kind, grid_size, params, episodes, max_steps, seed, results):
+    """The episodes of one worker, learning straight into the shared arrays."""
+    agent = QLearningAgent(**params, encoding=make_encoding(state_kind, grid_size), seed=seed)
+    try:
+        agent.q_table.set_values(values, visited)
+        env = GridWorldEnv(seed=seed, grid_size=grid_size)
+        get_state = getattr(env, STATE_GETTERS[state_kind])
+
+        scores = []
+        for _ in range(episodes):
+            env.reset()
+            state = get_state()
+            for _ in range(max_steps):
+                action = agent.choose_action(state)
+                _, reward, done = env.step(action)
+                next_state = get_state()
+                agent.learn(state, action, reward, next_state, done)
+                state = next_state
+                if done:
+                    break
+            agent.decay_epsilon()
+            scores.append(env.score)
+            if len(scores) >= SCORE_CHUNK:
+                results.put((worker_id, scores, agent.epsilon))
+                scores = []
+        results.put((worker_id, scores, agent.epsilon))
+        results.put((worker_id, None, agent.epsilon))  # this Kenobi is done!
+    finally:
+        agent.q_table.set_values(np.zeros((0, 4)), np.zeros(0, dtype=bool))  # drop the views into shared memory
+
+
+def _check_workers(processes):
+    """Raise WorkerError if any worker process has exited with an error or was killed."""
+    for worker_id, process in enumerate(processes):
+        code = process.exitcode
+        if code is None or code == 0:
+            continue
+        how = f"was killed by signal {-code}" if code < 0 else f"exited with code {code}"
+        raise WorkerError(f"worker {worker_id} (pid {process.pid}) {how} before finishing its episodes")
+
+
+def train_parallel(episodes=1000, workers=None, max_steps=30, state_kind="simple",
+                   seed=0, report_every=100, filename="q_table.qtb", grid_size=GRID_SIZE):
+    """
+    Train with several worker processes sharing one Q-table in shared memory.
+
+    Episodes are split evenly across the workers, every worker gets its own
+    seed (spawned from one SeedSequence so runs are reproducible), and the
+    scores are gathered here for the usual "Ep N | Avg Score" progress line.
+    The shared table is dense, so grid_size and state_kind must fit in
+    train.DENSE_STATE_LIMIT states.
+    """
+    workers = workers or os.cpu_count() or 1
+    encoding = make_encoding(state_kind, grid_size)
+    if encoding.n_states > DENSE_STATE_LIMIT:
+        raise ValueError(f"the {state_kind!r} view of a {grid_size}x{grid_size} grid has {encoding.n_states:,} states - "
+                         f"too many for a shared dense table (limit {DENSE_STATE_LIMIT:,}); use train.py --max-states")
+    agent = QLearningAgent(**TRAIN_PARAMS, encoding=encoding)
+    table = agent.q_table
+    shape, dtype = table.values.shape, table.values.dtype
+
+    print(f"\n=== Starting Parallel Training: {episodes} episodes on {workers} workers ===\n")
+
+    values_shm = shared_memory.SharedMemory(create=True, size=table.values.nbytes)
+    visited_shm = shared_memory.SharedMemory(create=True, size=table.visited.nbytes)
+    processes = []
+    try:
+        shared_values = np.ndarray(shape, dtype=dtype, buffer=values_shm.buf)
+        shared_visited = np.ndarray((shape[0],), dtype=np.bool_, buffer=visited_shm.buf)
+        shared_values[:] = 0.0
+        shared_visited[:] = False
+
+        seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(workers)]
+        results = mp.Queue()
+        start = time.perf_counter()
+        for worker_id in range(workers):
+            worker_episodes = episodes // workers + (1 if worker_id < episodes % workers else 0)
+            process = mp.Process(
+                target=_worker,
+                args=(worker_id, values_shm.name, visited_shm.name, shape, dtype.str, state_kind,
+                      grid_size, TRAIN_PARAMS, worker_episodes, max_steps, seeds[worker_id], results),
+            )
+            process.start()
+            processes.append(process)
+
+        # Gather scores from the squad as they come in
+        total_scores = []
+        worker_epsilon = {}
+        finished = 0
+        next_report = report_every
+        last_check = time.perf_counter()
+        while finished < workers:
+            # a worker that dies without a word would leave us waiting forever - look in on them
+            # now and then, even while the others keep the queue busy
+            if time.perf_counter() - last_check >= POLL_SECONDS:
+                _check_workers(processes)
+                last_check = time.perf_counter()
+            try:
+                worker_id, scores, epsilon = results.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                continue
+            if scores == "error":
+                raise WorkerError(f"worker {worker_id} failed:\n{epsilon}")
+            worker_epsilon[worker_id] = epsilon
+            if scores is None:
+                finished += 1
+                continue
+            total_scores.extend(scores)
+            while len(total_scores) >= next_report:
+                window = total_scores[next_report - report_every:next_report]
+                avg = sum(window) / len(window)
+                mean_eps = sum(worker_epsilon.values()) / len(worker_epsilon)
+                events.info("progress", "Ep {episode:3d} | Avg Score: {avg:.1f} | Epsilon: {epsilon:.2f}",
+                            episode=next_report, avg=avg, epsilon=mean_eps)
+                next_report += report_every
+
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        # Copy the shared brain into the agent before the shared memory goes away
+        table.values[:] = shared_values
+        table.visited[:] = shared_visited
+        del shared_values, shared_visited
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        values_shm.close()
+        values_shm.unlink()
+        visited_shm.close()
+        visited_shm.unlink()
+
+    events.flush(summary=True)
+    agent.epsilon = min(worker_epsilon.values()) if worker_epsilon else agent.epsilon
+    overall = sum(total_scores) / len(total_scores) if total_scores else 0.0
+    print(f"\nTrained {len(total_scores)} episodes in {elapsed:.2f}s "
+          f"({len(total_scores) / elapsed:.0f} episodes/sec) | Overall Avg Score: {overall:.2f}")
+    agent.save(filename)
+    return agent
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train Kenobi with several processes at once")
+    parser.add_argument("--episodes", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to the number of CPUs")
+    parser.add_argument("--max-steps", type=int, default=30)
+    parser.add_argument("--state", choices=sorted(STATE_GETTERS), default="simple")
+    parser.add_argument("--grid-size", type=int, default=GRID_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report-every", type=int, default=100)
+    parser.add_argument("--output", default="q_table.qtb")
+    event_log.add_verbosity_arguments(parser)
+    args = parser.parse_args()
+    event_log.configure_from_args(args)
+    train_parallel(episodes=args.episodes, workers=args.workers, max_steps=args.max_steps,
+                   state_kind=args.state, seed=args.seed, report_every=args.report_every,
+                   filename=args.output, grid_size=args.grid_size)
@@ -0,0 +1,336 @@
+# Frozen policies for the Security Bot
+# Kenobi's finished brain, boiled down to a cheat sheet: one look-up per move!
+"""
+compile_policy(agent) turns a trained QLearningAgent into a GreedyPolicy: the
+best action of every state, worked out once (ties go to the lowest action, so
+the same state always gets the same move). Acting is then a single list
+look-up - no Q-values, no max(), no random tie-breaking, no table inserts.
+
+    policy = compile_policy(agent, kind="simple")
+    policy.save("kenobi.kpol")
+    ...
+    policy = load_policy("kenobi.kpol")      # needs only NumPy, no learning code
+    action = policy.act(env.get_simple_state())
+    actions = policy.act_batch(states)       # (N, k) states or (N,) encoded rows
+
+Views too big for a flat array (or dict agents without a known view) compile
+to a SparsePolicy: a dict of the states the agent has seen.
+
+File layout (little-endian), same idea as checkpoint.py:
+
+    b"KPOL" | uint16 version | uint32 header length | JSON header | zero padding
+    data from the next 64-byte boundary:
+        greedy: actions (n_states,) int8
+        sparse: states (n_states, state_width) int64, then actions (n_states,) int8
+
+Usage:
+    python policy.py compile q_table.qtb kenobi.kpol   # checkpoint -> policy
+    python policy.py run kenobi.kpol --episodes 1000   # fast policy-only rollouts
+"""
+import argparse
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+from grid_env import GridWorldEnv, GRID_SIZE
+from state_encoding import StateEncoding, STATE_GETTERS, make_encoding
+
+MAGIC = b"KPOL"
+VERSION = 1
+ALIGNMENT = 64
+DENSE_POLICY_LIMIT = 10_000_000  # bigger views compile to a SparsePolicy
+
+_PREAMBLE = struct.Struct("<4sHI")  # magic, version, header length
+
+
+class PolicyError(ValueError):
+    """Raised when a policy file is not one we can read."""
+
+
+class GreedyPolicy:
+    """
+    One action per encoded state in a flat int8 array.
+    act() is rebuilt as a closure over a plain list - the fastest look-up Python has.
+    """
+
+    def __init__(self, encoding, actions):
+        actions = np.asarray(actions, dtype=np.int8)
+        if actions.shape != (encoding.n_states,):
+            raise ValueError(f"expected {encoding.n_states} actions for {encoding!r}, got shape {actions.shape}")
+        self.encoding = encoding
+        self.kind = encoding.name
+        self.grid_size = encoding.grid_size
+        self.actions = actions
+        self._build_act()
+
+    def _build_act(self):
+        lookup = self.actions.tolist()
+        encode = self.encoding.encode
+
+        def act(state):
+            return lookup[encode(state)]
+        self.act = act
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("act", None)  # closures don't pickle - rebuilt on load
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build_act()
+
+    def __len__(self):
+        return len(self.actions)
+
+    def __repr__(self):
+        return f"GreedyPolicy({self.kind!r}, grid_size={self.grid_size}, n_states={len(self)})"
+
+    def act(self, state):
+        """Action for one state tuple (replaced by the closure from _build_act)."""
+        return int(self.actions[self.encoding.encode(state)])
+
+    def act_batch(self, states):
+        """Actions for an (N, k) array of state tuples or an (N,) array of encoded rows."""
+        states = np.asarray(states, dtype=np.int64)
+        indices = states if states.ndim == 1 else self.encoding.encode_batch(states)
+        return self.actions[indices].astype(np.int64)
+
+    def _header(self):
+        encoding = self.encoding
+        return {
+            "policy": "greedy",
+            "encoding": {
+                "name": encoding.name,
+                "grid_size": encoding.grid_size,
+                "dims": list(encoding.dims),
+                "offsets": list(encoding.offsets),
+            },
+            "n_states": len(self),
+        }
+
+    def _write_data(self, f):
+        self.actions.tofile(f)
+
+    def save(self, filename):
+        _write_policy(self, filename)
+
+
+class SparsePolicy:
+    """
+    Actions for just the states Kenobi has seen; everything else gets default_action.
+    kind and grid_size are remembered (when known) so rollouts know which view to feed it.
+    """
+
+    def __init__(self, table, default_action=0, kind=None, grid_size=None):
+        self.table = dict(table)
+        self.default_action = default_action
+        self.kind = kind
+        self.grid_size = grid_size
+        self._build_act()
+
+    def _build_act(self):
+        get = self.table.get
+        default = self.default_action
+
+        def act(state):
+            return get(state, default)
+        self.act = act
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("act", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build_act()
+
+    def __len__(self):
+        return len(self.table)
+
+    def __repr__(self):
+        return f"SparsePolicy({self.kind!r}, grid_size={self.grid_size}, n_states={len(self)})"
+
+    def act(self, state):
+        """Action for one state tuple (replaced by the closure from _build_act)."""
+        return self.table.get(state, self.default_action)
+
+    def act_batch(self, states):
+        """Actions for an (N, k) array of state tuples."""
+        get = self.table.get
+        default = self.default_action
+        return np.array([get(tuple(s), default) for s in np.asarray(states).tolist()], dtype=np.int64)
+
+    def _header(self):
+        width = len(next(iter(self.table))) if self.table else 0
+        return {
+            "policy": "sparse",
+            "kind": self.kind,
+            "grid_size": self.grid_size,
+            "default_action": self.default_action,
+            "n_states": len(self),
+            "state_width": width,
+        }
+
+    def _write_data(self, f):
+        if not self.table:
+            return
+        np.array(list(self.table), dtype=np.int64).tofile(f)
+        np.array(list(self.table.values()), dtype=np.int8).tofile(f)
+
+    def save(self, filename):
+        _write_policy(self, filename)
+
+
+# ---- compiling --------------------------------------------------------------
+
+def _first_best(values):
+    """Greedy action per row, ties -> lowest action (np.argmax already does that)."""
+    return np.asarray(values).argmax(axis=1).astype(np.int8)
+
+
+def compile_policy(agent, kind=None, grid_size=None, dense_limit=DENSE_POLICY_LIMIT):
+    """
+    Freeze agent's greedy choices. Dense agents compile straight from their array.
+    Dict agents need kind (and grid_size, default GRID_SIZE) to get a flat
+    array; without kind, or when the view has more than dense_limit states, the
+    result is a SparsePolicy over the states in the table. Never-seen states act
+    like an all-zero row: action 0.
+    """
+    if agent.encoding is not None:
+        return GreedyPolicy(agent.encoding, _first_best(agent.q_table.values))
+
+    table = agent.q_table
+    states = list(table.keys())
+    values = np.array([table[s] for s in states], dtype=np.float64).reshape(-1, 4)
+    best = _first_best(values)
+    if kind is not None:
+        encoding = make_encoding(kind, grid_size or GRID_SIZE)
+        if encoding.n_states <= dense_limit:
+            actions = np.zeros(encoding.n_states, dtype=np.int8)
+            if states:
+                actions[encoding.encode_batch(np.array(states, dtype=np.int64))] = best
+            return GreedyPolicy(encoding, actions)
+        grid_size = encoding.grid_size
+    return SparsePolicy(zip(states, best.tolist()), kind=kind, grid_size=grid_size)
+
+
+# ---- files ------------------------------------------------------------------
+
+def _data_offset(header_length):
+    end = _PREAMBLE.size + header_length
+    return (end + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _write_policy(policy, filename):
+    header_bytes = json.dumps(policy._header()).encode("utf-8")
+    offset = _data_offset(len(header_bytes))
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (offset - f.tell()))
+        policy._write_data(f)
+    os.replace(tmp_filename, filename)
+
+
+def load_policy(filename):
+    """Read a GreedyPolicy or SparsePolicy saved with .save()."""
+    with open(filename, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) != _PREAMBLE.size:
+            raise PolicyError(f"{filename} is too short to be a policy")
+        magic, version, header_length = _PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise PolicyError(f"{filename} is not a Kenobi policy (magic {magic!r})")
+        if version != VERSION:
+            raise PolicyError(f"{filename} has policy version {version}, expected {VERSION}")
+        header = json.loads(f.read(header_length).decode("utf-8"))
+        f.seek(_data_offset(header_length))
+        n_states = header["n_states"]
+        if header["policy"] == "greedy":
+            spec = header["encoding"]
+            encoding = StateEncoding(spec["name"], spec["dims"], spec["offsets"], spec["grid_size"])
+            actions = np.fromfile(f, dtype=np.int8, count=n_states)
+            if len(actions) != n_states:
+                raise PolicyError(f"{filename} is truncated")
+            return GreedyPolicy(encoding, actions)
+        width = header["state_width"]
+        states = np.fromfile(f, dtype=np.int64, count=n_states * width).reshape(n_states, width)
+        actions = np.fromfile(f, dtype=np.int8, count=n_states)
+        if len(actions) != n_states:
+            raise PolicyError(f"{filename} is truncated")
+        return SparsePolicy(zip(map(tuple, states.tolist()), actions.tolist()),
+                            header["default_action"], header["kind"], header["grid_size"])
+
+
+# ---- rollouts ---------------------------------------------------------------
+
+def rollout(policy, episodes=100, max_steps=30, seed=None, kind=None, grid_size=None):
+    """
+    Play episodes with the frozen policy on a headless GridWorldEnv - nothing
+    else in the loop. Returns one score (foods eaten) per episode.
+    """
+    kind = kind or policy.kind
+    if kind is None:
+        raise ValueError("this policy doesn't know its state view - pass kind=")
+    env = GridWorldEnv(seed=seed, grid_size=grid_size or policy.grid_size or GRID_SIZE)
+    get_state = getattr(env, STATE_GETTERS[kind])
+    act, step, reset = policy.act, env.step, env.reset
+    scores = []
+    for _ in range(episodes):
+        reset()
+        for _ in range(max_steps):
+            if step(act(get_state()))[2]:
+                break
+        scores.append(env.score)
+    return scores
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile and run Kenobi's frozen policies")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("compile", help="checkpoint -> policy file")
+    build.add_argument("checkpoint")
+    build.add_argument("output")
+    build.add_argument("--state", choices=list(STATE_GETTERS), default=None,
+                       help="state view of a dict checkpoint (dense ones know theirs)")
+    build.add_argument("--grid-size", type=int, default=None)
+
+    run = commands.add_parser("run", help="policy-only rollouts, as fast as they go")
+    run.add_argument("policy")
+    run.add_argument("--episodes", type=int, default=1000)
+    run.add_argument("--max-steps", type=int, default=30)
+    run.add_argument("--seed", type=int, default=None)
+    run.add_argument("--state", choices=list(STATE_GETTERS), default=None,
+                     help="state view, for sparse policies compiled without one")
+    run.add_argument("--grid-size", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "compile":
+        from q_agent import QLearningAgent  # only compiling needs the learning code
+        agent = QLearningAgent()
+        if not agent.load(args.checkpoint):
+            parser.error(f"no checkpoint at {args.checkpoint}")
+        policy = compile_policy(agent, args.state, args.grid_size)
+        policy.save(args.output)
+        print(f"Compiled {policy!r} to {args.output}")
+        return
+
+    policy = load_policy(args.policy)
+    if (args.state or policy.kind) is None:
+        parser.error(f"{args.policy} doesn't record its state view - pass --state")
+    start = time.perf_counter()
+    scores = rollout(policy, args.episodes, args.max_steps, args.seed, args.state, args.grid_size)
+    elapsed = time.perf_counter() - start
+    print(f"{policy!r}: {len(scores)} episodes in {elapsed:.2f}s "
+          f"({len(scores) / elapsed:,.0f} episodes/s) | avg score {sum(scores) / len(scores):.2f}")
+
+
+if __name__ == "__main__":
+    main()
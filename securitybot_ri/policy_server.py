@@ -0,0 +1,498 @@
+# Policy server for the Security Bot
+# Kenobi answers the phone! Other programs ask him what to do, he looks it up once for all of them.
+"""
+An asyncio daemon that loads a checkpoint once and answers "what would Kenobi
+do?" for any number of local clients, over a Unix socket or localhost TCP.
+
+    python policy_server.py serve q_table.qtb --socket /tmp/kenobi.sock
+    python policy_server.py serve q_table.qtb --port 8765 --watch 2
+    python policy_server.py query --socket /tmp/kenobi.sock 1 0  -1 1
+    python policy_server.py bench --socket /tmp/kenobi.sock --clients 32
+
+Protocol: one JSON object per line each way. Requests carry an optional "id"
+that is echoed back, so a client may pipeline several on one connection.
+
+    {"id": 7, "op": "act", "states": [[1, 0], [-1, 1]]}
+        -> {"id": 7, "actions": [1, 0], "q_values": [[...4 floats...], ...]}
+    {"op": "reload"}                 re-read the checkpoint (or {"path": "other.qtb"})
+    {"op": "stats"}                  latency percentiles, throughput, batch sizes
+    {"op": "ping"}
+
+"act" requests that arrive close together are coalesced into one micro-batch
+(up to --max-batch states, or whatever came in within --max-delay ms) and
+answered with a single vectorized table look-up. Greedy ties go to the lowest
+action, same as policy.compile_policy. Reloads build the new table in a
+worker thread and swap it in between batches - connections stay open and no
+request is dropped. SIGHUP also triggers a reload.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import time
+
+import numpy as np
+
+import checkpoint
+from q_agent import QLearningAgent
+from state_encoding import STATE_GETTERS
+from telemetry import Timer
+from event_log import events
+import event_log
+
+DEFAULT_MAX_BATCH = 1024   # states per micro-batch
+DEFAULT_MAX_DELAY = 0.002  # seconds the first request of a batch may wait for company
+
+
+class RequestError(ValueError):
+    """A request the server can't answer - reported back to that client only."""
+
+
+def _fail(items, exc):
+    """Hand exc to every (states, future) still waiting for an answer."""
+    for _, future in items:
+        if not future.done():
+            future.set_exception(exc)
+
+
+class TableModel:
+    """
+    Read-only view of a checkpoint for serving: states in, greedy actions and
+    Q-values out. Lookups never insert rows; unknown dict states get zeros.
+    """
+
+    def __init__(self, path):
+        agent = QLearningAgent()
+        checkpoint.load_checkpoint(agent, path, mmap=True)  # silent, and instant for dense tables
+        self.path = path
+        self.loaded_at = time.time()
+        self.encoding = agent.encoding
+        if agent.encoding is not None:
+            self.values = agent.q_table.values
+            self.state_width = len(agent.encoding.dims)
+            self._low = -np.array(agent.encoding.offsets, dtype=np.int64)
+            self._high = self._low + np.array(agent.encoding.dims, dtype=np.int64)
+        else:
+            self.table = agent.q_table
+            first = next(iter(self.table), None)
+            self.state_width = None if first is None else len(first)
+
+    def describe(self):
+        info = {"path": self.path, "loaded_at": self.loaded_at}
+        if self.encoding is not None:
+            info.update(backend="dense", state=self.encoding.name, grid_size=self.encoding.grid_size,
+                        n_states=self.encoding.n_states)
+        else:
+            info.update(backend="dict", n_states=len(self.table))
+        return info
+
+    def check(self, states):
+        """Validate one request's states - a bad request must not spoil its batch."""
+        try:
+            states = np.asarray(states, dtype=np.int64)
+        except (TypeError, ValueError, OverflowError):
+            raise RequestError("states must be a list of integer lists")
+        if states.ndim != 2 or (self.state_width is not None and states.shape[1] != self.state_width):
+            raise RequestError(f"states must be a list of {self.state_width}-element lists")
+        if self.encoding is not None and ((states < self._low) | (states >= self._high)).any():
+            raise RequestError(f"state outside the {self.encoding.name!r} view")
+        return states
+
+    def evaluate(self, states):
+        """(N, k) states -> (actions (N,), Q-values (N, 4))."""
+        if self.encoding is not None:
+            q_values = np.asarray(self.values[self.encoding.encode_batch(states)], dtype=np.float64)
+        else:
+            get = self.table.get
+            zeros = [0.0] * 4
+            q_values = np.array([get(state, zeros) for state in map(tuple, states.tolist())], dtype=np.float64)
+            q_values = q_values.reshape(-1, 4)
+        return q_values.argmax(axis=1), q_values
+
+
+class PolicyServer:
+    """
+    The daemon: connections, the micro-batcher, reloads and stats.
+
+    path      - checkpoint to serve (and to re-read on reload)
+    max_batch - states per micro-batch
+    max_delay - seconds to hold a batch open waiting for more requests
+    watch     - poll the checkpoint's mtime every this many seconds and reload on change
+    """
+
+    def __init__(self, path, max_batch=DEFAULT_MAX_BATCH, max_delay=DEFAULT_MAX_DELAY, watch=None):
+        self.path = path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.watch = watch
+        self.model = TableModel(path)
+        self.latency = Timer("request")          # arrival -> answer written
+        self.batch_latency = Timer("batch")      # one vectorized look-up
+        self.batches = 0
+        self.requests = 0
+        self.states_served = 0
+        self.reloads = 0
+        self.started = time.monotonic()
+        self._pending = None    # asyncio.Queue of (states, future), made inside the loop
+        self._server = None
+        self._tasks = []
+        self._reload_lock = None
+
+    # ---- batching ------------------------------------------------------------
+
+    async def _batcher(self):
+        queue = self._pending
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await queue.get()]
+            try:
+                size = len(items[0][0])
+                deadline = loop.time() + self.max_delay
+                while size < self.max_batch:
+                    if queue.empty():
+                        timeout = deadline - loop.time()
+                        if timeout <= 0:
+                            break
+                        try:
+                            item = await asyncio.wait_for(queue.get(), timeout)
+                        except asyncio.TimeoutError:
+                            break
+                    else:
+                        item = queue.get_nowait()
+                    items.append(item)
+                    size += len(item[0])
+                self._answer(items)
+            except Exception as exc:  # the batcher must outlive any one batch - only its clients hear about it
+                _fail(items, exc)
+
+    def _answer(self, items):
+        model = self.model  # a reload swaps this between batches, never during one
+        # check every request again against the model answering it: a reload may have
+        # changed the view since act() checked it, and an empty dict table takes any width
+        groups = {}  # state width -> [(states, future)]
+        for states, future in items:
+            if future.done():
+                continue  # the client went away
+            try:
+                states = model.check(states)
+            except RequestError as exc:
+                future.set_exception(exc)
+                continue
+            groups.setdefault(states.shape[1], []).append((states, future))
+        for group in groups.values():
+            self._answer_group(model, group)
+
+    def _answer_group(self, model, items):
+        """One vectorized look-up for requests whose states all have the same width."""
+        start = time.perf_counter_ns()
+        try:
+            states = items[0][0] if len(items) == 1 else np.concatenate([states for states, _ in items])
+            actions, q_values = model.evaluate(states)
+        except Exception as exc:  # keep serving - every waiting client hears about it
+            _fail(items, exc)
+            return
+        self.batch_latency.record(time.perf_counter_ns() - start)
+        self.batches += 1
+        first = 0
+        for request_states, future in items:
+            last = first + len(request_states)
+            if not future.done():  # the client may have gone away
+                future.set_result((actions[first:last], q_values[first:last]))
+            first = last
+
+    async def act(self, states):
+        """Queue one request's states for the next micro-batch and wait for the answer."""
+        states = self.model.check(states)
+        if not len(states):
+            return np.zeros(0, dtype=np.int64), np.zeros((0, 4))
+        future = asyncio.get_running_loop().create_future()
+        await self._pending.put((states, future))
+        return await future
+
+    # ---- reloads -------------------------------------------------------------
+
+    async def reload(self, path=None):
+        """Load a checkpoint in a worker thread, then swap it in."""
+        async with self._reload_lock:
+            path = path or self.path
+            model = await asyncio.to_thread(TableModel, path)
+            self.model = model
+            self.path = path
+            self.reloads += 1
+        events.info("reload", "Reloaded {path}", path=path)
+        return model.describe()
+
+    async def _watcher(self):
+        last = os.path.getmtime(self.path)
+        while True:
+            await asyncio.sleep(self.watch)
+            try:
+                mtime = max(os.path.getmtime(self.path),
+                            os.path.getmtime(checkpoint.delta_filename(self.path))
+                            if os.path.exists(checkpoint.delta_filename(self.path)) else 0.0)
+            except OSError:
+                continue  # mid-replace - try again next time
+            if mtime != last:
+                last = mtime
+                try:
+                    await self.reload()
+                except Exception as exc:
+                    events.warning("reload", "Reload failed, still serving the old table: {error}", error=exc)
+
+    # ---- connections ---------------------------------------------------------
+
+    async def _handle(self, reader, writer):
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                arrived = time.perf_counter_ns()
+                task = asyncio.create_task(self._respond(line, writer, arrived))
+                tasks.add(task)  # requests on one connection run concurrently (pipelining)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, line, writer, arrived):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            reply = await self._dispatch(request)
+        except (RequestError, ValueError, KeyError, TypeError, OSError) as exc:
+            reply = {"error": str(exc)}
+        if request_id is not None:
+            reply["id"] = request_id
+        try:
+            writer.write(json.dumps(reply).encode("utf-8") + b"\n")
+            await writer.drain()
+        except ConnectionError:
+            return
+        self.latency.record(time.perf_counter_ns() - arrived)
+
+    async def _dispatch(self, request):
+        op = request.get("op", "act")
+        if op == "act":
+            actions, q_values = await self.act(request["states"])
+            self.requests += 1
+            self.states_served += len(actions)
+            return {"actions": actions.tolist(), "q_values": q_values.tolist()}
+        if op == "reload":
+            return {"reloaded": await self.reload(request.get("path"))}
+        if op == "stats":
+            return self.stats()
+        if op == "ping":
+            return {"pong": True}
+        raise RequestError(f"unknown op {op!r}")
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started
+        latency = self.latency.summary()
+        return {
+            "model": self.model.describe(),
+            "uptime_s": elapsed,
+            "requests": self.requests,
+            "states": self.states_served,
+            "requests_per_s": self.requests / elapsed if elapsed else 0.0,
+            "states_per_s": self.states_served / elapsed if elapsed else 0.0,
+            "latency_us": {key: latency[key] for key in ("mean_us", "p50_us", "p90_us", "p99_us", "max_us")},
+            "batches": self.batches,
+            "mean_batch_size": self.states_served / self.batches if self.batches else 0.0,
+            "batch_us": self.batch_latency.summary()["mean_us"],
+            "reloads": self.reloads,
+        }
+
+    # ---- lifecycle -----------------------------------------------------------
+
+    async def start(self, socket_path=None, host="127.0.0.1", port=8765):
+        self._pending = asyncio.Queue()
+        self._reload_lock = asyncio.Lock()
+        self._tasks.append(asyncio.create_task(self._batcher()))
+        if self.watch:
+            self._tasks.append(asyncio.create_task(self._watcher()))
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)  # left over from a previous run
+            self._server = await asyncio.start_unix_server(self._handle, path=socket_path)
+            where = socket_path
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+            where = "{}:{}".format(*self._server.sockets[0].getsockname()[:2])
+        events.info("serve", "Kenobi is serving {path} on {where}", path=self.path, where=where)
+        return self._server
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def serve_forever(self, socket_path=None, host="127.0.0.1", port=8765):
+        await self.start(socket_path, host, port)
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.ensure_future(self.reload()))
+        await stop.wait()
+        await self.close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+        return self.stats()
+
+
+class PolicyClient:
+    """
+    Small blocking client for simulators and dashboards.
+
+        client = PolicyClient(socket_path="/tmp/kenobi.sock")
+        actions, q_values = client.choose_actions([(1, 0), (-1, 1)])
+    """
+
+    def __init__(self, socket_path=None, host="127.0.0.1", port=8765, timeout=5.0):
+        if socket_path:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(socket_path)
+        else:
+            self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.file = self.sock.makefile("rwb")
+        self._next_id = 0
+
+    def request(self, **request):
+        self._next_id += 1
+        request["id"] = self._next_id
+        self.file.write(json.dumps(request).encode("utf-8") + b"\n")
+        self.file.flush()
+        reply = json.loads(self.file.readline())
+        if "error" in reply:
+            raise RequestError(reply["error"])
+        return reply
+
+    def choose_actions(self, states):
+        reply = self.request(op="act", states=[list(s) for s in states])
+        return reply["actions"], reply["q_values"]
+
+    def choose_action(self, state):
+        return self.choose_actions([state])[0][0]
+
+    def reload(self, path=None):
+        return self.request(op="reload", path=path)["reloaded"]
+
+    def stats(self):
+        return self.request(op="stats")
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+async def _bench(socket_path, host, port, clients, requests, states_per_request, state_kind, grid_size):
+    """Hammer a running server from many concurrent connections."""
+    from state_encoding import make_encoding
+    encoding = make_encoding(state_kind, grid_size)
+    rng = np.random.default_rng(0)
+
+    async def one_client():
+        if socket_path:
+            reader, writer = await asyncio.open_unix_connection(socket_path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        for i in range(requests):
+            states = encoding.decode_batch(rng.integers(0, encoding.n_states, size=states_per_request))
+            writer.write(json.dumps({"id": i, "states": states.tolist()}).encode("utf-8") + b"\n")
+            await writer.drain()
+            reply = json.loads(await reader.readline())
+            if "error" in reply:
+                raise RequestError(reply["error"])
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_client() for _ in range(clients)))
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Kenobi's policy to other local processes")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_address(command):
+        command.add_argument("--socket", default=None, help="Unix socket path (default: localhost TCP)")
+        command.add_argument("--host", default="127.0.0.1")
+        command.add_argument("--port", type=int, default=8765)
+
+    serve = commands.add_parser("serve", help="run the daemon")
+    serve.add_argument("checkpoint")
+    add_address(serve)
+    serve.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="states per micro-batch")
+    serve.add_argument("--max-delay", type=float, default=DEFAULT_MAX_DELAY * 1000,
+                       help="ms a micro-batch waits for more requests")
+    serve.add_argument("--watch", type=float, default=None, metavar="SECONDS",
+                       help="reload whenever the checkpoint changes (polled)")
+    event_log.add_verbosity_arguments(serve)
+
+    query = commands.add_parser("query", help="ask a running server about some states")
+    add_address(query)
+    query.add_argument("values", type=int, nargs="*", help="state values, e.g. '1 0 -1 1' for two simple states")
+    query.add_argument("--width", type=int, default=2, help="values per state")
+    query.add_argument("--stats", action="store_true", help="print the server's stats instead")
+    query.add_argument("--reload", action="store_true", help="tell the server to reload its checkpoint")
+
+    bench = commands.add_parser("bench", help="load-test a running server")
+    add_address(bench)
+    bench.add_argument("--clients", type=int, default=32)
+    bench.add_argument("--requests", type=int, default=200, help="requests per client")
+    bench.add_argument("--states", type=int, default=1, help="states per request")
+    bench.add_argument("--state", choices=list(STATE_GETTERS), default="simple")
+    bench.add_argument("--grid-size", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        event_log.configure_from_args(args)
+        server = PolicyServer(args.checkpoint, args.max_batch, args.max_delay / 1000, args.watch)
+        stats = asyncio.run(server.serve_forever(args.socket, args.host, args.port))
+        print(json.dumps(stats, indent=2))
+        return
+
+    if args.command == "bench":
+        elapsed = asyncio.run(_bench(args.socket, args.host, args.port, args.clients, args.requests,
+                                     args.states, args.state, args.grid_size))
+        total = args.clients * args.requests
+        print(f"{total} requests from {args.clients} clients in {elapsed:.2f}s ({total / elapsed:,.0f} requests/s)")
+        client = PolicyClient(args.socket, args.host, args.port)
+        print(json.dumps(client.stats(), indent=2))
+        client.close()
+        return
+
+    client = PolicyClient(args.socket, args.host, args.port)
+    try:
+        if args.reload:
+            print(json.dumps(client.reload(), indent=2))
+        elif args.stats or not args.values:
+            print(json.dumps(client.stats(), indent=2))
+        else:
+            if len(args.values) % args.width:
+                parser.error(f"{len(args.values)} values don't split into states of {args.width}")
+            states = [args.values[i:i + args.width] for i in range(0, len(args.values), args.width)]
+            try:
+                actions, q_values = client.choose_actions(states)
+            except RequestError as exc:
+                parser.exit(1, f"error: {exc}\n")
+            for state, action, q in zip(states, actions, q_values):
+                print(f"{tuple(state)} -> {action}  Q={[round(v, 2) for v in q]}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
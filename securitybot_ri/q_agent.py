@@ -1,12 +1,22 @@
 # Q-Learning Agent for the Security Bot
 # This is Kenobi's brain! Where all the learning happens!
+import heapq
+import math
 import random
-import pickle  # for saving Kenobi's brain to disk
 import os
+import numpy as np
+from q_tables import DenseQTable, SparseQTable
+import checkpoint  # for saving Kenobi's brain to disk
+
+PLANNING_MODES = ("sweeping", "dyna")
+
 
 class QLearningAgent:
     # The brains behind Kenobi's food-finding abilities!
-    def __init__(self, learning_rate=0.1, discount=0.95, epsilon=1.0, epsilon_decay=0.995, epsilon_min=0.01):
+    def __init__(self, learning_rate=0.1, discount=0.95, epsilon=1.0, epsilon_decay=0.995, epsilon_min=0.01,
+                 encoding=None, dtype=np.float64, seed=None, max_states=None, eviction="lru",
+                 planning_steps=0, planning="sweeping", planning_threshold=1e-4,
+                 trace_lambda=0.0, trace_threshold=0.01, exploration_bonus=0.0):
         """
         Q-Learning agent for the robot.
 
@@ -16,20 +26,103 @@ class QLearningAgent:
             epsilon: Exploration rate (starts high, decays over time)
             epsilon_decay: How fast epsilon decreases
             epsilon_min: Minimum exploration rate
+            encoding: Optional StateEncoding - stores Q-values in a dense NumPy array
+                      instead of a dict (the dict is kept for unbounded state spaces)
+            dtype: Array dtype for the dense table (np.float32 halves the memory)
+            seed: Seed for Kenobi's own random generators (None = fresh entropy)
+            max_states: Without an encoding, cap the dict at this many states (SparseQTable) -
+                        for huge grids where even the seen states won't all fit in RAM
+            eviction: Which states make room when the capped table is full ("lru" or "least-visited")
+            planning_steps: Extra Q-updates replayed from a learned model after every learn()
+                            call (0 = plain Q-learning)
+            planning: "sweeping" replays the (state, action) pairs with the biggest TD error
+                      first (prioritized sweeping), "dyna" replays random ones (Dyna-Q)
+            planning_threshold: Sweeping ignores pairs whose TD error is smaller than this
+            trace_lambda: > 0 turns learn() into Watkins Q(lambda) - every step also credits
+                          the recently visited (state, action) pairs (0 = one-step Q-learning)
+            trace_threshold: Eligibility traces that decay below this are dropped
+            exploration_bonus: > 0 makes greedy choices try every move of a state once, then
+                               favour rarely tried ones by exploration_bonus / sqrt(times tried)
+                               (only when choosing - the Q-values themselves are left alone).
+                               Planning needs it: rehearsal lifts tried moves far above untried
+                               ones still at 0, and those would never get a turn otherwise
         """
-        self.q_table = {}  # Maps state -> [Q-values for each action] - Kenobi's memory!
+        if planning not in PLANNING_MODES:
+            raise ValueError(f"unknown planning mode {planning!r}, expected one of {PLANNING_MODES}")
+        if not 0.0 <= trace_lambda <= 1.0:
+            raise ValueError(f"trace_lambda must be between 0 and 1, got {trace_lambda}")
+        self.encoding = encoding
+        self.dirty_states = set()  # dict backend: states changed since the last save
+        self.evicted_states = set()  # capped table: states evicted since the last save (None = too many to list)
+        if encoding is None and max_states is not None:
+            # bounded memory - old states get evicted (and forgotten by incremental saves)
+            self.q_table = SparseQTable(max_states, eviction, on_evict=self._forget_state)
+        elif encoding is None:
+            self.q_table = {}  # Maps state -> [Q-values for each action] - Kenobi's memory!
+        else:
+            self.q_table = DenseQTable(encoding, dtype)  # state index -> row of Q-values
         self.lr = learning_rate  # how fast Kenobi learns from mistakes
         self.discount = discount  # how much Kenobi cares about future rewards
         self.epsilon = epsilon  # how often Kenobi tries random stuff
         self.epsilon_decay = epsilon_decay  # Kenobi gets less random over time
         self.epsilon_min = epsilon_min  # Kenobi always stays a little curious!
         self.actions = [0, 1, 2, 3]  # up, down, left, right - Kenobi's movement options!
+        self.rng = random.Random(seed)  # dice for single decisions
+        self.np_rng = np.random.default_rng(seed)  # dice for whole batches
+
+        # Kenobi's imagination: what each move has led to so far, so he can rehearse it
+        self.planning_steps = planning_steps
+        self.planning = planning
+        self.planning_threshold = planning_threshold
+        self.model = {}         # (state, action) -> {(reward, next_state, done): times seen}
+        self.model_counts = {}  # (state, action) -> times tried
+        self.predecessors = {}  # state -> {(state, action): times it led there}
+        self._model_keys = []   # dyna: every modelled pair, for uniform sampling
+        self._model_slots = {}  # dyna: pair -> its position in _model_keys
+        self._queue = []        # sweeping: heap of (-priority, push number, pair)
+        self._queued = {}       # sweeping: pair -> priority of its live heap entry
+        self._pushes = 0
+
+        # Kenobi's short-term memory: which moves led here, and how much credit they still get
+        self.trace_lambda = trace_lambda
+        self.trace_threshold = trace_threshold
+        self.traces = {}         # dense: slot -> trace; dict: (state, action) -> (trace, Q-value row)
+        self._trace_state = None  # where the last traced step ended
+
+        # Kenobi's curiosity: moves he has hardly tried look a bit better than they are
+        self.exploration_bonus = exploration_bonus
+        self.tries = {}  # (state, action) -> times learned from, only counted with a bonus
 
     def get_q_values(self, state):
         """Get Q-values for a state, initializing if needed."""
-        if state not in self.q_table:
-            self.q_table[state] = [0.0, 0.0, 0.0, 0.0]
-        return self.q_table[state]
+        if self.encoding is not None:
+            index = self.encoding.encode(state)
+            self.q_table.seen[index] = True
+            return self.q_table.values[index]
+        q_values = self.q_table.get(state)  # one lookup (and a counted visit for a SparseQTable)
+        if q_values is None:
+            q_values = self.q_table[state] = [0.0, 0.0, 0.0, 0.0]
+            self.dirty_states.add(state)
+        return q_values
+
+    def _forget_state(self, state):
+        """A SparseQTable evicted state - nothing left to save (or rehearse) for it."""
+        self.dirty_states.discard(state)
+        if self.evicted_states is not None:
+            # incremental saves tell the checkpoint to drop it; past max_states of them a full save is cheaper
+            self.evicted_states.add(state)
+            if len(self.evicted_states) > self.q_table.max_states:
+                self.evicted_states = None
+        if self.traces:
+            for action in self.actions:
+                self.traces.pop((state, action), None)
+        if self.model:
+            for action in self.actions:
+                self._forget_pair((state, action))
+            self.predecessors.pop(state, None)
+        if self.tries:
+            for action in self.actions:
+                self.tries.pop((state, action), None)
 
     def choose_action(self, state):
         """
@@ -37,24 +130,184 @@ class QLearningAgent:
         Explores randomly with probability epsilon, otherwise picks best action.
         Kenobi decides: should I try something new or stick with what works?
         """
-        if random.random() < self.epsilon:
+        if self.rng.random() < self.epsilon:
             # Explore: random action - Kenobi is feeling adventurous!
-            return random.choice(self.actions)
+            return self.rng.choice(self.actions)
         else:
             # Exploit: best known action - Kenobi uses his training!
-            q_values = self.get_q_values(state)
+            if self.encoding is not None:
+                index = self.encoding.encode(state)
+                table = self.q_table
+                table.seen[index] = True
+                flat = table.flat
+                base = index * 4
+                # four single reads beat building a sliced memoryview and calling tolist()
+                q_values = [flat[base], flat[base + 1], flat[base + 2], flat[base + 3]]
+            else:
+                q_values = self.get_q_values(state)
+            if self.exploration_bonus:
+                q_values = self._with_bonus(state, q_values)
             max_q = max(q_values)
+            if q_values.count(max_q) == 1:
+                return q_values.index(max_q)  # one clear winner, no need to build a list
             # If multiple actions have same Q-value, pick randomly among them
             # Kenobi flips a coin when he's equally confident about multiple moves
             best_actions = [a for a, q in enumerate(q_values) if q == max_q]
-            return random.choice(best_actions)
+            return self.rng.choice(best_actions)
+
+    def _with_bonus(self, state, q_values):
+        """Q-values plus the curiosity bonus - a new list, the table keeps the real values."""
+        bonus = self.exploration_bonus
+        tries = self.tries
+        lifted = []
+        for action, q in enumerate(q_values):
+            count = tries.get((state, action), 0)
+            lifted.append(q + bonus / math.sqrt(count) if count else math.inf)  # untried moves come first
+        return lifted
+
+    def _state_indices(self, states):
+        """Batch of states -> int array of table rows (dense backend only)."""
+        states = np.asarray(states, dtype=np.int64)
+        if states.ndim == 1:
+            return states  # already encoded
+        return self.encoding.encode_batch(states)
+
+    def choose_actions(self, states):
+        """
+        Epsilon-greedy choice for a whole batch of states at once.
+        States are an (N, k) array of state tuples, or an (N,) array of encoded
+        indices when using a dense table. Ties are broken randomly per state.
+        Returns an (N,) int array of actions.
+        """
+        if self.encoding is None:
+            # Dict backend can't vectorize - one decision at a time
+            return np.array([self.choose_action(tuple(s)) for s in np.asarray(states).tolist()], dtype=np.int64)
+
+        indices = self._state_indices(states)
+        n = len(indices)
+        self.q_table.visited[indices] = True
+        q_values = self.q_table.values[indices]
+
+        # Random tie-breaking: give every tied-best action a random key, take the biggest
+        ties = q_values == q_values.max(axis=1, keepdims=True)
+        keys = self.np_rng.random(q_values.shape)
+        keys[~ties] = -1.0
+        greedy = keys.argmax(axis=1)
+
+        explore = self.np_rng.random(n) < self.epsilon
+        random_actions = self.np_rng.integers(0, len(self.actions), size=n)
+        return np.where(explore, random_actions, greedy)
+
+    def learn_batch(self, states, actions, rewards, next_states, dones, weights=None):
+        """
+        Q-learning update for a whole batch of transitions.
+
+        All targets are computed from the Q-values as they were before the batch.
+        When the same (state, action) shows up k times, it gets one update toward
+        the mean of its targets with step 1 - (1 - lr)^k - exactly what k
+        sequential updates toward that target would do, instead of the last
+        write silently winning.
+        weights (e.g. importance weights from prioritized replay) scale each
+        transition's learning rate; the grouped step becomes 1 - prod(1 - lr * w).
+        Returns the TD error of every transition (handy for prioritized replay).
+        Dense tables do this with array operations; dict tables (capped or not)
+        make the same grouped update in one Python pass over the batch.
+        """
+        if self.encoding is None:
+            return self._learn_batch_dict(states, actions, rewards, next_states, dones, weights)
+
+        table = self.q_table
+        indices = self._state_indices(states)
+        next_indices = self._state_indices(next_states)
+        actions = np.asarray(actions, dtype=np.int64)
+        rewards = np.asarray(rewards, dtype=np.float64)
+        dones = np.asarray(dones, dtype=bool)
+        table.visited[indices] = True
+        table.visited[next_indices] = True
+        table.dirty[indices] = True
+
+        values = table.values
+        next_max = values[next_indices].max(axis=1)
+        targets = rewards + self.discount * np.where(dones, 0.0, next_max)
+        slots = indices * len(self.actions) + actions
+        flat_values = values.reshape(-1)
+        td_errors = targets - flat_values[slots]
+
+        # Group duplicate (state, action) pairs so none of their updates are lost
+        unique_slots, inverse, counts = np.unique(slots, return_inverse=True, return_counts=True)
+        if weights is None:
+            mean_targets = np.bincount(inverse, weights=targets) / counts
+            step = 1.0 - (1.0 - self.lr) ** counts
+        else:
+            weights = np.asarray(weights, dtype=np.float64)
+            mean_targets = np.bincount(inverse, weights=weights * targets) / np.bincount(inverse, weights=weights)
+            step = 1.0 - np.exp(np.bincount(inverse, weights=np.log1p(-np.minimum(self.lr * weights, 1.0 - 1e-12))))
+        old_q = flat_values[unique_slots]
+        flat_values[unique_slots] = old_q + step * (mean_targets - old_q)
+        return td_errors
+
+    def _learn_batch_dict(self, states, actions, rewards, next_states, dones, weights):
+        """learn_batch() for the dict / SparseQTable backends - the same grouped update, one Python pass."""
+        lr = self.lr
+        discount = self.discount
+        weights = [1.0] * len(actions) if weights is None else np.asarray(weights, dtype=np.float64).tolist()
+        td_errors = []
+        groups = {}  # (state, action) -> [weight sum, weighted target sum, prod(1 - lr * w), Q-value row]
+        # every target reads the table as it was before the batch - the writes all wait for the second loop
+        for state, action, reward, next_state, done, weight in zip(
+                map(tuple, np.asarray(states).tolist()), np.asarray(actions).tolist(),
+                np.asarray(rewards).tolist(), map(tuple, np.asarray(next_states).tolist()),
+                np.asarray(dones).tolist(), weights):
+            q_values = self.get_q_values(state)
+            target = reward if done else reward + discount * max(self.get_q_values(next_state))
+            td_errors.append(target - q_values[action])
+            group = groups.get((state, action))
+            if group is None:
+                groups[(state, action)] = [weight, weight * target, 1.0 - min(lr * weight, 1.0), q_values]
+            else:
+                group[0] += weight
+                group[1] += weight * target
+                group[2] *= 1.0 - min(lr * weight, 1.0)
+                group[3] = q_values  # latest row, in case a capped table swapped it out meanwhile
+        dirty = self.dirty_states
+        for (state, action), (weight_sum, target_sum, keep, q_values) in groups.items():
+            if not weight_sum:
+                continue  # only zero-weight samples - nothing to learn
+            old_q = q_values[action]
+            q_values[action] = old_q + (1.0 - keep) * (target_sum / weight_sum - old_q)
+            dirty.add(state)
+        return np.array(td_errors)
 
     def learn(self, state, action, reward, next_state, done):
         """
         Update Q-table using the Q-learning formula:
         Q(s,a) = Q(s,a) + lr * (reward + discount * max(Q(s')) - Q(s,a))
         This is where Kenobi's brain gets updated after each experience!
+        With planning_steps > 0 the transition also goes into Kenobi's model and
+        up to planning_steps imagined updates follow (see plan()).
+        With trace_lambda > 0 the update is Watkins Q(lambda) (see _learn_traced()).
+        Returns the TD error (target - old Q) so callers can track learning.
         """
+        if self.exploration_bonus:
+            pair = (state, action)
+            self.tries[pair] = self.tries.get(pair, 0) + 1
+        if not self.planning_steps:
+            return self._update(state, action, reward, next_state, done)
+        old_max = self._max_q(state)
+        td_error = self._update(state, action, reward, next_state, done)
+        self.plan(state, action, reward, next_state, done, self._max_q(state) - old_max)
+        return td_error
+
+    def _update(self, state, action, reward, next_state, done):
+        """One Q-learning update on whichever table Kenobi has."""
+        if self.trace_lambda:
+            return self._learn_traced(state, action, reward, next_state, done)
+        if self.encoding is not None:
+            return self._learn_dense(state, action, reward, next_state, done)
+        return self._learn_dict(state, action, reward, next_state, done)
+
+    def _learn_dict(self, state, action, reward, next_state, done):
+        """learn() for the dict / SparseQTable backends."""
         q_values = self.get_q_values(state)  # what did Kenobi think before?
         old_q = q_values[action]
 
@@ -70,27 +323,274 @@ class QLearningAgent:
         # Update Q-value - Kenobi adjusts his thinking based on what happened!
         # If the move was good, increase Q. If bad, decrease Q.
         q_values[action] = old_q + self.lr * (target - old_q)
+        self.dirty_states.add(state)
+        return target - old_q
+
+    def _learn_dense(self, state, action, reward, next_state, done):
+        """Same update as learn(), straight on the dense array rows."""
+        table = self.q_table
+        flat = table.flat
+        encode = self.encoding.encode
+        index = encode(state)
+        seen = table.seen
+        seen[index] = True
+        if done:
+            target = reward
+        else:
+            next_index = encode(next_state)
+            seen[next_index] = True
+            # max of the next row, read element by element - no slice object, no list
+            base = next_index * 4
+            best = flat[base]
+            q = flat[base + 1]
+            if q > best:
+                best = q
+            q = flat[base + 2]
+            if q > best:
+                best = q
+            q = flat[base + 3]
+            if q > best:
+                best = q
+            target = reward + self.discount * best
+        slot = index * 4 + action
+        old_q = flat[slot]
+        flat[slot] = old_q + self.lr * (target - old_q)
+        table.dirty_flags[index] = True
+        return target - old_q
+
+    # ---- eligibility traces (Watkins Q(lambda)) -----------------------------
+
+    def _learn_traced(self, state, action, reward, next_state, done):
+        """
+        Watkins Q(lambda): this step's TD error also updates every (state, action)
+        still holding an eligibility trace, so a reward reaches the moves that led
+        to it right away instead of trickling back one episode at a time.
+
+        Traces are replacing (a revisited pair goes back to 1), shrink by
+        discount * trace_lambda per step and are dropped below trace_threshold,
+        so only the last few dozen pairs are ever kept - the cost of a step
+        doesn't depend on how big the table is. They're cut when Kenobi explores
+        (the earlier moves didn't greedily lead on from here), at the end of an
+        episode, and whenever a step doesn't start where the last one ended.
+        learn_batch() and planning updates stay one-step.
+        """
+        traces = self.traces
+        if traces and state != self._trace_state:
+            traces.clear()  # a new episode (or someone else's transitions)
+        dense = self.encoding is not None
+        if dense:
+            table = self.q_table
+            flat = table.flat
+            index = self.encoding.encode(state)
+            table.seen[index] = True
+            base = index * 4
+            q_values = flat[base:base + 4].tolist()
+        else:
+            q_values = self.get_q_values(state)
+        old_q = q_values[action]
+        if old_q < max(q_values):
+            traces.clear()  # exploratory move - the greedy policy wouldn't have come this way
+
+        if done:
+            target = reward
+        elif dense:
+            next_index = self.encoding.encode(next_state)
+            table.seen[next_index] = True
+            base = next_index * 4
+            target = reward + self.discount * max(flat[base:base + 4].tolist())
+        else:
+            target = reward + self.discount * max(self.get_q_values(next_state))
+        td_error = target - old_q
+
+        step = self.lr * td_error
+        decay = self.discount * self.trace_lambda
+        threshold = self.trace_threshold
+        kept = {}
+        if dense:
+            traces[index * 4 + action] = 1.0
+            dirty = table.dirty_flags
+            for slot, trace in traces.items():
+                flat[slot] += step * trace
+                dirty[slot // 4] = True
+                trace *= decay
+                if trace >= threshold:
+                    kept[slot] = trace
+        else:
+            traces[(state, action)] = (1.0, q_values)  # the row itself, no second lookup
+            dirty = self.dirty_states
+            for pair, (trace, row) in traces.items():
+                row[pair[1]] += step * trace
+                dirty.add(pair[0])
+                trace *= decay
+                if trace >= threshold:
+                    kept[pair] = (trace, row)
+        self.traces = {} if done else kept
+        self._trace_state = next_state
+        return td_error
+
+    def reset_traces(self):
+        """Forget all eligibility traces - call it when a new episode starts."""
+        self.traces = {}
+        self._trace_state = None
+
+    # ---- planning (Dyna-Q / prioritized sweeping) ---------------------------
+
+    def plan(self, state, action, reward, next_state, done, value_change=0.0):
+        """
+        Count a real transition in the model, then make up to planning_steps
+        imagined updates - Kenobi rehearses moves in his head instead of walking
+        them again. learn() calls this (value_change is how much the real update
+        moved max Q(state)); learn_batch() doesn't, replay already revisits old
+        transitions. Returns how many imagined updates were made.
+
+        The model counts every outcome of each (state, action), so an imagined
+        update backs up the *expected* target. Kenobi's views hide where the next
+        food spawns, so the same move can end up in different states - replaying
+        just the latest outcome would rehearse noise.
+        """
+        pair = (state, action)
+        outcomes = self.model.get(pair)
+        if outcomes is None:
+            outcomes = self.model[pair] = {}
+            if self.planning == "dyna":
+                self._model_slots[pair] = len(self._model_keys)
+                self._model_keys.append(pair)
+        outcome = (reward, next_state, done)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        self.model_counts[pair] = self.model_counts.get(pair, 0) + 1
+        if not done:
+            leads_here = self.predecessors.setdefault(next_state, {})
+            leads_here[pair] = leads_here.get(pair, 0) + 1
+
+        if self.planning == "dyna":
+            keys = self._model_keys
+            randrange = self.rng.randrange
+            for _ in range(self.planning_steps):
+                self._backup(keys[randrange(len(keys))])
+            return self.planning_steps
+
+        # the real update only moved toward one sampled outcome, and it changed
+        # Q(state) - which ripples back to every pair that leads to state
+        self._push(pair, abs(self._expected_td_error(pair)))
+        self._queue_predecessors(state, value_change)
+        return self._sweep()
+
+    def _sweep(self):
+        """Back up the most surprising pairs first, queueing their predecessors as we go."""
+        queue, queued = self._queue, self._queued
+        updates = 0
+        while queue and updates < self.planning_steps:
+            priority, _, pair = heapq.heappop(queue)
+            if queued.get(pair) != -priority:
+                continue  # an outdated entry - the pair was re-queued or forgotten since
+            del queued[pair]
+            state = pair[0]
+            old_max = self._max_q(state)
+            self._backup(pair)
+            updates += 1
+            self._queue_predecessors(state, self._max_q(state) - old_max)
+        return updates
+
+    def _queue_predecessors(self, state, value_change):
+        """
+        Every pair that leads to state now has an error of about
+        discount * P(pair -> state) * |change in max Q(state)| - cheap to compute
+        from the counts, no need to back the pair up to find out.
+        """
+        pairs = self.predecessors.get(state)
+        if not pairs or not value_change:
+            return
+        change = self.discount * abs(value_change)
+        counts = self.model_counts
+        forgotten = []
+        for pair, count in pairs.items():
+            if pair in counts:
+                self._push(pair, change * count / counts[pair])
+            else:
+                forgotten.append(pair)  # its state was evicted from a capped table
+        for pair in forgotten:
+            del pairs[pair]
+
+    def _max_q(self, state):
+        if self.encoding is not None:
+            base = self.encoding.encode(state) * 4
+            return max(self.q_table.flat[base:base + 4].tolist())
+        q_values = self.q_table.get(state)  # no new rows while planning - they could evict the pair at hand
+        return 0.0 if q_values is None else max(q_values)
+
+    def _expected_td_error(self, pair):
+        """Expected target (over the model's outcomes) minus the current Q-value."""
+        discount = self.discount
+        max_q = self._max_q
+        target = 0.0
+        for (reward, next_state, done), count in self.model[pair].items():
+            target += count * (reward if done else reward + discount * max_q(next_state))
+        target /= self.model_counts[pair]
+        state, action = pair
+        if self.encoding is not None:
+            return target - self.q_table.flat[self.encoding.encode(state) * 4 + action]
+        return target - self.get_q_values(state)[action]
+
+    def _backup(self, pair):
+        """One imagined update of Q(pair) toward its expected target."""
+        td_error = self._expected_td_error(pair)
+        state, action = pair
+        if self.encoding is not None:
+            index = self.encoding.encode(state)
+            self.q_table.flat[index * 4 + action] += self.lr * td_error
+            self.q_table.dirty_flags[index] = True
+        else:
+            self.get_q_values(state)[action] += self.lr * td_error
+            self.dirty_states.add(state)
+        return td_error
+
+    def _push(self, pair, priority):
+        if priority < self.planning_threshold or priority <= self._queued.get(pair, 0.0):
+            return
+        self._queued[pair] = priority
+        self._pushes += 1
+        heapq.heappush(self._queue, (-priority, self._pushes, pair))
+        if len(self._queue) > 4 * len(self._queued) + 64:
+            # too many outdated entries - rebuild from the live ones
+            self._queue[:] = [entry for entry in self._queue if self._queued.get(entry[2]) == -entry[0]]
+            heapq.heapify(self._queue)
+
+    def _forget_pair(self, pair):
+        if self.model.pop(pair, None) is None:
+            return
+        del self.model_counts[pair]
+        self._queued.pop(pair, None)
+        slot = self._model_slots.pop(pair, None)
+        if slot is not None:
+            last = self._model_keys.pop()
+            if last != pair:  # move the last key into the hole
+                self._model_keys[slot] = last
+                self._model_slots[last] = slot
 
     def decay_epsilon(self):
         """Reduce exploration rate over time."""
         self.epsilon = max(self.epsilon_min, self.epsilon * self.epsilon_decay)
 
-    def save(self, filename="q_table.pkl"):
-        """Save Q-table to file."""
-        with open(filename, "wb") as f:
-            pickle.dump({
-                "q_table": self.q_table,
-                "epsilon": self.epsilon
-            }, f)
+    def save(self, filename="q_table.qtb", incremental=False):
+        """
+        Save Q-table to a binary checkpoint (see checkpoint.py for the format).
+        With incremental=True only the states changed since the last save are
+        appended to the checkpoint's delta log - cheap enough to call often.
+        """
+        if incremental and os.path.exists(filename):
+            count = checkpoint.append_delta(self, filename)
+            print(f"Saved {count} changed states to {checkpoint.delta_filename(filename)}")
+            return
+        checkpoint.save_checkpoint(self, filename)
         print(f"Saved Q-table ({len(self.q_table)} states) to {filename}")
 
-    def load(self, filename="q_table.pkl"):
-        """Load Q-table from file."""
+    def load(self, filename="q_table.qtb", mmap=False):
+        """
+        Load Q-table, epsilon and hyperparameters from a checkpoint.
+        mmap=True maps a dense table straight from disk so loading is instant.
+        """
         if os.path.exists(filename):
-            with open(filename, "rb") as f:
-                data = pickle.load(f)
-                self.q_table = data["q_table"]
-                self.epsilon = data["epsilon"]
+            checkpoint.load_checkpoint(self, filename, mmap=mmap)
             print(f"Loaded Q-table ({len(self.q_table)} states) from {filename}")
             return True
         return False
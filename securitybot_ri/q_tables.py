@@ -0,0 +1,220 @@
+# Q-table storage backends for the Security Bot
+# Different ways to store Kenobi's memories - a plain dict, a size-capped dict or one big NumPy array!
+from collections import OrderedDict
+
+import numpy as np
+
+NUM_ACTIONS = 4  # up, down, left, right
+
+
+class DenseQTable:
+    """
+    Q-values for every state in one contiguous (n_states, 4) array.
+
+    States are turned into row numbers by a StateEncoding, so lookups and
+    updates are plain array indexing - no per-state dict entries, tuples or
+    lists. Behaves enough like the old dict (len, in, keys, items, [state])
+    that code printing the table doesn't need to care which backend it has.
+    """
+
+    def __init__(self, encoding, dtype=np.float64):
+        self.encoding = encoding
+        self._init_dirty(encoding.n_states)
+        self.set_values(np.zeros((encoding.n_states, NUM_ACTIONS), dtype=dtype),
+                        np.zeros(encoding.n_states, dtype=bool))  # states Kenobi has seen
+
+    @classmethod
+    def from_arrays(cls, encoding, values, visited):
+        """Wrap existing arrays (e.g. memory-mapped from a checkpoint) without copying them."""
+        table = cls.__new__(cls)
+        table.encoding = encoding
+        table._init_dirty(len(visited))
+        table.set_values(values, visited)
+        return table
+
+    def _init_dirty(self, n_states):
+        # rows written since the last checkpoint, so incremental saves stay small
+        self.dirty = np.zeros(n_states, dtype=bool)
+        self.dirty_flags = memoryview(self.dirty)  # fast scalar writes into dirty
+        self.saved_visited = np.zeros(n_states, dtype=bool)
+
+    def changed_rows(self):
+        """Rows updated - or newly visited - since the last clear_dirty()."""
+        return np.flatnonzero(self.dirty | (self.visited != self.saved_visited))
+
+    def clear_dirty(self):
+        self.dirty[:] = False
+        self.saved_visited[:] = self.visited
+
+    def set_values(self, values, visited=None):
+        """Swap in a new (n_states, 4) array (and visited mask), e.g. a loaded or shared one."""
+        if visited is not None:
+            self.visited = visited
+            self.seen = memoryview(visited)  # fast scalar writes into visited
+        self.values = values
+        # Flat memoryview over the same buffer: single-element reads and writes
+        # through it skip NumPy's per-call overhead on the scalar hot path.
+        self.flat = memoryview(values.reshape(-1))
+
+    def __len__(self):
+        return int(np.count_nonzero(self.visited))
+
+    def __contains__(self, state):
+        return bool(self.visited[self.encoding.encode(state)])
+
+    def __getitem__(self, state):
+        index = self.encoding.encode(state)
+        if not self.visited[index]:
+            raise KeyError(state)
+        return self.values[index]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        """Decoded states that have been visited, in index order."""
+        return [self.encoding.decode(i) for i in np.flatnonzero(self.visited)]
+
+    def items(self):
+        return [(self.encoding.decode(i), self.values[i]) for i in np.flatnonzero(self.visited)]
+
+    def __getstate__(self):
+        # memoryviews can't be pickled - rebuild them from the arrays on load
+        return {"encoding": self.encoding, "values": self.values, "visited": self.visited}
+
+    def __setstate__(self, state):
+        self.encoding = state["encoding"]
+        self._init_dirty(len(state["visited"]))
+        self.set_values(state["values"], state["visited"])
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.visited.nbytes
+
+
+EVICTION_POLICIES = ("lru", "least-visited")
+
+
+class SparseQTable:
+    """
+    Dict-backed Q-table that never holds more than max_states states.
+
+    For state spaces far too big for a DenseQTable (the full view of a
+    512x512 grid has ~6.9e10 states) - only states Kenobi actually meets are
+    stored, and when the table is full the next new state pushes an old one out:
+
+    "lru"           - the state used longest ago goes (O(1) per eviction)
+    "least-visited" - the states with the fewest visits go, in small batches
+                      so finding them stays cheap
+
+    Lookups through get() are counted (hits, misses, visits per state), and
+    stats() reports them together with the evictions.
+    """
+
+    def __init__(self, max_states, eviction="lru", on_evict=None):
+        if max_states < 1:
+            raise ValueError(f"max_states must be at least 1, got {max_states}")
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"unknown eviction policy {eviction!r}, expected one of {EVICTION_POLICIES}")
+        self.max_states = max_states
+        self.eviction = eviction
+        self._rows = OrderedDict() if eviction == "lru" else {}
+        self.visits = {}  # state -> lookups; same insertion order as _rows
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_visits = 0  # visits the evicted states had collected
+        self._last = None        # last state handed out - never evicted under it
+        self._batch = max(1, max_states // 64)
+        self.on_evict = on_evict  # called with every evicted state
+
+    def get(self, state, default=None):
+        """Row for state (counted as a hit, or a miss if absent)."""
+        row = self._rows.get(state)
+        if row is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.visits[state] += 1
+        if self.eviction == "lru":
+            self._rows.move_to_end(state)
+        self._last = state
+        return row
+
+    def __setitem__(self, state, row):
+        rows = self._rows
+        if state in rows:
+            rows[state] = row
+            return
+        if len(rows) >= self.max_states:
+            self._evict()
+        rows[state] = row
+        self.visits[state] = 1
+        self._last = state
+
+    def _evict(self):
+        if self.eviction == "lru":
+            state, _ = self._rows.popitem(last=False)
+            self._forget(state)
+            return
+        # least-visited: one argpartition over the visit counts frees a whole batch
+        states = list(self.visits)
+        counts = np.fromiter(self.visits.values(), dtype=np.int64, count=len(states))
+        batch = min(self._batch + 1, len(states))
+        victims = np.argpartition(counts, batch - 1)[:batch]
+        victims = [states[i] for i in victims.tolist() if states[i] != self._last][:self._batch]
+        for state in victims:
+            del self._rows[state]
+            self._forget(state)
+
+    def _forget(self, state):
+        self.evicted_visits += self.visits.pop(state)
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(state)
+
+    def __getitem__(self, state):
+        return self._rows[state]
+
+    def __delitem__(self, state):
+        del self._rows[state]
+        del self.visits[state]
+
+    def __contains__(self, state):
+        return state in self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def keys(self):
+        return self._rows.keys()
+
+    def values(self):
+        return self._rows.values()
+
+    def items(self):
+        return self._rows.items()
+
+    def load(self, states, rows, visits=None):
+        """Bulk insert (e.g. from a checkpoint); evictions still apply past max_states."""
+        visits = [1] * len(states) if visits is None else visits
+        for state, row, count in zip(states, rows, visits):
+            self[state] = row
+            self.visits[state] = int(count)
+        self._last = None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "states": len(self._rows),
+            "max_states": self.max_states,
+            "eviction": self.eviction,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "mean_evicted_visits": self.evicted_visits / self.evictions if self.evictions else 0.0,
+        }
@@ -0,0 +1,103 @@
+# Canvas renderer for the Security Bot
+# Draws the grid once, then just slides Kenobi and his food around - no redraw churn!
+import time
+import tkinter as tk
+
+from grid_env import GRID_SIZE
+
+MIN_LINE_CELL = 4    # pixels per cell before grid lines are worth drawing
+MIN_LABEL_CELL = 20  # pixels per cell before the sprite labels fit
+
+
+class GridRenderer:
+    """
+    Keeps handles to every canvas item and updates them in place.
+
+    The grid lines are created once. Each frame only moves the robot and food
+    (canvas.coords) and changes the HUD text (itemconfigure).
+    frame_skip=k draws only every k-th frame, and target_fps caps how often
+    frames are drawn at all - handy for watching training at full speed.
+    """
+
+    def __init__(self, canvas, cell_size=25, grid_size=GRID_SIZE, frame_skip=1, target_fps=None):
+        if frame_skip < 1:
+            raise ValueError(f"frame_skip must be at least 1, got {frame_skip}")
+        self.canvas = canvas
+        self.cell_size = cell_size
+        self.grid_size = grid_size
+        self.frame_skip = frame_skip
+        self.target_fps = target_fps
+        self.frame_drawn = False  # did the last render() call actually draw?
+        self._frame = 0
+        self._last_draw = 0.0
+        self.build()
+
+    def build(self):
+        """(Re)create every canvas item: the static grid, then the sprites and HUD."""
+        canvas = self.canvas
+        cell = self.cell_size
+        width = cell * self.grid_size
+        canvas.delete("all")
+
+        # the grid never moves, so it's drawn exactly once
+        # (on huge grids the cells are too small for lines - it would just be black)
+        if cell >= MIN_LINE_CELL:
+            for i in range(self.grid_size + 1):
+                canvas.create_line(i * cell, 0, i * cell, width, fill="black")  # vertical
+                canvas.create_line(0, i * cell, width, i * cell, fill="black")  # horizontal
+        labels = cell >= MIN_LABEL_CELL  # "ROBOT" and "F" only fit in roomy cells
+
+        # food is a red square, Kenobi is a (neon) green one on top of it
+        self.food_rect = canvas.create_rectangle(0, 0, cell, cell, fill="red")
+        self.food_text = canvas.create_text(cell // 2, cell // 2, text="F" if labels else "", fill="white",
+                                            font=("Arial", 14, "bold"))
+        self.robot_rect = canvas.create_rectangle(0, 0, cell, cell, fill="green")
+        self.robot_text = canvas.create_text(cell // 2, cell // 2, text="ROBOT" if labels else "", fill="white",
+                                             font=("Arial", 12, "bold", "italic"))
+        self.hud = canvas.create_text(width // 2, width + 5, text="", fill="white",
+                                      font=("Arial", 9, "bold"))
+
+    def render(self, env, force=False):
+        """Draw env unless frame skipping / the FPS cap says to skip this frame."""
+        self._frame += 1
+        if not force:
+            if self._frame % self.frame_skip:
+                self.frame_drawn = False
+                return False
+            if self.target_fps:
+                now = time.perf_counter()
+                if now - self._last_draw < 1.0 / self.target_fps:
+                    self.frame_drawn = False
+                    return False
+        self.draw(env)
+        self._last_draw = time.perf_counter()
+        self.frame_drawn = True
+        return True
+
+    def draw(self, env):
+        """
+        Move the existing items to match env - anything with the robot/food
+        positions, score, episode_count and last_reward works (even a snapshot).
+        """
+        canvas = self.canvas
+        cell = self.cell_size
+        half = cell // 2
+        try:
+            fx = env.food_col * cell
+            fy = env.food_row * cell
+            canvas.coords(self.food_rect, fx, fy, fx + cell, fy + cell)
+            canvas.coords(self.food_text, fx + half, fy + half)
+
+            x = env.robot_col * cell
+            y = env.robot_row * cell
+            canvas.coords(self.robot_rect, x, y, x + cell, y + cell)
+            canvas.coords(self.robot_text, x + half, y + half)
+
+            dist = abs(env.robot_row - env.food_row) + abs(env.robot_col - env.food_col)
+            canvas.itemconfigure(
+                self.hud,
+                text=f"Ep: {env.episode_count} | Score: {env.score} | Dist: {dist} | Reward: {env.last_reward:.1f}",
+            )
+        except tk.TclError:
+            # window was closed during animation
+            pass
@@ -0,0 +1,170 @@
+# Experience replay for the Security Bot
+# Kenobi keeps a diary of his moves and studies it again and again!
+"""
+Fixed-size circular buffers of transitions, stored column by column in
+preallocated NumPy arrays - adding a transition writes five array slots and
+allocates nothing, sampling a minibatch is a handful of fancy-indexing calls.
+
+ReplayBuffer             - uniform sampling
+PrioritizedReplayBuffer  - samples transitions in proportion to |TD error|^alpha
+                           (sum tree, vectorized) and returns importance weights
+
+States are stored as encoded row numbers (state_width=None, for dense agents)
+or as int tuples of a fixed width (dict / sparse agents). Batches feed straight
+into QLearningAgent.learn_batch.
+"""
+import numpy as np
+
+
+class ReplayBuffer:
+    """
+    Circular buffer: once full, each new transition overwrites the oldest.
+
+    Args:
+        capacity: How many transitions to keep
+        state_width: Length of the state tuples, or None for encoded int states
+        seed: Seed for the sampling generator
+    """
+
+    def __init__(self, capacity, state_width=None, seed=None):
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+        shape = (capacity,) if state_width is None else (capacity, state_width)
+        self.capacity = capacity
+        self.states = np.zeros(shape, dtype=np.int64)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float64)
+        self.next_states = np.zeros(shape, dtype=np.int64)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.rng = np.random.default_rng(seed)
+        self.position = 0  # next slot to write
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, reward, next_state, done):
+        """Store one transition."""
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self.position = (i + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+        return i
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        """Store a whole batch of transitions (e.g. one BatchGridWorld step)."""
+        n = len(actions)
+        if n > self.capacity:  # only the newest capacity transitions would survive anyway
+            states, actions, rewards, next_states, dones = (
+                np.asarray(a)[-self.capacity:] for a in (states, actions, rewards, next_states, dones))
+            n = self.capacity
+        slots = (self.position + np.arange(n)) % self.capacity
+        self.states[slots] = states
+        self.actions[slots] = actions
+        self.rewards[slots] = rewards
+        self.next_states[slots] = next_states
+        self.dones[slots] = dones
+        self.position = int((self.position + n) % self.capacity)
+        self.size = min(self.size + n, self.capacity)
+        return slots
+
+    def sample(self, batch_size):
+        """
+        Uniform minibatch (with replacement).
+        Returns (slots, states, actions, rewards, next_states, dones, weights);
+        weights are all 1 here - they're there so both buffers look the same.
+        """
+        if self.size == 0:
+            raise ValueError("can't sample from an empty replay buffer")
+        slots = self.rng.integers(0, self.size, size=batch_size)
+        return self._batch(slots, np.ones(batch_size))
+
+    def _batch(self, slots, weights):
+        return (slots, self.states[slots], self.actions[slots], self.rewards[slots],
+                self.next_states[slots], self.dones[slots], weights)
+
+    def update_priorities(self, slots, td_errors):
+        """Uniform sampling ignores priorities."""
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Prioritized replay: transition i is drawn with probability p_i^alpha / sum p^alpha
+    where p_i = |TD error| + eps. New transitions get the current max priority so
+    they're seen at least once. beta controls the importance-sampling correction
+    (1 = fully unbiased) and can be annealed by the caller.
+
+    Priorities live in a sum tree (one flat array, leaves at the end), so
+    sampling and updates are O(log n) per transition and vectorized over the batch.
+    """
+
+    def __init__(self, capacity, state_width=None, seed=None, alpha=0.6, beta=0.4, eps=1e-3):
+        super().__init__(capacity, state_width, seed)
+        self.alpha = alpha
+        self.beta = beta
+        self.eps = eps
+        self.depth = max(1, (capacity - 1).bit_length())
+        self.leaves = 1 << self.depth  # power of two, at least 2
+        self.tree = np.zeros(2 * self.leaves, dtype=np.float64)  # tree[1] is the total
+        self.max_priority = 1.0
+
+    def add(self, state, action, reward, next_state, done):
+        i = super().add(state, action, reward, next_state, done)
+        self._set_one(i, self.max_priority ** self.alpha)
+        return i
+
+    def _set_one(self, slot, priority):
+        tree = self.tree
+        node = slot + self.leaves
+        change = priority - tree[node]
+        while node:
+            tree[node] += change
+            node >>= 1
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        slots = super().add_batch(states, actions, rewards, next_states, dones)
+        self._set_many(slots, np.full(len(slots), self.max_priority ** self.alpha))
+        return slots
+
+    def _set_many(self, slots, priorities):
+        tree = self.tree
+        nodes = np.asarray(slots) + self.leaves
+        tree[nodes] = priorities
+        # rebuild the parents level by level - a parent listed twice just
+        # gets the same sum written twice, so no need to deduplicate
+        for _ in range(self.depth):
+            nodes >>= 1
+            tree[nodes] = tree[2 * nodes] + tree[2 * nodes + 1]
+
+    def sample(self, batch_size):
+        """Prioritized minibatch plus normalized importance-sampling weights."""
+        if self.size == 0:
+            raise ValueError("can't sample from an empty replay buffer")
+        tree = self.tree
+        total = tree[1]
+        # stratified: one draw from each of batch_size equal slices of the total
+        targets = (np.arange(batch_size) + self.rng.random(batch_size)) * (total / batch_size)
+        nodes = np.ones(batch_size, dtype=np.int64)
+        for _ in range(self.depth):
+            nodes <<= 1
+            left = tree[nodes]
+            go_right = targets > left
+            targets -= left * go_right
+            nodes += go_right
+        slots = np.minimum(nodes - self.leaves, self.size - 1)  # float round-off can land past the end
+
+        probabilities = tree[slots + self.leaves] / total
+        weights = (self.size * probabilities) ** -self.beta
+        weights /= weights.max()
+        return self._batch(slots, weights)
+
+    def update_priorities(self, slots, td_errors):
+        """New priorities from the TD errors learn_batch returned for a sample."""
+        priorities = np.abs(td_errors) + self.eps
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self._set_many(slots, priorities ** self.alpha)
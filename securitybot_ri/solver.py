@@ -0,0 +1,325 @@
+# Exact solver for the Security Bot's grid world
+# No trial and error here - Kenobi's homework, solved with the answer key!
+"""
+Builds the MDP behind GridWorldEnv straight from its reward values (the
+REWARD_* constants, or the same overrides GridWorldEnv(rewards=...) takes) and
+solves it with NumPy-vectorized value iteration or policy iteration.
+
+The full state is (robot_row, robot_col, food_row, food_col):
+- a move off the grid costs REWARD_WALL and ends the episode
+- a move onto the food earns REWARD_FOOD and the food respawns uniformly
+  on any other cell
+- any other move earns REWARD_STEP plus REWARD_CLOSER / REWARD_FARTHER
+
+Nothing is stored per (state, action): rewards are broadcast from small
+(S, 1, S, 1) arrays and next states are array slices, so a sweep only needs a
+few arrays the size of the value table (S^4 entries, float32 works too).
+
+The result can seed a QLearningAgent (warm_start) and score any agent's
+greedy policy against the optimum (regret). Views that drop information
+(relative / simple) get the average optimal Q-values of the full states
+they cover.
+"""
+import numpy as np
+
+from grid_env import ACTION_DELTAS, GRID_SIZE, reward_values
+from state_encoding import make_encoding
+
+NUM_ACTIONS = len(ACTION_DELTAS)
+DEFAULT_DISCOUNT = 0.9  # same as train.TRAIN_PARAMS
+# S^4 states, and the optimal Q-values alone take 4 floats each - a 45x45 grid
+# already needs a few hundred MB, a 512x512 one would need terabytes
+MAX_SOLVER_STATES = 2 ** 22
+
+
+def check_size(grid_size, max_states=MAX_SOLVER_STATES):
+    """ValueError if the exact solution for grid_size is too big to build."""
+    n_states = grid_size ** 4
+    if n_states > max_states:
+        raise ValueError(f"the exact solver can't handle a {grid_size}x{grid_size} grid: {n_states:,} states, "
+                         f"limit {max_states:,} (about {int(max_states ** 0.25)}x{int(max_states ** 0.25)})")
+
+
+class GridMDP:
+    """The grid world's dynamics for one grid size (and reward values), as array operations."""
+
+    def __init__(self, grid_size=GRID_SIZE, discount=DEFAULT_DISCOUNT, dtype=np.float64, rewards=None):
+        check_size(grid_size)  # refuse before allocating anything
+        self.grid_size = S = grid_size
+        self.discount = discount
+        self.rewards = rewards = reward_values(rewards)
+        self.dtype = np.dtype(dtype)
+        self.shape = (S, S, S, S)
+        rows = np.arange(S)
+        # delta[r, f] = f - r: where the food is relative to Kenobi along one axis
+        delta = rows[None, :] - rows[:, None]
+        self.shaping = []  # per action, broadcastable to the full shape
+        self.moves = []    # per action: (source slices, destination slices) of valid moves
+        self.eaten = []    # per action: index arrays of the states where the move lands on the food
+        for d_row, d_col in ACTION_DELTAS:
+            if d_row:
+                closer = (delta * d_row > 0)[:, None, :, None]
+            else:
+                closer = (delta * d_col > 0)[None, :, None, :]
+            self.shaping.append(
+                (rewards["step"] + np.where(closer, rewards["closer"], rewards["farther"])).astype(self.dtype))
+            src_rows, dst_rows = _shift(S, d_row)
+            src_cols, dst_cols = _shift(S, d_col)
+            self.moves.append(((src_rows, src_cols), (dst_rows, dst_cols)))
+            r, c = np.meshgrid(rows[src_rows], rows[src_cols], indexing="ij")
+            r, c = r.ravel(), c.ravel()
+            self.eaten.append((r, c, r + d_row, c + d_col))
+        # every state where the food sits on Kenobi - can't happen, so it's ignored
+        self.valid = np.ones(self.shape, dtype=bool)
+        self.valid[rows[:, None], rows[None, :], rows[:, None], rows[None, :]] = False
+
+    def food_values(self, values):
+        """Expected value right after eating at (row, col): the food lands anywhere else."""
+        S = self.grid_size
+        flat = values.reshape(S * S, S * S)
+        cells = np.arange(S * S)
+        return ((flat.sum(axis=1) - flat[cells, cells]) / (S * S - 1)).reshape(S, S)
+
+    def action_values(self, values, action, out=None, food_values=None):
+        """Q(s, action) for every state, given state values V."""
+        if out is None:
+            out = np.empty(self.shape, dtype=self.dtype)
+        if food_values is None:
+            food_values = self.food_values(values)
+        gamma = self.discount
+        (src_rows, src_cols), (dst_rows, dst_cols) = self.moves[action]
+        out.fill(self.rewards["wall"])
+        shaping = np.broadcast_to(self.shaping[action], self.shape)
+        np.multiply(values[dst_rows, dst_cols], gamma, out=out[src_rows, src_cols])
+        out[src_rows, src_cols] += shaping[src_rows, src_cols]
+        r, c, food_r, food_c = self.eaten[action]
+        out[r, c, food_r, food_c] = self.rewards["food"] + gamma * food_values[food_r, food_c]
+        return out
+
+    def q_values(self, values):
+        """All four Q(s, a) as an (S, S, S, S, 4) array."""
+        food_values = self.food_values(values)
+        q = np.empty(self.shape + (NUM_ACTIONS,), dtype=self.dtype)
+        for action in range(NUM_ACTIONS):
+            q[..., action] = self.action_values(values, action, food_values=food_values)
+        return q
+
+    def greedy(self, values):
+        """One Bellman optimality backup: (max_a Q, argmax_a Q) - ties go to the lowest action."""
+        food_values = self.food_values(values)
+        best = np.full(self.shape, -np.inf, dtype=self.dtype)
+        policy = np.zeros(self.shape, dtype=np.int8)
+        q = np.empty(self.shape, dtype=self.dtype)
+        for action in range(NUM_ACTIONS):
+            self.action_values(values, action, out=q, food_values=food_values)
+            better = q > best
+            np.copyto(policy, action, where=better)
+            np.maximum(best, q, out=best)
+        return best, policy
+
+    def evaluate(self, policy, values=None, tol=1e-6, max_iterations=10_000):
+        """
+        V of a fixed policy (an (S, S, S, S) array of actions), by iterating its
+        Bellman equation with gathers - one action per state instead of four.
+        """
+        S = self.grid_size
+        gamma = self.discount
+        r, c, food_r, food_c = np.indices(self.shape, sparse=True)
+        d_row = np.array([d for d, _ in ACTION_DELTAS])[policy]
+        d_col = np.array([d for _, d in ACTION_DELTAS])[policy]
+        new_r, new_c = r + d_row, c + d_col
+        wall = (new_r < 0) | (new_r >= S) | (new_c < 0) | (new_c >= S)
+        eaten = ~wall & (new_r == food_r) & (new_c == food_c)
+        moves = ~wall & ~eaten
+        shaping = np.zeros(self.shape, dtype=self.dtype)
+        for action in range(NUM_ACTIONS):
+            np.copyto(shaping, np.broadcast_to(self.shaping[action], self.shape), where=policy == action)
+        rewards = self.rewards
+        reward = np.where(wall, rewards["wall"], np.where(eaten, rewards["food"], shaping)).astype(self.dtype)
+        food_r = np.broadcast_to(food_r, self.shape)
+        food_c = np.broadcast_to(food_c, self.shape)
+        next_index = np.ravel_multi_index((new_r[moves], new_c[moves], food_r[moves], food_c[moves]), self.shape)
+        eaten_cells = (new_r[eaten], new_c[eaten])
+
+        values = np.zeros(self.shape, dtype=self.dtype) if values is None else values.astype(self.dtype)
+        for _ in range(max_iterations):
+            new = reward.copy()
+            new[moves] += gamma * values.reshape(-1)[next_index]
+            new[eaten] += gamma * self.food_values(values)[eaten_cells]
+            delta = np.abs(new - values)[self.valid].max()
+            values = new
+            if delta < tol:
+                break
+        return values
+
+
+def _shift(size, delta):
+    """Slices (source, destination) for moving by delta along one axis of length size."""
+    if delta > 0:
+        return slice(0, size - delta), slice(delta, size)
+    if delta < 0:
+        return slice(-delta, size), slice(0, size + delta)
+    return slice(None), slice(None)
+
+
+class Solution:
+    """Optimal values and policy for one grid size, plus helpers to use them."""
+
+    def __init__(self, mdp, values, policy, iterations):
+        self.mdp = mdp
+        self.grid_size = mdp.grid_size
+        self.discount = mdp.discount
+        self.values = values   # (S, S, S, S) optimal state values
+        self.policy = policy   # (S, S, S, S) optimal actions
+        self.iterations = iterations
+        self._q = None
+
+    @property
+    def q(self):
+        """(S, S, S, S, 4) optimal Q-values, computed on first use."""
+        if self._q is None:
+            self._q = self.mdp.q_values(self.values)
+        return self._q
+
+    def action(self, state):
+        """Optimal action for a full state (robot_row, robot_col, food_row, food_col)."""
+        return int(self.policy[tuple(state)])
+
+    def project(self, kind):
+        """
+        Q-values for a state view, as (table, covered): an (n_states, 4) array in
+        make_encoding(kind) order and a mask of the rows some full state maps to.
+        """
+        encoding = make_encoding(kind, self.grid_size)
+        index = _view_indices(encoding, self.grid_size)[self.mdp.valid]
+        q = self.q[self.mdp.valid]
+        counts = np.bincount(index, minlength=encoding.n_states)
+        table = np.zeros((encoding.n_states, NUM_ACTIONS))
+        for action in range(NUM_ACTIONS):
+            table[:, action] = np.bincount(index, weights=q[:, action], minlength=encoding.n_states)
+        covered = counts > 0
+        table[covered] /= counts[covered, None]
+        return table, covered
+
+    def warm_start(self, agent, kind=None):
+        """
+        Fill agent's Q-table with the (projected) optimal Q-values.
+        Dense agents use their own encoding; dict agents need kind.
+        """
+        if agent.encoding is not None:
+            kind = agent.encoding.name
+            _check_grid(agent.encoding, self.grid_size)
+        elif kind is None:
+            raise ValueError("a dict-backed agent needs kind='simple', 'relative' or 'full'")
+        table, covered = self.project(kind)
+        if agent.encoding is not None:
+            q_table = agent.q_table
+            q_table.values[covered] = table[covered]
+            q_table.visited[covered] = True
+            q_table.dirty[covered] = True
+        else:
+            encoding = make_encoding(kind, self.grid_size)
+            for index in np.flatnonzero(covered).tolist():
+                state = encoding.decode(index)
+                agent.q_table[state] = table[index].tolist()
+                agent.dirty_states.add(state)
+        return int(covered.sum())
+
+    def greedy_policy(self, agent, kind=None):
+        """The agent's greedy action in every full state (ties -> lowest action)."""
+        if agent.encoding is not None:
+            encoding = agent.encoding
+            _check_grid(encoding, self.grid_size)
+            return agent.q_table.values[_view_indices(encoding, self.grid_size)].argmax(axis=-1).astype(np.int8)
+        if kind is None:
+            raise ValueError("a dict-backed agent needs kind='simple', 'relative' or 'full'")
+        encoding = make_encoding(kind, self.grid_size)
+        rows = np.zeros((encoding.n_states, NUM_ACTIONS))
+        for state, q_values in agent.q_table.items():
+            rows[encoding.encode(state)] = q_values
+        return rows[_view_indices(encoding, self.grid_size)].argmax(axis=-1).astype(np.int8)
+
+    def regret(self, agent_or_policy, kind=None):
+        """
+        How much discounted return a policy leaves on the table: V*(s) - V_pi(s).
+        Takes an agent (its greedy policy is used) or an (S, S, S, S) action array.
+        Returns {"start": mean over episode starts, "all": mean over every state}.
+        """
+        if isinstance(agent_or_policy, np.ndarray):
+            policy = agent_or_policy
+        else:
+            policy = self.greedy_policy(agent_or_policy, kind)
+        # tiny negative gaps are just evaluation tolerance
+        gap = np.maximum(self.values - self.mdp.evaluate(policy, values=self.values), 0.0)
+        valid = self.mdp.valid
+        start = self.grid_size // 2  # GridWorldEnv's start cell
+        start_gap = gap[start, start][valid[start, start]]
+        return {"start": float(start_gap.mean()), "all": float(gap[valid].mean())}
+
+    def action_regret(self, state, action):
+        """Q*(s, best) - Q*(s, action) for a single decision."""
+        q = self.q[tuple(state)]
+        return float(q.max() - q[action])
+
+
+def _view_indices(encoding, grid_size):
+    """Row of encoding's table for every full state, as an (S, S, S, S) int array."""
+    r, c, food_r, food_c = np.indices((grid_size,) * 4, sparse=True)
+    if encoding.name == "full":
+        views = (r, c, food_r, food_c)
+    elif encoding.name == "relative":
+        views = (food_r - r, food_c - c)
+    elif encoding.name == "simple":
+        views = (np.sign(food_r - r), np.sign(food_c - c))
+    else:
+        raise ValueError(f"don't know how to build the {encoding.name!r} view")
+    index = 0
+    for view, offset, stride in zip(views, encoding.offsets, encoding.strides):
+        index = index + (view + offset) * stride
+    return np.broadcast_to(index, (grid_size,) * 4)
+
+
+def _check_grid(encoding, grid_size):
+    if encoding.name != "simple" and encoding.grid_size != grid_size:
+        raise ValueError(f"agent encoding is for a {encoding.grid_size}x{encoding.grid_size} grid, "
+                         f"solution is for {grid_size}x{grid_size}")
+
+
+def solve(grid_size=GRID_SIZE, discount=DEFAULT_DISCOUNT, method="value", tol=1e-6,
+          max_iterations=10_000, dtype=np.float64, initial_values=None, rewards=None):
+    """
+    Solve the grid world exactly.
+    rewards overrides REWARD_* values like GridWorldEnv(rewards=...) - pass the
+    training env's, or regret is measured against a different problem.
+
+    method="value"  - value iteration: V <- max_a Q(V) until the largest change < tol
+    method="policy" - policy iteration: evaluate the policy, improve it, repeat until stable
+    initial_values warm-starts either method (e.g. a solution for a nearby discount).
+    """
+    mdp = GridMDP(grid_size, discount, dtype, rewards)
+    values = np.zeros(mdp.shape, dtype=mdp.dtype) if initial_values is None else initial_values.astype(mdp.dtype)
+
+    if method == "value":
+        for iteration in range(1, max_iterations + 1):
+            new, policy = mdp.greedy(values)
+            delta = np.abs(new - values)[mdp.valid].max()
+            values = new
+            if delta < tol:
+                break
+        _, policy = mdp.greedy(values)
+        return Solution(mdp, values, policy, iteration)
+
+    if method == "policy":
+        _, policy = mdp.greedy(values)
+        for iteration in range(1, max_iterations + 1):
+            new = mdp.evaluate(policy, values=values, tol=tol)
+            # near-ties can flip back and forth once the values are tol-accurate, so stop then too
+            settled = np.abs(new - values)[mdp.valid].max() < tol
+            values = new
+            _, new_policy = mdp.greedy(values)
+            if settled or np.array_equal(new_policy[mdp.valid], policy[mdp.valid]):
+                break
+            policy = new_policy
+        return Solution(mdp, values, policy, iteration)
+
+    raise ValueError(f"unknown method {method!r}, expected 'value' or 'policy'")
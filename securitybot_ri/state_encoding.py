@@ -0,0 +1,115 @@
+# State encodings for the Security Bot
+# Turns Kenobi's state tuples into row numbers so his brain can live in one flat array!
+import numpy as np
+
+from grid_env import GRID_SIZE
+
+# Which state view each encoding understands (matches the get_*_state functions)
+ENCODING_KINDS = ("simple", "relative", "full")
+
+# The GridWorldEnv method that produces each state view
+STATE_GETTERS = {
+    "simple": "get_simple_state",
+    "relative": "get_relative_state",
+    "full": "get_state",
+}
+
+
+class StateEncoding:
+    """
+    Mixed-radix encoding between state tuples and integers in [0, n_states).
+
+    Each tuple element v lives in [-offset, dim - offset), so the index is
+    built like a number where every digit has its own base.
+    """
+
+    def __init__(self, name, dims, offsets, grid_size=GRID_SIZE):
+        self.name = name
+        self.grid_size = grid_size
+        self.dims = tuple(dims)
+        self.offsets = tuple(offsets)
+        self.n_states = int(np.prod(self.dims, dtype=np.int64))
+        # stride of each digit, e.g. dims (3, 3) -> strides (3, 1)
+        strides = []
+        stride = 1
+        for dim in reversed(self.dims):
+            strides.append(stride)
+            stride *= dim
+        self.strides = tuple(reversed(strides))
+        self._strides_array = np.array(self.strides, dtype=np.int64)
+        self._offsets_array = np.array(self.offsets, dtype=np.int64)
+        self._build_fast_encode()
+
+    def _build_fast_encode(self):
+        # encode() runs on every choose_action/learn call, so 2- and 4-tuples
+        # get an unrolled version with all the offsets folded into one constant.
+        base = sum(offset * stride for offset, stride in zip(self.offsets, self.strides))
+        if len(self.dims) == 2:
+            s0 = self.strides[0]
+
+            def encode(state):
+                return state[0] * s0 + state[1] + base
+            self.encode = encode
+        elif len(self.dims) == 4:
+            s0, s1, s2, _ = self.strides
+
+            def encode(state):
+                a, b, c, d = state
+                return a * s0 + b * s1 + c * s2 + d + base
+            self.encode = encode
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("encode", None)  # closures don't pickle - rebuilt on load
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build_fast_encode()
+
+    def __repr__(self):
+        return f"StateEncoding({self.name!r}, grid_size={self.grid_size}, n_states={self.n_states})"
+
+    def encode(self, state):
+        """State tuple -> integer index."""
+        index = 0
+        for value, offset, stride in zip(state, self.offsets, self.strides):
+            index += (value + offset) * stride
+        return index
+
+    def decode(self, index):
+        """Integer index -> state tuple."""
+        index = int(index)
+        values = []
+        for offset, stride in zip(self.offsets, self.strides):
+            digit, index = divmod(index, stride)
+            values.append(digit - offset)
+        return tuple(values)
+
+    def encode_batch(self, states):
+        """(N, k) array of states -> (N,) array of indices."""
+        states = np.asarray(states, dtype=np.int64)
+        return (states + self._offsets_array) @ self._strides_array
+
+    def decode_batch(self, indices):
+        """(N,) array of indices -> (N, k) array of states."""
+        indices = np.asarray(indices, dtype=np.int64)
+        digits = (indices[:, None] // self._strides_array) % np.array(self.dims, dtype=np.int64)
+        return digits - self._offsets_array
+
+
+def make_encoding(kind, grid_size=GRID_SIZE):
+    """
+    Build the encoding for one of the state views:
+        "simple"   -> get_simple_state()   (dir_row, dir_col), 9 states
+        "relative" -> get_relative_state() (delta_row, delta_col)
+        "full"     -> get_state()          (robot_row, robot_col, food_row, food_col)
+    """
+    if kind == "simple":
+        return StateEncoding(kind, (3, 3), (1, 1), grid_size)
+    if kind == "relative":
+        span = 2 * grid_size - 1
+        return StateEncoding(kind, (span, span), (grid_size - 1, grid_size - 1), grid_size)
+    if kind == "full":
+        return StateEncoding(kind, (grid_size,) * 4, (0,) * 4, grid_size)
+    raise ValueError(f"Unknown state encoding {kind!r}, expected one of {ENCODING_KINDS}")
@@ -0,0 +1,359 @@
+# Hyperparameter sweeps for the Security Bot
+# Which settings make Kenobi learn best? Try lots of them at once and find out!
+"""
+Grid or random search over QLearningAgent settings, max_steps and the reward
+values, run in a process pool.
+
+    python sweep.py --param learning_rate=0.1,0.5,0.8 --param discount=0.9,0.95
+    python sweep.py --search random --samples 40 --param learning_rate=0.05:1 \\
+                    --param epsilon_decay=0.9:0.999 --param reward.wall=-20:-5 --repeats 3
+
+--param NAME=SPEC, where NAME is one of SWEEP_PARAMS (agent settings, max_steps,
+or reward.<food|step|wall|closer|farther>) and SPEC is a comma list of values,
+or LOW:HIGH (uniform, random search only; prefix "log:" for log-uniform).
+Everything not swept keeps train.TRAIN_PARAMS / the game's defaults.
+
+- Every trial gets its own seeds, spawned from one SeedSequence keyed by
+  (--seed, config hash, repeat), so trials are independent and reproducible.
+- Finished trials are cached as <cache>/<config hash>.json; a re-run (or a
+  bigger sweep overlapping an old one) only runs what's missing.
+- Every --check-every episodes a trial reports its average score so far (per
+  allowed step, so different max_steps compare fairly). Once enough trials
+  have reported at that point, one in the bottom --prune-quantile is stopped
+  early (a median-stopping style rule).
+- Trials are ranked by the greedy policy's score on a fixed evaluation (same
+  food sequence, default rewards and step limit for everyone), averaged over
+  repeats.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import event_log
+from event_log import events
+from grid_env import GridWorldEnv, GRID_SIZE, REWARD_NAMES
+from policy import compile_policy, rollout
+from q_agent import QLearningAgent
+from state_encoding import make_encoding, STATE_GETTERS
+from train import TRAIN_PARAMS
+
+AGENT_PARAMS = ("learning_rate", "discount", "epsilon", "epsilon_decay", "epsilon_min", "planning_steps",
+                "trace_lambda", "exploration_bonus")
+SWEEP_PARAMS = AGENT_PARAMS + ("max_steps",) + tuple(f"reward.{name}" for name in REWARD_NAMES)
+INT_PARAMS = ("planning_steps", "max_steps")
+CACHE_VERSION = 2  # bump when a trial's results would come out differently for the same config
+DEFAULT_CACHE = "sweep_cache"
+
+
+# ---- search space -----------------------------------------------------------
+
+def parse_param(text):
+    """'learning_rate=0.1,0.5' -> ('learning_rate', spec) with spec a list or a (low, high, log) range."""
+    name, sep, spec = text.partition("=")
+    name = name.strip()
+    if not sep or not spec:
+        raise ValueError(f"expected NAME=SPEC, got {text!r}")
+    if name not in SWEEP_PARAMS:
+        raise ValueError(f"can't sweep {name!r}, expected one of {', '.join(SWEEP_PARAMS)}")
+    cast = int if name in INT_PARAMS else float
+    if ":" in spec:
+        log = spec.startswith("log:")
+        low, high = (cast(v) for v in spec[4 if log else 0:].split(":"))
+        if log and (low <= 0 or high <= 0):
+            raise ValueError(f"log range for {name} needs positive bounds")
+        return name, (low, high, log)
+    return name, [cast(v) for v in spec.split(",")]
+
+
+def grid_configs(space):
+    """Every combination of the listed values."""
+    for name, spec in space.items():
+        if isinstance(spec, tuple):
+            raise ValueError(f"{name} is a range - grid search needs a list of values")
+    names = list(space)
+    for values in itertools.product(*(space[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def random_configs(space, samples, seed):
+    """samples draws; lists are sampled uniformly, ranges uniformly (or log-uniformly)."""
+    rng = np.random.default_rng(seed)
+    for _ in range(samples):
+        config = {}
+        for name, spec in space.items():
+            if isinstance(spec, list):
+                config[name] = spec[rng.integers(len(spec))]
+                continue
+            low, high, log = spec
+            value = math.exp(rng.uniform(math.log(low), math.log(high))) if log else rng.uniform(low, high)
+            config[name] = int(round(value)) if name in INT_PARAMS else float(value)
+        yield config
+
+
+def make_trial(params, episodes, state_kind, grid_size, seed, repeat):
+    """Full, hashable description of one trial - everything that affects its result."""
+    agent = dict(TRAIN_PARAMS, planning_steps=0)
+    rewards = {}
+    max_steps = 30
+    for name, value in params.items():
+        if name == "max_steps":
+            max_steps = value
+        elif name.startswith("reward."):
+            rewards[name[len("reward."):]] = value
+        else:
+            agent[name] = value
+    return {"agent": agent, "rewards": rewards, "max_steps": max_steps, "episodes": episodes,
+            "state": state_kind, "grid_size": grid_size, "seed": seed, "repeat": repeat}
+
+
+def config_hash(config):
+    text = json.dumps(config, sort_keys=True) + f"|v{CACHE_VERSION}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _group_key(config):
+    """Same settings, any repeat - trials that get averaged together."""
+    return config_hash({key: value for key, value in config.items() if key != "repeat"})
+
+
+# ---- one trial (runs in a worker process) -----------------------------------
+
+def _seeds(config):
+    entropy = [config["seed"], int(_group_key(config), 16) % 2**32, config["repeat"]]
+    agent_seq, env_seq = np.random.SeedSequence(entropy).spawn(2)
+    return int(agent_seq.generate_state(1)[0]), int(env_seq.generate_state(1)[0])
+
+
+def _should_prune(rungs, lock, episode, score, quantile, min_reports):
+    """Report score at this checkpoint; True if it's in the bottom quantile of the others."""
+    with lock:
+        others = list(rungs.get(episode, []))
+        rungs[episode] = others + [score]
+    return len(others) >= min_reports and score < np.quantile(others, quantile)
+
+
+def run_trial(config, cache_dir, rungs=None, lock=None, check_every=50, prune_quantile=0.25,
+              min_reports=4, eval_episodes=200):
+    """Train one Kenobi with config, evaluate his greedy policy, cache and return the result."""
+    start = time.perf_counter()
+    agent_seed, env_seed = _seeds(config)
+    state_kind, grid_size = config["state"], config["grid_size"]
+    encoding = make_encoding(state_kind, grid_size)
+    agent = QLearningAgent(**config["agent"], encoding=encoding, seed=agent_seed)
+    env = GridWorldEnv(seed=env_seed, grid_size=grid_size, rewards=config["rewards"])
+    get_state = getattr(env, STATE_GETTERS[state_kind])
+    choose, learn, reset, step = agent.choose_action, agent.learn, env.reset, env.step
+    max_steps = config["max_steps"]
+
+    scores = []
+    curve = {}
+    status = "complete"
+    for episode in range(1, config["episodes"] + 1):
+        reset()
+        state = get_state()
+        for _ in range(max_steps):
+            action = choose(state)
+            _, reward, done = step(action)
+            next_state = get_state()
+            learn(state, action, reward, next_state, done)
+            state = next_state
+            if done:
+                break
+        agent.decay_epsilon()
+        scores.append(env.score)
+        if episode % check_every == 0:
+            # the running average is far less noisy than the last few episodes,
+            # so a trial is only stopped when it has been behind for a while;
+            # foods per allowed step keeps trials with different max_steps comparable
+            average = float(np.mean(scores)) / max_steps
+            curve[episode] = average
+            if (rungs is not None and episode < config["episodes"]
+                    and _should_prune(rungs, lock, episode, average, prune_quantile, min_reports)):
+                status = "pruned"  # clearly behind the pack - stop paying for it
+                break
+
+    # everyone is judged on the same food sequence, default rewards and step limit
+    eval_scores = rollout(compile_policy(agent), episodes=eval_episodes, max_steps=30, seed=config["seed"])
+    result = {
+        "hash": config_hash(config),
+        "config": config,
+        "status": status,
+        "episodes_run": len(scores),
+        "train_score": float(np.mean(scores[-check_every:])) if scores else 0.0,
+        "eval_score": float(np.mean(eval_scores)),
+        "curve": curve,
+        "seconds": time.perf_counter() - start,
+    }
+    if cache_dir:
+        path = os.path.join(cache_dir, result["hash"] + ".json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(result, f)
+        os.replace(path + ".tmp", path)  # a killed sweep never leaves half a result behind
+    return result
+
+
+# ---- the sweep --------------------------------------------------------------
+
+def _load_cached(cache_dir, digest):
+    path = os.path.join(cache_dir, digest + ".json")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None  # unreadable - just run it again
+
+
+def run_sweep(param_sets, episodes=300, repeats=1, state_kind="simple", grid_size=GRID_SIZE, seed=0,
+              workers=None, cache_dir=DEFAULT_CACHE, check_every=50, prune_quantile=0.25, min_reports=4,
+              eval_episodes=200, retry_pruned=False):
+    """Run every (params, repeat) trial that isn't cached yet; return all results."""
+    configs = {}
+    for params in param_sets:
+        for repeat in range(repeats):
+            config = make_trial(params, episodes, state_kind, grid_size, seed, repeat)
+            configs.setdefault(config_hash(config), config)  # random search can draw a config twice
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    results, todo = [], []
+    for digest, config in configs.items():
+        cached = _load_cached(cache_dir, digest) if cache_dir else None
+        if cached is not None and not (retry_pruned and cached["status"] == "pruned"):
+            results.append(cached)
+        else:
+            todo.append(config)
+    events.info("sweep", "{total} trials: {cached} cached, {todo} to run",
+                total=len(configs), cached=len(results), todo=len(todo))
+    if not todo:
+        return results
+
+    manager = mp.Manager()
+    try:
+        rungs, lock = manager.dict(), manager.Lock()
+        for cached in results:  # finished trials set the bar too
+            for episode, score in cached["curve"].items():
+                episode = int(episode)
+                rungs[episode] = list(rungs.get(episode, [])) + [score]
+        options = dict(check_every=check_every, prune_quantile=prune_quantile,
+                       min_reports=min_reports, eval_episodes=eval_episodes)
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            shared = (rungs, lock) if prune_quantile > 0 else (None, None)
+            futures = [pool.submit(run_trial, config, cache_dir, *shared, **options) for config in todo]
+            for done, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                results.append(result)
+                events.info("trial", "[{done}/{todo}] {hash} {status:8s} eval {eval:.2f} after {episodes} episodes",
+                            done=done, todo=len(todo), hash=result["hash"], status=result["status"],
+                            eval=result["eval_score"], episodes=result["episodes_run"])
+    finally:
+        manager.shutdown()
+    events.flush()
+    return results
+
+
+def swept_values(config, names):
+    """The swept settings of a trial config, by their --param names."""
+    values = {}
+    for name in names:
+        if name == "max_steps":
+            values[name] = config["max_steps"]
+        elif name.startswith("reward."):
+            values[name] = config["rewards"].get(name[len("reward."):])
+        else:
+            values[name] = config["agent"][name]
+    return values
+
+
+def summarize(results, names):
+    """Group repeats, rank by mean evaluation score (completed trials first)."""
+    groups = {}
+    for result in results:
+        groups.setdefault(_group_key(result["config"]), []).append(result)
+    rows = []
+    for key, trials in groups.items():
+        evals = [t["eval_score"] for t in trials]
+        completed = sum(t["status"] == "complete" for t in trials)
+        rows.append({
+            "group": key,
+            "params": swept_values(trials[0]["config"], names),
+            "eval_score": float(np.mean(evals)),
+            "eval_std": float(np.std(evals)),
+            "train_score": float(np.mean([t["train_score"] for t in trials])),
+            "trials": len(trials),
+            "pruned": len(trials) - completed,
+            "seconds": float(sum(t["seconds"] for t in trials)),
+        })
+    # a config that was pruned in any repeat can't beat one that finished every time
+    rows.sort(key=lambda row: (row["pruned"] > 0, -row["eval_score"]))
+    return rows
+
+
+def print_summary(rows, top=10):
+    print(f"\n=== Sweep results (top {min(top, len(rows))} of {len(rows)}) ===")
+    print(f"  {'#':>3s} {'eval':>7s} {'+/-':>6s} {'train':>7s} {'pruned':>7s}  params")
+    for rank, row in enumerate(rows[:top], 1):
+        params = " ".join(f"{name}={value:g}" if isinstance(value, (int, float)) else f"{name}={value}"
+                          for name, value in row["params"].items())
+        print(f"  {rank:3d} {row['eval_score']:7.2f} {row['eval_std']:6.2f} {row['train_score']:7.2f} "
+              f"{row['pruned']:>3d}/{row['trials']:<3d}  {params}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search Kenobi's hyperparameters in parallel")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=SPEC",
+                        help=f"swept setting, one of: {', '.join(SWEEP_PARAMS)}")
+    parser.add_argument("--search", choices=["grid", "random"], default="grid")
+    parser.add_argument("--samples", type=int, default=20, help="random search: configs to draw")
+    parser.add_argument("--episodes", type=int, default=300, help="training episodes per trial")
+    parser.add_argument("--repeats", type=int, default=1, help="independent seeds per config")
+    parser.add_argument("--state", choices=list(STATE_GETTERS), default="simple")
+    parser.add_argument("--grid-size", type=int, default=GRID_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to the number of CPUs")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="directory of finished trials ('' = no cache)")
+    parser.add_argument("--retry-pruned", action="store_true", help="re-run trials that were pruned last time")
+    parser.add_argument("--check-every", type=int, default=50, help="episodes between pruning checks")
+    parser.add_argument("--prune-quantile", type=float, default=0.25,
+                        help="stop trials below this quantile of their peers (0 = never prune)")
+    parser.add_argument("--min-reports", type=int, default=4, help="peers needed before pruning kicks in")
+    parser.add_argument("--eval-episodes", type=int, default=200)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", default="sweep_results.json", help="ranked summary as JSON")
+    event_log.add_verbosity_arguments(parser)
+    args = parser.parse_args(argv)
+    event_log.configure_from_args(args)
+
+    try:
+        space = dict(parse_param(text) for text in args.param)
+        if args.search == "grid":
+            param_sets = list(grid_configs(space))
+        else:
+            param_sets = list(random_configs(space, args.samples, args.seed))
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    start = time.perf_counter()
+    results = run_sweep(param_sets, args.episodes, args.repeats, args.state, args.grid_size, args.seed,
+                        args.workers, args.cache or None, args.check_every, args.prune_quantile,
+                        args.min_reports, args.eval_episodes, args.retry_pruned)
+    rows = summarize(results, list(space))
+    print_summary(rows, args.top)
+    print(f"\n{len(results)} trials in {time.perf_counter() - start:.1f}s")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"space": {name: spec for name, spec in space.items()}, "results": rows}, f, indent=2)
+        print(f"Ranked summary written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# Telemetry for the Security Bot
+# Kenobi's fitness tracker - where does the time go, and is he actually getting better?
+"""
+Usage:
+    telemetry = Telemetry("run.jsonl", export_every=100)
+    telemetry.instrument(env, agent, renderer)   # wrap the hot paths
+    ...
+    telemetry.end_episode(episode, env, agent)   # once per episode
+    ...
+    telemetry.close()                            # last export + timer summary
+
+Nothing is wrapped until instrument() is called, so a run without telemetry
+pays nothing at all. Per-episode rows go into a preallocated NumPy ring buffer
+and are appended to a CSV (.csv) or JSON lines (anything else) file every
+export_every episodes. Timing histograms use power-of-two nanosecond buckets.
+"""
+import csv
+import json
+import time
+
+import numpy as np
+
+HOOKS = ("step", "choose_action", "learn", "render")
+N_BUCKETS = 64  # bucket i holds durations with bit_length() == i, i.e. [2^(i-1), 2^i) ns
+
+EPISODE_DTYPE = np.dtype([
+    ("episode", np.int64),
+    ("steps", np.int32),
+    ("score", np.int32),           # foods eaten
+    ("wall_hits", np.int32),
+    ("total_reward", np.float64),
+    ("epsilon", np.float64),
+    ("q_states", np.int64),        # Q-table size
+    ("mean_abs_td_error", np.float64),
+    ("duration_ms", np.float64),
+] + [(f"{hook}_ms", np.float64) for hook in HOOKS])
+
+
+class Timer:
+    """Call count, total/max time and a log2 histogram for one hook."""
+
+    __slots__ = ("name", "count", "total_ns", "max_ns", "buckets")
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * N_BUCKETS
+
+    def record(self, ns):
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.buckets[min(ns.bit_length(), N_BUCKETS - 1)] += 1
+
+    def percentile(self, q):
+        """Upper bound (ns) of the bucket holding the q-th percentile."""
+        if not self.count:
+            return 0
+        target = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return 1 << i
+        return self.max_ns
+
+    def summary(self):
+        return {
+            "calls": self.count,
+            "total_ms": self.total_ns / 1e6,
+            "mean_us": self.total_ns / self.count / 1e3 if self.count else 0.0,
+            "p50_us": self.percentile(50) / 1e3,
+            "p90_us": self.percentile(90) / 1e3,
+            "p99_us": self.percentile(99) / 1e3,
+            "max_us": self.max_ns / 1e3,
+            "histogram_ns": {str(1 << i): n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class Telemetry:
+    """
+    Collects timers and per-episode counters for a training run.
+
+    capacity is the ring buffer size in episodes; export_every should stay
+    below it so no row is overwritten before it reaches the file.
+    """
+
+    def __init__(self, path=None, export_every=100, capacity=4096):
+        self.path = path
+        self.fmt = "csv" if path and path.endswith(".csv") else "jsonl"
+        self.export_every = export_every
+        self.capacity = capacity
+        self.ring = np.zeros(capacity, dtype=EPISODE_DTYPE)
+        self.recorded = 0   # episodes ever recorded
+        self.exported = 0   # episodes already written to the file
+        self.dropped = 0    # episodes overwritten before they were exported
+        self.timers = {hook: Timer(hook) for hook in HOOKS}
+        self._wrapped = []  # (object, attribute) pairs to undo
+        self._file = None
+        # steps, total reward, wall hits, sum |TD error|, learn calls - reset in place every episode
+        self._counters = [0, 0.0, 0, 0.0, 0]
+        self._start_episode()
+
+    # ---- hooks -------------------------------------------------------------
+
+    def instrument(self, env, agent, renderer=None):
+        """Wrap env.step, agent.choose_action/learn and renderer.render with timers."""
+        perf = time.perf_counter_ns
+        counters = self._counters
+
+        step = env.step
+        step_timer = self.timers["step"].record
+
+        def timed_step(action):
+            start = perf()
+            result = step(action)
+            step_timer(perf() - start)
+            counters[0] += 1            # steps
+            counters[1] += result[1]    # reward
+            if result[2]:
+                counters[2] += 1        # wall hits
+            return result
+
+        choose = agent.choose_action
+        choose_timer = self.timers["choose_action"].record
+
+        def timed_choose_action(state):
+            start = perf()
+            action = choose(state)
+            choose_timer(perf() - start)
+            return action
+
+        learn = agent.learn
+        learn_timer = self.timers["learn"].record
+
+        def timed_learn(state, action, reward, next_state, done):
+            start = perf()
+            td_error = learn(state, action, reward, next_state, done)
+            learn_timer(perf() - start)
+            counters[3] += abs(td_error)
+            counters[4] += 1
+            return td_error
+
+        self._wrap(env, "step", timed_step)
+        self._wrap(agent, "choose_action", timed_choose_action)
+        self._wrap(agent, "learn", timed_learn)
+
+        if renderer is not None:
+            render = renderer.render
+            render_timer = self.timers["render"].record
+
+            def timed_render(env, force=False):
+                start = perf()
+                drawn = render(env, force)
+                render_timer(perf() - start)
+                return drawn
+
+            self._wrap(renderer, "render", timed_render)
+        return self
+
+    def _wrap(self, obj, name, wrapper):
+        # an instance attribute shadows the method; deleting it restores the original
+        setattr(obj, name, wrapper)
+        self._wrapped.append((obj, name))
+
+    def uninstrument(self):
+        """Put the original methods back."""
+        for obj, name in self._wrapped:
+            try:
+                delattr(obj, name)
+            except AttributeError:
+                pass
+        self._wrapped = []
+
+    # ---- episodes ----------------------------------------------------------
+
+    def _start_episode(self):
+        self._counters[:] = [0, 0.0, 0, 0.0, 0]  # the wrappers hold on to this very list
+        self._episode_start = time.perf_counter_ns()
+        self._timer_marks = [self.timers[hook].total_ns for hook in HOOKS]
+
+    def end_episode(self, episode, env, agent):
+        """Record one row into the ring buffer and export when due."""
+        steps, total_reward, wall_hits, td_sum, learns = self._counters
+        now = time.perf_counter_ns()
+        hook_ms = [(self.timers[hook].total_ns - mark) / 1e6 for hook, mark in zip(HOOKS, self._timer_marks)]
+        self.ring[self.recorded % self.capacity] = (
+            episode, steps, env.score, wall_hits, total_reward, agent.epsilon, len(agent.q_table),
+            td_sum / learns if learns else 0.0, (now - self._episode_start) / 1e6, *hook_ms,
+        )
+        self.recorded += 1
+        if self.path and self.recorded - self.exported >= self.export_every:
+            self.export()
+        self._start_episode()
+
+    def rows(self, last=None):
+        """The most recent episode rows still in the ring buffer, oldest first."""
+        available = min(self.recorded, self.capacity)
+        count = available if last is None else min(last, available)
+        start = self.recorded - count
+        return self.ring[np.arange(start, self.recorded) % self.capacity]
+
+    # ---- export ------------------------------------------------------------
+
+    def export(self):
+        """Append every row recorded since the last export to the file."""
+        if not self.path:
+            return 0
+        pending = self.recorded - self.exported
+        if pending > self.capacity:
+            self.dropped += pending - self.capacity
+            pending = self.capacity
+        if not pending:
+            return 0
+        rows = self.rows(pending)
+        if self._file is None:
+            self._file = open(self.path, "w", newline="")
+            if self.fmt == "csv":
+                self._csv = csv.writer(self._file)
+                self._csv.writerow(EPISODE_DTYPE.names)
+        if self.fmt == "csv":
+            self._csv.writerows(rows.tolist())
+        else:
+            names = EPISODE_DTYPE.names
+            self._file.writelines(json.dumps(dict(zip(names, row))) + "\n" for row in rows.tolist())
+        self._file.flush()
+        self.exported = self.recorded
+        return pending
+
+    def summary(self):
+        """Timer summaries for every hook that was called."""
+        return {hook: timer.summary() for hook, timer in self.timers.items() if timer.count}
+
+    def report(self):
+        """Print where the time went."""
+        print("\n=== Telemetry ===")
+        print(f"  {'hook':15s} {'calls':>10s} {'total ms':>10s} {'mean us':>9s} {'p50 us':>9s} {'p99 us':>9s}")
+        for hook, s in self.summary().items():
+            print(f"  {hook:15s} {s['calls']:10d} {s['total_ms']:10.1f} {s['mean_us']:9.2f} "
+                  f"{s['p50_us']:9.2f} {s['p99_us']:9.2f}")
+        if self.dropped:
+            print(f"  ({self.dropped} episodes were overwritten before export - raise capacity)")
+
+    def close(self):
+        """Final export, write the timer summary next to the episode file, unwrap."""
+        self.uninstrument()
+        if self.path:
+            self.export()
+            with open(self.path + ".timers.json", "w") as f:
+                json.dump({"episodes": self.recorded, "dropped": self.dropped, "timers": self.summary()}, f, indent=2)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,6 @@
+# Test setup for the Security Bot
+# The modules live flat in securitybot_ri/ and import each other by bare name - so do the tests!
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,51 @@
+# Tests for the vectorized grid world - every grid has to play by GridWorldEnv's rules
+import numpy as np
+import pytest
+
+from batch_env import BatchGridWorld
+from grid_env import GridWorldEnv
+
+
+def test_rewards_and_walls_match_the_scalar_env():
+    rng = np.random.default_rng(0)
+    batch = BatchGridWorld(500, seed=1, grid_size=5)
+    batch.robot_row[:] = rng.integers(0, 5, 500)
+    batch.robot_col[:] = rng.integers(0, 5, 500)
+    batch.spawn_food(np.ones(500, dtype=bool))
+    actions = rng.integers(0, 4, 500)
+    before = batch.get_state()
+    _, rewards, walls = batch.step(actions)
+
+    env = GridWorldEnv(seed=0, grid_size=5)
+    for i, (robot_row, robot_col, food_row, food_col) in enumerate(before.tolist()):
+        env.robot_row, env.robot_col, env.food_row, env.food_col = robot_row, robot_col, food_row, food_col
+        _, reward, done = env.step(int(actions[i]))
+        assert (rewards[i], walls[i]) == (reward, done)
+
+
+def test_food_never_spawns_under_kenobi():
+    batch = BatchGridWorld(2000, seed=0, grid_size=2)
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        state = batch.step(rng.integers(0, 4, 2000))[0]
+        assert not ((state[:, 0] == state[:, 2]) & (state[:, 1] == state[:, 3])).any()
+
+
+def test_finished_episodes_reset_and_keep_their_final_score():
+    batch = BatchGridWorld(3, max_steps=2, seed=0, grid_size=4)
+    batch.robot_row[:] = [0, 2, 2]
+    batch.score[:] = [5, 0, 0]
+    states, _, walls = batch.step(np.array([0, 3, 2]))  # grid 0 walks into the top wall
+    assert walls.tolist() == [True, False, False]
+    assert batch.final_scores[0] == 5 and batch.final_states[0, :2].tolist() == [0, 2]
+    assert states[0, :2].tolist() == [2, 2] and batch.score[0] == 0
+    batch.step(np.array([3, 2, 3]))  # second step for grids 1 and 2 - out of steps
+    assert batch.truncated.tolist() == [False, True, True]
+    assert batch.steps.tolist() == [1, 0, 0]
+
+
+def test_bad_sizes_are_refused():
+    with pytest.raises(ValueError):
+        BatchGridWorld(0)
+    with pytest.raises(ValueError):
+        BatchGridWorld(4, grid_size=1)
@@ -0,0 +1,33 @@
+# Tests for the benchmark harness - the regression check has to flag the right direction
+import benchmark
+from benchmark import Results, compare
+
+
+def metric(value, higher_is_better=True):
+    return {"value": value, "unit": "x", "higher_is_better": higher_is_better}
+
+
+def test_compare_flags_only_changes_for_the_worse():
+    baseline = {"steps_per_sec": metric(100.0), "seconds": metric(1.0, False),
+                "steady": metric(50.0), "fresh": metric(0.0)}
+    current = {"steps_per_sec": metric(70.0), "seconds": metric(1.5, False),
+               "steady": metric(45.0), "fresh": metric(5.0), "brand_new": metric(1.0)}
+    flagged = {name: change for name, old, new, change in compare(current, baseline, tolerance=0.2)}
+    assert flagged.keys() == {"steps_per_sec", "seconds"}
+    assert round(flagged["steps_per_sec"], 6) == -0.3
+    assert round(flagged["seconds"], 6) == 0.5
+
+
+def test_improvements_are_never_regressions():
+    baseline = {"steps_per_sec": metric(100.0), "seconds": metric(1.0, False)}
+    current = {"steps_per_sec": metric(500.0), "seconds": metric(0.1, False)}
+    assert compare(current, baseline, tolerance=0.0) == []
+
+
+def test_small_runs_record_their_metrics():
+    results = Results()
+    benchmark.bench_env(results, steps=200, repeats=1)
+    benchmark.bench_checkpoint(results, grid_sizes=[4], repeats=1)
+    assert "checkpoint.size.full.g4" in results.metrics
+    assert results.metrics["checkpoint.save.simple.g4"]["higher_is_better"] is False
+    assert all(m["value"] >= 0 for m in results.metrics.values())
@@ -0,0 +1,107 @@
+# Tests for Kenobi's checkpoints - what goes on disk has to come back exactly
+import os
+
+import numpy as np
+import pytest
+
+from checkpoint import CheckpointError
+from grid_env import GridWorldEnv
+from q_agent import QLearningAgent
+from state_encoding import STATE_GETTERS, make_encoding
+
+
+def play(agent, env, episodes, max_steps=30, kind="full"):
+    get_state = getattr(env, STATE_GETTERS[kind])
+    for _ in range(episodes):
+        env.reset()
+        state = get_state()
+        for _ in range(max_steps):
+            action = agent.choose_action(state)
+            _, reward, done = env.step(action)
+            next_state = get_state()
+            agent.learn(state, action, reward, next_state, done)
+            state = next_state
+            if done:
+                break
+
+
+@pytest.mark.parametrize("eviction", ["lru", "least-visited"])
+@pytest.mark.parametrize("max_states", [50, 1500])  # 50: too many evictions, falls back to a full save
+def test_incremental_saves_of_a_capped_table_round_trip(tmp_path, eviction, max_states):
+    filename = str(tmp_path / "capped.qtb")
+    agent = QLearningAgent(epsilon=0.5, max_states=max_states, eviction=eviction, seed=0)
+    env = GridWorldEnv(seed=1, grid_size=8)  # full view: 4096 states, far more than fit
+    play(agent, env, 400)
+    agent.save(filename)
+    for _ in range(3):
+        evictions = agent.q_table.evictions
+        play(agent, env, 25)
+        assert agent.q_table.evictions > evictions
+        agent.save(filename, incremental=True)
+
+    loaded = QLearningAgent()
+    assert loaded.load(filename)
+    assert set(loaded.q_table) == set(agent.q_table)
+    for state in agent.q_table:
+        assert loaded.q_table[state] == agent.q_table[state]
+    assert loaded.epsilon == agent.epsilon
+    if max_states == 1500:
+        assert os.path.exists(filename + ".delta")
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_dense_table_and_its_deltas_round_trip(tmp_path, dtype):
+    filename = str(tmp_path / "dense.qtb")
+    agent = QLearningAgent(learning_rate=0.2, epsilon=0.5, encoding=make_encoding("simple", 8), dtype=dtype, seed=0)
+    env = GridWorldEnv(seed=1, grid_size=8)
+    play(agent, env, 50, kind="simple")
+    agent.save(filename)
+    play(agent, env, 20, kind="simple")
+    agent.decay_epsilon()
+    agent.save(filename, incremental=True)
+
+    loaded = QLearningAgent(encoding=make_encoding("simple", 8))
+    assert loaded.load(filename)
+    assert loaded.q_table.values.dtype == dtype
+    assert (loaded.q_table.values == agent.q_table.values).all()
+    assert (loaded.q_table.visited == agent.q_table.visited).all()
+    assert loaded.epsilon == agent.epsilon
+    assert loaded.lr == 0.2
+
+
+def test_mmap_load_never_writes_back(tmp_path):
+    filename = str(tmp_path / "dense.qtb")
+    agent = QLearningAgent(encoding=make_encoding("simple", 8), seed=0)
+    play(agent, GridWorldEnv(seed=1, grid_size=8), 20, kind="simple")
+    agent.save(filename)
+    with open(filename, "rb") as f:
+        on_disk = f.read()
+
+    mapped = QLearningAgent()
+    mapped.load(filename, mmap=True)
+    assert (mapped.q_table.values == agent.q_table.values).all()
+    mapped.q_table.values[:] += 1.0  # copy-on-write - the file stays as it was
+    del mapped
+    with open(filename, "rb") as f:
+        assert f.read() == on_disk
+
+
+def test_dict_table_and_its_deltas_round_trip(tmp_path):
+    filename = str(tmp_path / "dict.qtb")
+    agent = QLearningAgent(epsilon=0.5, seed=0)
+    env = GridWorldEnv(seed=1, grid_size=6)
+    play(agent, env, 50)
+    agent.save(filename)
+    play(agent, env, 20)
+    agent.save(filename, incremental=True)
+
+    loaded = QLearningAgent()
+    assert loaded.load(filename)
+    assert loaded.q_table == agent.q_table
+
+
+def test_not_a_checkpoint(tmp_path):
+    filename = tmp_path / "notes.qtb"
+    filename.write_bytes(b"Kenobi's shopping list")
+    with pytest.raises(CheckpointError):
+        QLearningAgent().load(str(filename))
@@ -0,0 +1,86 @@
+# Tests for the convergence monitor - it has to see every change Kenobi makes to his Q-values
+import pytest
+
+from convergence import ConvergenceMonitor
+from q_agent import QLearningAgent
+from state_encoding import make_encoding
+
+
+def agents(**params):
+    params = dict(learning_rate=0.5, discount=0.9, epsilon=0.0, seed=0, **params)
+    return [QLearningAgent(**params), QLearningAgent(encoding=make_encoding("simple"), **params)]
+
+
+def key(agent, state):
+    return agent.encoding.encode(state) if agent.encoding is not None else state
+
+
+@pytest.mark.parametrize("agent", agents(trace_lambda=0.9), ids=["dict", "dense"])
+def test_states_updated_through_traces_count_as_touched(agent):
+    monitor = ConvergenceMonitor(window=1).instrument(agent)
+    agent.learn((1, 1), 0, 0.0, (0, 1), False)
+    agent.learn((0, 1), 0, 0.0, (-1, 1), False)
+    monitor.touched.clear()
+    agent.learn((-1, 1), 0, 10.0, (1, 0), False)  # the reward flows back along the trace
+    assert agent.get_q_values((1, 1))[0] > 0
+    assert {key(agent, s) for s in [(1, 1), (0, 1), (-1, 1)]} <= monitor.touched
+    assert monitor._policy_changes() == 0  # all three rows still act 0, as remembered
+    agent.learn((1, 1), 2, 50.0, (0, 1), True)
+    assert monitor._policy_changes() == 1  # now (1, 1) goes left
+
+
+@pytest.mark.parametrize("agent", agents(planning_steps=10, planning="dyna"), ids=["dict", "dense"])
+def test_planning_backups_count_as_touched_and_as_dq(agent):
+    monitor = ConvergenceMonitor(window=1).instrument(agent)
+    agent.learn((1, 1), 1, 0.0, (0, 1), False)
+    agent.learn((0, 1), 3, 10.0, (1, 0), False)
+    monitor.touched.clear()
+    monitor._td[:] = [0.0, 0.0]
+    agent.plan((1, 1), 1, 0.0, (0, 1), False)  # imagined updates only
+    assert key(agent, (1, 1)) in monitor.touched
+    assert monitor._td[0] > 0
+    monitor.close()
+    assert "_update" not in agent.__dict__ and "_backup" not in agent.__dict__
+
+
+def quiet_windows(monitor, first_episode, windows):
+    """Episodes where nothing is learned - each window passes."""
+    results = []
+    for episode in range(first_episode, first_episode + windows * monitor.window):
+        results.append(monitor.end_episode(episode, 1, 10))
+    return results
+
+
+def test_stops_after_patience_passing_windows_in_a_row():
+    agent = QLearningAgent(learning_rate=0.5, discount=0.9, seed=0)
+    monitor = ConvergenceMonitor(window=2, patience=3, max_delta_q=0.01).instrument(agent)
+    agent.learn((1, 1), 0, 10.0, (0, 1), False)
+    assert not monitor.end_episode(1, 0, 5) and not monitor.end_episode(2, 0, 5)  # a big update - fails
+    assert quiet_windows(monitor, 3, 2) == [False] * 4
+    agent.learn((1, 1), 0, 10.0, (0, 1), False)  # learning again resets the streak
+    quiet_windows(monitor, 7, 1)
+    assert monitor.streak == 0
+    assert quiet_windows(monitor, 9, 3) == [False] * 5 + [True]
+    assert monitor.converged_at == 14
+    assert [w["passed"] for w in monitor.history] == [False, True, True, False, True, True, True]
+    summary = monitor.summary(planned_episodes=100)
+    assert summary["episodes_saved"] == 86 and summary["steps_saved_estimate"] == round(86 * 130 / 14)
+
+
+def test_min_episodes_and_decay_keep_training_going():
+    agent = QLearningAgent(learning_rate=0.5, discount=0.9, epsilon_decay=0.99, seed=0)
+    monitor = ConvergenceMonitor(window=1, patience=1, min_episodes=3, action="decay",
+                                 fast_decay=0.5).instrument(agent)
+    assert quiet_windows(monitor, 1, 5) == [False] * 5  # "decay" never stops training
+    assert monitor.converged_at == 3
+    assert agent.epsilon_decay == 0.5
+
+
+def test_policy_changes_count_only_touched_states_that_flipped():
+    agent = QLearningAgent(learning_rate=1.0, discount=0.9, encoding=make_encoding("simple"), seed=0)
+    monitor = ConvergenceMonitor(window=1, patience=1, max_policy_changes=0).instrument(agent)
+    agent.learn((1, 1), 0, 1.0, (0, 1), True)  # best is still action 0 - not a change
+    agent.learn((0, 1), 3, 1.0, (1, 1), True)  # action 3 beats 0 now
+    assert not monitor.end_episode(1, 0, 2)
+    assert monitor.history[-1]["policy_changes"] == 1
+    assert monitor.end_episode(2, 0, 2)
@@ -0,0 +1,53 @@
+# Tests for policy evaluation - seeded, paired, and the same however many workers play
+import numpy as np
+import pytest
+
+from evaluate import OptimalPolicy, evaluate, mean_interval, play_round, rate_interval, summary
+from policy import compile_policy
+from q_agent import QLearningAgent
+from state_encoding import make_encoding
+
+
+def random_policy(seed, grid_size=6):
+    agent = QLearningAgent(encoding=make_encoding("simple", grid_size))
+    agent.q_table.values[:] = np.random.default_rng(seed).normal(size=agent.q_table.values.shape)
+    return compile_policy(agent)
+
+
+def test_rounds_are_deterministic_per_seed():
+    policy = OptimalPolicy(6)
+    first, again = play_round(policy, 7, 50), play_round(policy, 7, 50)
+    for metric in first:
+        np.testing.assert_array_equal(first[metric], again[metric])
+    other = play_round(policy, 8, 50)
+    assert not np.array_equal(first["steps_to_food"], other["steps_to_food"])
+
+
+def test_the_cheat_sheet_always_agrees_with_itself():
+    result = play_round(OptimalPolicy(6), 0, 100)
+    assert (result["optimal_agree"] == 1.0).all()
+    assert not result["wall_hit"].any()
+
+
+def test_same_answer_with_one_worker_or_several():
+    policies = [random_policy(0), random_policy(1)]
+    options = dict(min_episodes=400, max_episodes=2000, batch=200, precision=0.01, seed=3)
+    alone = summary(evaluate(policies, ["a", "b"], workers=1, **options))
+    pooled = summary(evaluate(policies, ["a", "b"], workers=2, **options))
+    alone.pop("seconds"), pooled.pop("seconds")
+    assert alone == pooled
+
+
+def test_identical_policies_are_settled_at_min_episodes():
+    policy = random_policy(0)
+    evaluation = evaluate([policy, policy], min_episodes=600, batch=200, precision=0.001, vs_optimal=False)
+    assert evaluation.episodes == 600
+    difference = evaluation.difference(1, 0)
+    assert (difference.mean, difference.low, difference.high) == (0.0, 0.0, 0.0)
+
+
+def test_intervals():
+    assert rate_interval(np.zeros(100), 1.96).low == 0.0 < rate_interval(np.zeros(100), 1.96).high
+    estimate = mean_interval(np.array([1.0, np.nan, 3.0]), 1.96)
+    assert (estimate.mean, estimate.n) == (2.0, 2)
+    assert estimate.high - estimate.mean == pytest.approx(1.96 * np.sqrt(2) / np.sqrt(2))
@@ -0,0 +1,101 @@
+# Tests for the event log - rate limits, sampling and batched writes
+import io
+import json
+import sys
+import threading
+import time
+
+import pytest
+
+import event_log
+from event_log import DEBUG, INFO, EventLog
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(event_log.time, "monotonic", clock)
+    return clock
+
+
+def test_rate_limit_refills_over_time(clock):
+    log = EventLog(rate_limits={"move": 3}, stream=io.StringIO())
+    kept = [log.info("move") for _ in range(5)]
+    assert kept == [True, True, True, False, False]
+    clock.now += 1 / 3  # one token back
+    assert log.info("move") and not log.info("move")
+    assert log.info("food")  # other events aren't limited
+    assert log.suppressed == {"move": 3}
+
+
+def test_sampling_keeps_every_nth_record(clock):
+    stream = io.StringIO()
+    log = EventLog(sample={"step": 3}, stream=stream, flush_interval=60)
+    for i in range(7):
+        log.info("step", "step {i}", i=i)
+    log.flush(summary=True)
+    assert stream.getvalue().splitlines() == ["step 0", "step 3", "step 6", "(quieted to save time: step x4)"]
+
+
+def test_lines_wait_for_a_full_buffer_or_the_interval(clock):
+    stream = io.StringIO()
+    log = EventLog(stream=stream, buffer_lines=3, flush_interval=0.25)
+    log.info("a")  # first record after a long quiet spell shows right away
+    log.info("b")
+    assert stream.getvalue() == "a\n"
+    log.info("c")
+    log.info("d")  # third waiting line fills the buffer
+    assert stream.getvalue() == "a\nb\nc\nd\n"
+    log.info("e")
+    clock.now += 0.3
+    log.info("f")
+    assert stream.getvalue().endswith("e\nf\n")
+
+
+def test_levels_and_lazy_formatting(clock):
+    stream = io.StringIO()
+    log = EventLog(level=INFO, fmt="json", stream=stream)
+    assert not log.debug("noise", "{missing}")  # never formatted, so no KeyError
+    assert not log.enabled(DEBUG)
+    log.info("food", "Score: {score}", score=3)
+    log.flush()
+    record = json.loads(stream.getvalue())
+    assert record["event"] == "food" and record["score"] == 3 and record["message"] == "Score: 3"
+
+
+def test_two_threads_lose_and_repeat_no_lines():
+    class SlowStream(io.StringIO):
+        def write(self, text):
+            time.sleep(0.0005)  # a wide window between reading the buffer and clearing it
+            return super().write(text)
+
+    stream = SlowStream()
+    log = EventLog(stream=stream, buffer_lines=7, flush_interval=0.0)
+    per_thread = 500
+
+    def chatter(name):
+        for i in range(per_thread):
+            log.info("progress", "{name} {i}", name=name, i=i)
+
+    switch = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads as often as possible
+    try:
+        threads = [threading.Thread(target=chatter, args=(name,)) for name in ("worker", "window")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch)
+    log.flush()
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 2 * per_thread
+    assert sorted(lines) == sorted(f"{name} {i}" for name in ("worker", "window") for i in range(per_thread))
@@ -0,0 +1,71 @@
+# Tests for the headless grid world - Kenobi's arena without a window
+import pytest
+
+from grid_env import REWARD_CLOSER, REWARD_FARTHER, REWARD_FOOD, REWARD_WALL, GridWorldEnv
+
+
+def place(env, robot, food):
+    env.robot_row, env.robot_col = robot
+    env.food_row, env.food_col = food
+
+
+def test_a_move_off_the_grid_ends_the_episode_where_kenobi_stood():
+    env = GridWorldEnv(seed=0, grid_size=4)
+    place(env, (0, 2), (3, 3))
+    state, reward, done = env.step(0)  # up, off the top
+    assert (state, reward, done) == ((0, 2, 3, 3), REWARD_WALL, True)
+    assert env.episode_done
+
+
+def test_shaping_and_food():
+    env = GridWorldEnv(seed=0, grid_size=4)
+    place(env, (0, 0), (0, 2))
+    assert env.step(3)[1:] == (REWARD_CLOSER, False)
+    place(env, (0, 1), (0, 3))
+    assert env.step(2)[1:] == (REWARD_FARTHER, False)
+    place(env, (0, 1), (0, 2))
+    state, reward, done = env.step(3)
+    assert (reward, done, env.score) == (REWARD_FOOD, False, 1)
+    assert state[:2] == (0, 2) and state[2:] != (0, 2)  # new food, never under Kenobi
+
+
+def test_rewards_can_be_overridden_per_env():
+    env = GridWorldEnv(seed=0, grid_size=4, rewards={"closer": 0.0, "wall": -1.0})
+    place(env, (0, 0), (0, 2))
+    assert env.step(3)[1] == 0.0
+    assert env.step(0)[1] == -1.0
+    with pytest.raises(ValueError):
+        GridWorldEnv(rewards={"lava": -5.0})
+
+
+def test_same_seed_same_episode():
+    def run(seed):
+        env = GridWorldEnv(seed=seed, grid_size=6)
+        trace = [env.reset()]
+        for action in [3, 3, 1, 1, 2, 0, 3, 1] * 4:
+            trace.append(env.step(action))
+            if trace[-1][2]:
+                trace.append(env.reset())
+        return trace
+
+    assert run(7) == run(7)
+
+
+def test_views_and_observers():
+    env = GridWorldEnv(seed=0, grid_size=5)
+    events = []
+    env.add_observer(lambda env, event: events.append(event))
+    env.reset()
+    place(env, (2, 2), (0, 4))
+    assert env.get_relative_state() == (-2, 2)
+    assert env.get_simple_state() == (-1, 1)
+    env.step(1)
+    env.remove_observer(env.observers[0])
+    env.step(1)
+    assert events == ["reset", "step"]
+
+
+@pytest.mark.parametrize("grid_size", [1, 0, -3, 2.5, "8"])
+def test_bad_grid_sizes_are_refused(grid_size):
+    with pytest.raises(ValueError):
+        GridWorldEnv(grid_size=grid_size)
@@ -0,0 +1,34 @@
+# Tests that importing the game modules stays headless - no window until someone asks for one
+import os
+import subprocess
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHECK = """
+import sys
+import tkinter
+import {module}
+assert tkinter._default_root is None, "a Tk root was created at import"
+print(sorted(name for name in ("gui_main", "tkinter") if name in sys.modules))
+"""
+
+
+def run_headless(module):
+    env = dict(os.environ)
+    env.pop("DISPLAY", None)  # a stray Tk() would fail loudly without one
+    return subprocess.run([sys.executable, "-c", CHECK.format(module=module)], cwd=HERE, env=env,
+                          capture_output=True, text=True, timeout=60)
+
+
+@pytest.mark.parametrize("module", ["gui_main", "train", "main"])
+def test_import_creates_no_window(module):
+    result = run_headless(module)
+    assert result.returncode == 0, result.stderr
+
+
+def test_train_only_loads_the_gui_when_asked():
+    result = run_headless("train")
+    assert "gui_main" not in result.stdout
@@ -0,0 +1,49 @@
+# Tests for the batched agent API - choose_actions() and learn_batch()
+import numpy as np
+import pytest
+
+from q_agent import QLearningAgent
+from state_encoding import make_encoding
+
+
+def random_batch(encoding, n, seed):
+    rng = np.random.default_rng(seed)
+    states = encoding.decode_batch(rng.integers(0, 8, size=n))  # a few states, so pairs repeat
+    next_states = encoding.decode_batch(rng.integers(0, encoding.n_states, size=n))
+    return states, rng.integers(0, 4, size=n), rng.normal(size=n), next_states, rng.random(n) < 0.2
+
+
+def test_repeated_pair_matches_sequential_updates():
+    encoding = make_encoding("simple", 6)
+    batched = QLearningAgent(learning_rate=0.3, discount=0.9, encoding=encoding)
+    stepped = QLearningAgent(learning_rate=0.3, discount=0.9, encoding=encoding)
+    state, next_state = encoding.decode(1), encoding.decode(2)
+    k = 5
+    batched.learn_batch([state] * k, [3] * k, [1.0] * k, [next_state] * k, [False] * k)
+    for _ in range(k):
+        stepped.learn(state, 3, 1.0, next_state, False)
+    assert batched.get_q_values(state) == pytest.approx(stepped.get_q_values(state))
+
+
+def test_dict_backend_makes_the_same_grouped_update():
+    encoding = make_encoding("simple", 6)
+    dense = QLearningAgent(learning_rate=0.3, discount=0.9, encoding=encoding)
+    plain = QLearningAgent(learning_rate=0.3, discount=0.9)
+    for seed in range(3):
+        batch = random_batch(encoding, 64, seed)
+        weights = np.random.default_rng(seed).random(64)
+        dense_td = dense.learn_batch(*batch, weights=weights)
+        plain_td = plain.learn_batch(*batch, weights=weights)
+        assert dense_td == pytest.approx(plain_td)
+    for state in plain.q_table.keys():
+        assert list(dense.get_q_values(state)) == pytest.approx(plain.q_table[state])
+
+
+def test_choose_actions_is_greedy_without_epsilon():
+    encoding = make_encoding("simple", 6)
+    agent = QLearningAgent(epsilon=0.0, encoding=encoding, seed=0)
+    agent.q_table.values[:] = np.random.default_rng(0).normal(size=agent.q_table.values.shape)
+    indices = np.arange(encoding.n_states)
+    expected = agent.q_table.values.argmax(axis=1)
+    assert agent.choose_actions(indices).tolist() == expected.tolist()
+    assert agent.choose_actions(encoding.decode_batch(indices)).tolist() == expected.tolist()
@@ -0,0 +1,70 @@
+# Tests for the windowed training loops - they need a display, so they skip on headless machines
+import pytest
+
+tk = pytest.importorskip("tkinter")
+
+from live_training import FramePacer, LiveTrainingView, TrainingWorker
+from q_agent import QLearningAgent
+
+
+@pytest.fixture
+def window():
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display")
+    yield root
+    try:
+        root.destroy()
+    except tk.TclError:
+        pass
+
+
+def test_closing_the_window_ends_a_wait_without_destroying_it(window):
+    pacer = FramePacer(window)
+    assert pacer.wait(1)
+    window.after(20, pacer._close)  # what the close button calls
+    assert not pacer.wait(60_000)   # woken up right away, not a minute later
+    assert pacer.closed and window.winfo_exists()  # the loop still gets to save first
+    pacer.close_window()
+
+
+def test_closing_the_live_view_early_still_hands_over_the_agent(window):
+    class Renderer:
+        def draw(self, snapshot):
+            pass
+
+    agent = QLearningAgent(learning_rate=0.5, discount=0.9, seed=0)
+    worker = TrainingWorker(agent, episodes=10 ** 9, seed=0)
+    finished = []
+    view = LiveTrainingView(window, Renderer(), worker, on_finish=finished.append)
+    view.start()
+    window.after(100, view._close)
+    window.mainloop()  # returns once _close() destroyed the window
+    assert finished == [worker]
+    assert not worker.is_alive() and worker.episode < 10 ** 9
+    assert len(agent.q_table)
+
+
+# The worker itself never touches Tk - these run anywhere
+
+def test_worker_trains_every_episode_and_keeps_only_the_newest_frames():
+    agent = QLearningAgent(learning_rate=0.5, discount=0.9, seed=0)
+    worker = TrainingWorker(agent, episodes=20, max_steps=10, max_frames=4, report_every=5, seed=0)
+    worker.start()
+    worker.join(timeout=30)
+    assert not worker.is_alive()
+    assert worker.episode == 20 and len(worker.scores) == 20
+    assert worker.avg_score == sum(worker.scores[-5:]) / 5
+    assert len(worker.frames) == 4
+    assert worker.frames[-1].episode_count == 20
+
+
+def test_stopped_worker_finishes_its_episode_and_quits():
+    agent = QLearningAgent(learning_rate=0.5, discount=0.9, seed=0)
+    worker = TrainingWorker(agent, episodes=10 ** 9, seed=0)
+    worker.start()
+    worker.stop()
+    worker.join(timeout=30)
+    assert not worker.is_alive()
+    assert worker.episode < 10 ** 9
@@ -0,0 +1,65 @@
+# Tests for Kenobi's movement diary - both formats have to give back every move, in order
+import numpy as np
+import pytest
+
+from move_history import (
+    BufferedHistoryWriter,
+    HistoryFormatError,
+    count_moves,
+    generate_moves,
+    iter_moves,
+    pack_moves,
+    read_moves,
+    unpack_moves,
+)
+
+
+@pytest.mark.parametrize("count", [0, 1, 3, 4, 5, 1001])
+def test_pack_unpack_round_trip(count):
+    moves = generate_moves(count, np.random.default_rng(count))
+    packed = pack_moves(moves)
+    assert len(packed) == -(-count // 4)
+    assert unpack_moves(packed, count).tolist() == moves.tolist()
+
+
+@pytest.mark.parametrize("fmt", ["text", "binary"])
+def test_appending_runs_round_trip_through_small_buffers(tmp_path, fmt):
+    filename = str(tmp_path / f"history.{fmt}")
+    rng = np.random.default_rng(0)
+    runs = [generate_moves(n, rng) for n in (7, 1, 30, 13)]  # odd sizes leave half-filled bytes behind
+    for run in runs:
+        with BufferedHistoryWriter(filename, fmt=fmt, buffer_moves=8) as history:
+            history.write_many(run[:-1])
+            history.write(int(run[-1]))
+    expected = np.concatenate(runs).tolist()
+    assert read_moves(filename).tolist() == expected
+    assert count_moves(filename) == len(expected)
+    assert np.concatenate(list(iter_moves(filename, chunk_moves=5))).tolist() == expected
+
+
+def test_text_reader_skips_chatter(tmp_path):
+    filename = tmp_path / "mvmnt_hist.txt"
+    filename.write_text("1,4,\nI moved up\n3,2,")
+    assert read_moves(str(filename)).tolist() == [1, 4, 3, 2]
+
+
+def test_binary_writer_refuses_a_foreign_file(tmp_path):
+    filename = tmp_path / "history.bin"
+    filename.write_bytes(b"not a history file at all")
+    with pytest.raises(HistoryFormatError):
+        BufferedHistoryWriter(str(filename), fmt="binary")
+
+
+def test_interactive_moves_are_on_disk_before_the_next_prompt(tmp_path, monkeypatch):
+    import main
+    history_file = tmp_path / "mvmnt_hist.txt"
+    monkeypatch.setattr(main, "HISTORY_FILE", str(history_file))
+    seen = []
+
+    def answer(prompt):
+        seen.append(history_file.read_text())  # what's on disk while Kenobi waits
+        return "yes" if len(seen) < 3 else "no"
+
+    monkeypatch.setattr("builtins.input", answer)
+    main.kenobi_moves()
+    assert [len(text) for text in seen] == [2, 4, 6]  # "d," per move
@@ -0,0 +1,78 @@
+# Tests for the crowded grid world - the cell indexes must agree with the entities after every move
+import random
+
+import pytest
+
+from grid_env import REWARD_CLOSER, REWARD_FARTHER, REWARD_FOOD, REWARD_STEP, REWARD_WALL
+from multi_env import MultiGridWorldEnv
+
+
+def brute_force_nearest(env, row, col):
+    return min(abs(fr - row) + abs(fc - col) for fr, fc in (divmod(cell, env.grid_size) for cell in env.food_cell))
+
+
+@pytest.mark.parametrize("robots, foods, grid_size", [(1, 1, 8), (3, 2, 8), (4, 40, 10), (30, 60, 10)],
+                         ids=["alone", "scan", "ring-search", "crowded"])
+def test_invariants_and_rewards_hold_after_random_steps(robots, foods, grid_size):
+    env = MultiGridWorldEnv(robots, foods, grid_size, seed=0)
+    rng = random.Random(1)
+    for _ in range(400):
+        if env.episode_done:
+            env.reset()
+        before = [(divmod(cell, grid_size), env.active[r]) for r, cell in enumerate(env.robot_cell)]
+        dists = [brute_force_nearest(env, *position) for position, _ in before]
+        scores = list(env.scores)
+        actions = [rng.randrange(4) for _ in range(robots)]
+        rewards, dones = env.step(actions)
+        env.check_invariants()
+        assert dones == [not a for a in env.active]
+        for r, ((row, col), was_active) in enumerate(before):
+            if not was_active:
+                assert rewards[r] == 0.0
+            elif dones[r]:
+                assert rewards[r] == REWARD_WALL
+            elif env.scores[r] > scores[r]:
+                assert rewards[r] == REWARD_FOOD
+            elif divmod(env.robot_cell[r], grid_size) == (row, col):
+                assert rewards[r] == REWARD_STEP  # blocked by a teammate
+            else:
+                # the shaping is against the nearest food before and after this robot's move
+                new_dist = brute_force_nearest(env, *divmod(env.robot_cell[r], grid_size))
+                assert rewards[r] in (REWARD_STEP + REWARD_CLOSER, REWARD_STEP + REWARD_FARTHER, REWARD_STEP)
+                if r == 0 and robots == 1:
+                    shaping = REWARD_CLOSER if new_dist < dists[r] else REWARD_FARTHER
+                    assert rewards[r] == REWARD_STEP + shaping
+
+
+def test_ring_search_finds_the_nearest_food():
+    env = MultiGridWorldEnv(robots=5, foods=70, grid_size=10, seed=2)
+    assert env.ring_search
+    for cell in range(100):
+        if env.food_at[cell] != -1:
+            continue  # a robot is never standing on a food
+        row, col = divmod(cell, 10)
+        assert env._nearest_food(row, col)[0] == brute_force_nearest(env, row, col)
+
+
+def test_robots_block_each_other():
+    env = MultiGridWorldEnv(robots=2, foods=1, grid_size=5, seed=0)
+    center = env.robot_cell[0]
+    action, neighbour = next((a, center + d) for a, d in ((3, 1), (2, -1)) if env.food_at[center + d] == -1)
+    # move robot 1 next to robot 0, through the same index updates step() uses
+    env.robot_at[env.robot_cell[1]] = -1
+    env._release(env.robot_cell[1])
+    if env.robot_at[neighbour] == -1:
+        env._take(neighbour)
+    env.robot_at[neighbour] = 1
+    env.robot_cell[1] = neighbour
+    env.check_invariants()
+    rewards, _ = env.step([action, 1])  # robot 0 tries to move into robot 1
+    assert env.robot_cell[0] == center and rewards[0] == REWARD_STEP
+    env.check_invariants()
+
+
+def test_overfull_board_is_refused():
+    with pytest.raises(ValueError):
+        MultiGridWorldEnv(robots=10, foods=10, grid_size=4)
+    with pytest.raises(ValueError):
+        MultiGridWorldEnv(robots=0)
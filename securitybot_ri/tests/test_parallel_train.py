@@ -0,0 +1,39 @@
+# Tests for parallel training - a small squad sharing one table, and the ways it can fail
+import multiprocessing as mp
+
+import pytest
+
+import parallel_train
+from q_agent import QLearningAgent
+from state_encoding import make_encoding
+
+needs_fork = pytest.mark.skipif(mp.get_start_method() != "fork",
+                                reason="the failing worker is patched in before the fork")
+
+
+def test_small_run_learns_into_the_shared_table(tmp_path):
+    filename = str(tmp_path / "q_table.qtb")
+    agent = parallel_train.train_parallel(episodes=40, workers=2, max_steps=10, report_every=20,
+                                          filename=filename, grid_size=5)
+    assert agent.q_table.visited.any()
+    assert agent.q_table.values.any()
+    loaded = QLearningAgent(encoding=make_encoding("simple", 5))
+    loaded.load(filename)
+    assert (loaded.q_table.values == agent.q_table.values).all()
+
+
+@needs_fork
+def test_worker_exception_reaches_the_parent(tmp_path, monkeypatch):
+    def broken(worker_id, *args):
+        raise RuntimeError(f"Kenobi {worker_id} tripped")
+
+    monkeypatch.setattr(parallel_train, "_train_worker", broken)
+    with pytest.raises(parallel_train.WorkerError, match="tripped"):
+        parallel_train.train_parallel(episodes=4, workers=2, filename=str(tmp_path / "q.qtb"), grid_size=5)
+
+
+def test_grid_too_big_for_a_dense_table(tmp_path, monkeypatch):
+    monkeypatch.setattr(parallel_train, "DENSE_STATE_LIMIT", 100)
+    with pytest.raises(ValueError, match="too many for a shared dense table"):
+        parallel_train.train_parallel(episodes=1, workers=1, state_kind="full", grid_size=5,
+                                      filename=str(tmp_path / "q.qtb"))
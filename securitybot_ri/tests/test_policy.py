@@ -0,0 +1,70 @@
+# Tests for frozen policies - compiled, saved and loaded, they have to act like the agent did
+import pickle
+
+import numpy as np
+import pytest
+
+from policy import GreedyPolicy, PolicyError, SparsePolicy, compile_policy, load_policy, rollout
+from q_agent import QLearningAgent
+from state_encoding import make_encoding
+
+
+def greedy_choice(q_values):
+    """What the agent would do at epsilon 0, minus the random tie-breaking."""
+    return int(np.argmax(q_values))
+
+
+def random_dense_agent(kind, grid_size, seed=0):
+    agent = QLearningAgent(encoding=make_encoding(kind, grid_size), seed=seed)
+    agent.q_table.values[:] = np.random.default_rng(seed).normal(size=agent.q_table.values.shape)
+    return agent
+
+
+@pytest.mark.parametrize("kind", ["simple", "relative", "full"])
+def test_dense_policy_round_trip_matches_the_greedy_choice(tmp_path, kind):
+    agent = random_dense_agent(kind, 5)
+    policy = compile_policy(agent)
+    filename = str(tmp_path / "kenobi.kpol")
+    policy.save(filename)
+    loaded = load_policy(filename)
+    encoding = agent.encoding
+    states = encoding.decode_batch(np.arange(encoding.n_states))
+    expected = [greedy_choice(agent.q_table.values[i]) for i in range(encoding.n_states)]
+    assert isinstance(loaded, GreedyPolicy) and loaded.kind == kind
+    assert [loaded.act(tuple(s)) for s in states.tolist()] == expected
+    assert loaded.act_batch(states).tolist() == expected
+    assert pickle.loads(pickle.dumps(loaded)).act(tuple(states[-1].tolist())) == expected[-1]
+
+
+def test_dict_agent_compiles_dense_with_a_view_and_sparse_without(tmp_path):
+    agent = QLearningAgent(seed=0)
+    agent.q_table = {(1, -1): [0.0, 0.5, 0.5, -1.0], (0, 1): [0.0, 0.0, 0.0, 2.0]}
+    dense = compile_policy(agent, kind="simple")
+    assert isinstance(dense, GreedyPolicy)
+    assert [dense.act((1, -1)), dense.act((0, 1)), dense.act((-1, -1))] == [1, 3, 0]  # ties -> lowest
+
+    sparse = compile_policy(agent)
+    assert isinstance(sparse, SparsePolicy)
+    filename = str(tmp_path / "sparse.kpol")
+    sparse.save(filename)
+    loaded = load_policy(filename)
+    assert loaded.table == {(1, -1): 1, (0, 1): 3}
+    assert loaded.act((5, 5)) == loaded.default_action
+
+
+def test_rollout_plays_the_compiled_policy():
+    policy = compile_policy(random_dense_agent("simple", 6))
+    assert rollout(policy, episodes=5, seed=0, grid_size=6) == rollout(policy, episodes=5, seed=0, grid_size=6)
+    with pytest.raises(ValueError):
+        rollout(SparsePolicy({}), episodes=1)
+
+
+def test_bad_policy_files(tmp_path):
+    filename = tmp_path / "kenobi.kpol"
+    filename.write_bytes(b"KQTB" + b"\0" * 20)
+    with pytest.raises(PolicyError):
+        load_policy(str(filename))
+    compile_policy(random_dense_agent("full", 4)).save(str(filename))
+    filename.write_bytes(filename.read_bytes()[:-10])
+    with pytest.raises(PolicyError, match="truncated"):
+        load_policy(str(filename))
@@ -0,0 +1,142 @@
+# Tests for the policy server - micro-batching, per-request errors, reloads and the socket protocol
+import asyncio
+
+import numpy as np
+import pytest
+
+from policy_server import PolicyClient, PolicyServer, RequestError
+from q_agent import QLearningAgent
+from state_encoding import make_encoding
+
+
+def save_agent(filename, seed):
+    agent = QLearningAgent(encoding=make_encoding("simple", 8))
+    agent.q_table.values[:] = np.random.default_rng(seed).normal(size=agent.q_table.values.shape)
+    agent.q_table.visited[:] = True
+    agent.save(filename)
+    return agent
+
+
+def expected_actions(agent, states):
+    return agent.q_table.values[agent.encoding.encode_batch(np.array(states))].argmax(axis=1).tolist()
+
+
+def serve(filename, scenario, **options):
+    """Run scenario(server) against a started server, then shut it down."""
+    async def main():
+        server = PolicyServer(filename, **options)
+        await server.start(port=0)  # any free localhost port
+        try:
+            return await scenario(server)
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+def test_concurrent_requests_share_one_micro_batch(tmp_path):
+    filename = str(tmp_path / "q.qtb")
+    agent = save_agent(filename, seed=0)
+    requests = [[[row, col]] for row in (-1, 0, 1) for col in (-1, 0, 1)]
+
+    async def scenario(server):
+        answers = await asyncio.gather(*(server.act(states) for states in requests))
+        return server, answers
+
+    server, answers = serve(filename, scenario, max_delay=0.05)
+    assert server.batches == 1
+    for states, (actions, q_values) in zip(requests, answers):
+        assert actions.tolist() == expected_actions(agent, states)
+        assert q_values.shape == (1, 4)
+
+
+def test_full_batches_go_out_without_waiting(tmp_path):
+    filename = str(tmp_path / "q.qtb")
+    save_agent(filename, seed=0)
+
+    async def scenario(server):
+        await asyncio.gather(*(server.act([[0, 1], [1, 0]]) for _ in range(6)))
+        return server
+
+    server = serve(filename, scenario, max_batch=4, max_delay=10.0)  # a lone batch would wait 10s
+    assert server.batches == 3
+
+
+def test_bad_request_fails_alone(tmp_path):
+    filename = str(tmp_path / "q.qtb")
+    save_agent(filename, seed=0)
+
+    async def scenario(server):
+        return await asyncio.gather(server.act([[5, 5]]), server.act([[0, 1]]), server.act([[1]]),
+                                    return_exceptions=True)
+
+    out_of_view, good, too_short = serve(filename, scenario)
+    assert isinstance(out_of_view, RequestError) and isinstance(too_short, RequestError)
+    assert len(good[0]) == 1
+
+
+def test_clients_see_a_reloaded_table(tmp_path):
+    filename = str(tmp_path / "q.qtb")
+    old = save_agent(filename, seed=0)
+    states = [[row, col] for row in (-1, 0, 1) for col in (-1, 0, 1)]
+
+    async def scenario(server):
+        port = server._server.sockets[0].getsockname()[1]
+
+        def talk():
+            client = PolicyClient(port=port)
+            try:
+                before = client.choose_actions(states)[0]
+                new = save_agent(filename, seed=1)
+                client.reload()
+                after = client.choose_actions(states)[0]
+                with pytest.raises(RequestError):
+                    client.request(op="dance")
+                return before, after, new, client.stats()
+            finally:
+                client.close()
+
+        return await asyncio.to_thread(talk)
+
+    before, after, new, stats = serve(filename, scenario)
+    assert before == expected_actions(old, states)
+    assert after == expected_actions(new, states)
+    assert stats["reloads"] == 1 and stats["requests"] == 2 and stats["states"] == 18
+
+
+def test_mixed_widths_on_an_empty_table_dont_stop_the_batcher(tmp_path):
+    filename = str(tmp_path / "empty.qtb")
+    QLearningAgent().save(filename)  # a dict table with no states - any width passes check()
+
+    async def scenario(server):
+        mixed = await asyncio.wait_for(asyncio.gather(server.act([[1, 0]]), server.act([[1, 0, 2]])), timeout=5)
+        later = await asyncio.wait_for(server.act([[0, 1]]), timeout=5)
+        return server, mixed, later
+
+    server, mixed, later = serve(filename, scenario, max_delay=0.05)
+    for actions, q_values in mixed:  # each width answered on its own
+        assert actions.tolist() == [0] and q_values.tolist() == [[0.0] * 4]
+    assert later[0].tolist() == [0]
+
+
+def test_a_failing_batch_only_fails_its_own_requests(tmp_path, monkeypatch):
+    filename = str(tmp_path / "q.qtb")
+    save_agent(filename, seed=0)
+
+    async def scenario(server):
+        answer = server._answer
+        calls = []
+
+        def flaky(items):
+            calls.append(len(items))
+            if len(calls) == 1:
+                raise RuntimeError("Kenobi dropped the phone")
+            answer(items)
+
+        monkeypatch.setattr(server, "_answer", flaky)
+        failed = await asyncio.gather(server.act([[0, 1]]), return_exceptions=True)
+        later = await asyncio.wait_for(server.act([[0, 1]]), timeout=5)
+        return failed, later
+
+    failed, later = serve(filename, scenario)
+    assert isinstance(failed[0], RuntimeError)
+    assert len(later[0]) == 1
@@ -0,0 +1,130 @@
+# Tests for Kenobi's brain
+import pytest
+
+from grid_env import GridWorldEnv
+from q_agent import QLearningAgent
+from state_encoding import make_encoding
+
+
+def walk_chain(agent):
+    """a -> b -> c -> food: only the last move pays, and it's learned last."""
+    agent.learn(("a",), 0, 0.0, ("b",), False)
+    agent.learn(("b",), 0, 0.0, ("c",), False)
+    agent.learn(("c",), 0, 1.0, ("end",), True)
+
+
+def test_planning_leaves_untried_moves_alone():
+    agent = QLearningAgent(learning_rate=0.5, discount=0.9, epsilon=0.0, seed=0, planning_steps=5)
+    for _ in range(20):
+        agent.learn((1, 0), 1, 10.0, (0, 1), False)
+    assert agent.q_table[(1, 0)][1] > 0
+    assert [agent.q_table[(1, 0)][a] for a in (0, 2, 3)] == [0.0, 0.0, 0.0]  # no made-up optimism in Q
+
+
+def test_exploration_bonus_tries_untried_moves_first_without_touching_q():
+    agent = QLearningAgent(learning_rate=0.5, discount=0.9, epsilon=0.0, seed=0, planning_steps=5,
+                           exploration_bonus=0.1)
+    state = (1, 0)
+    tried = []
+    for _ in range(4):
+        action = agent.choose_action(state)
+        tried.append(action)
+        agent.learn(state, action, 10.0 if action == 1 else -1.0, (0, 1), False)
+    assert sorted(tried) == [0, 1, 2, 3]  # every move gets its turn before any repeats
+    assert agent.choose_action(state) == 1
+    q = agent.q_table[state]
+    assert q[1] > 0 > max(q[0], q[2], q[3])  # the bonus never went into Q
+
+
+def test_sweeping_carries_a_reward_back_along_the_chain():
+    plain = QLearningAgent(learning_rate=1.0, discount=0.9, seed=0)
+    sweeping = QLearningAgent(learning_rate=1.0, discount=0.9, seed=0, planning_steps=10, planning="sweeping")
+    walk_chain(plain)
+    walk_chain(sweeping)
+    assert plain.q_table[("a",)][0] == 0.0  # one-step Q-learning only knows about c so far
+    assert sweeping.q_table[("b",)][0] == pytest.approx(0.9)
+    assert sweeping.q_table[("a",)][0] == pytest.approx(0.81)
+
+
+def test_dyna_backs_up_the_expected_outcome():
+    agent = QLearningAgent(learning_rate=1.0, discount=0.9, seed=0, planning_steps=5, planning="dyna")
+    agent.learn(("s",), 2, 1.0, ("t",), True)
+    agent.learn(("s",), 2, 1.0, ("t",), True)
+    agent.learn(("s",), 2, -2.0, ("t",), True)  # same move, different luck
+    assert agent.model_counts[(("s",), 2)] == 3
+    assert agent.q_table[("s",)][2] == pytest.approx(0.0)  # (1 + 1 - 2) / 3, not the last outcome
+
+
+def test_evicted_states_leave_the_model():
+    agent = QLearningAgent(seed=0, max_states=2, planning_steps=3, planning="dyna")
+    walk_chain(agent)
+    assert (("a",), 0) not in agent.model
+    assert all(pair in agent.model for pair in agent._model_keys)
+
+
+def test_unknown_planning_mode_is_refused():
+    with pytest.raises(ValueError):
+        QLearningAgent(planning="daydreaming")
+
+
+def reference_q_lambda(transitions, lr, discount, lam, threshold):
+    """Watkins Q(lambda) with replacing traces, written out plainly over a dict of rows."""
+    q, traces, last = {}, {}, None
+
+    def row(state):
+        return q.setdefault(state, [0.0] * 4)
+
+    for state, action, reward, next_state, done in transitions:
+        if state != last or row(state)[action] < max(row(state)):
+            traces = {}  # new episode, or an exploratory move
+        target = reward if done else reward + discount * max(row(next_state))
+        delta = target - row(state)[action]
+        traces[(state, action)] = 1.0
+        for (s, a), trace in traces.items():
+            row(s)[a] += lr * delta * trace
+        traces = {} if done else {pair: t * discount * lam for pair, t in traces.items()
+                                  if t * discount * lam >= threshold}
+        last = next_state
+    return q
+
+
+@pytest.mark.parametrize("dense", [False, True], ids=["dict", "dense"])
+def test_traced_learning_matches_a_reference_q_lambda(dense):
+    params = dict(learning_rate=0.3, discount=0.9, epsilon=0.3, seed=0, trace_lambda=0.8, trace_threshold=0.01)
+    agent = QLearningAgent(encoding=make_encoding("relative", 6) if dense else None, **params)
+    env = GridWorldEnv(seed=1, grid_size=6)
+    transitions = []
+    for _ in range(40):
+        env.reset()
+        agent.reset_traces()
+        state = env.get_relative_state()
+        for _ in range(30):
+            action = agent.choose_action(state)
+            _, reward, done = env.step(action)
+            next_state = env.get_relative_state()
+            agent.learn(state, action, reward, next_state, done)
+            transitions.append((state, action, reward, next_state, done))
+            state = next_state
+            if done:
+                break
+    reference = reference_q_lambda(transitions, 0.3, 0.9, 0.8, 0.01)
+    for state, q_values in reference.items():
+        assert list(agent.get_q_values(state)) == pytest.approx(q_values)
+
+
+def test_a_reward_reaches_the_whole_chain_at_once():
+    agent = QLearningAgent(learning_rate=1.0, discount=0.9, seed=0, trace_lambda=1.0, trace_threshold=1e-6)
+    walk_chain(agent)
+    assert agent.q_table[("b",)][0] == pytest.approx(0.9)
+    assert agent.q_table[("a",)][0] == pytest.approx(0.81)
+    assert agent.traces == {}  # the episode ended
+
+
+def test_exploratory_move_cuts_the_trace():
+    agent = QLearningAgent(learning_rate=1.0, discount=0.9, seed=0, trace_lambda=1.0, trace_threshold=1e-6)
+    agent.q_table[("b",)] = [0.0, 5.0, 0.0, 0.0]  # greedy from b is action 1
+    agent.learn(("a",), 0, 0.0, ("b",), False)
+    agent.learn(("b",), 0, 0.0, ("c",), False)  # action 0 is exploratory - a's trace is dropped
+    agent.learn(("c",), 0, 1.0, ("end",), True)
+    assert agent.q_table[("b",)][0] == pytest.approx(0.9)
+    assert agent.q_table[("a",)][0] == pytest.approx(4.5)  # only its own one-step update toward 0.9 * 5
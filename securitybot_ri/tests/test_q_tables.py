@@ -0,0 +1,67 @@
+# Tests for the capped sparse Q-table - who gets evicted, and what gets counted
+import pytest
+
+from q_agent import QLearningAgent
+from q_tables import SparseQTable
+
+
+def row():
+    return [0.0] * 4
+
+
+def test_lru_evicts_the_state_used_longest_ago():
+    evicted = []
+    table = SparseQTable(3, "lru", on_evict=evicted.append)
+    for state in "abc":
+        table[state] = row()
+    table.get("a")  # a is fresh again, b is now the oldest
+    table["d"] = row()
+    table["e"] = row()
+    assert evicted == ["b", "c"]
+    assert list(table) == ["a", "d", "e"]
+
+
+def test_least_visited_evicts_the_rarest_state_but_never_the_last_one_used():
+    evicted = []
+    table = SparseQTable(3, "least-visited", on_evict=evicted.append)
+    for state in "abc":
+        table[state] = row()
+    for _ in range(3):
+        table.get("a")
+        table.get("c")
+    table["d"] = row()  # b has the fewest visits
+    assert evicted == ["b"]
+    table.get("a")
+    table["e"] = row()  # d has 1 visit - the fewest
+    assert evicted == ["b", "d"]
+    table["f"] = row()  # e is the rarest now, but it was just added - it stays
+    assert "e" in table and len(table) == 3
+
+
+def test_stats_count_hits_misses_and_evictions():
+    table = SparseQTable(2, "lru")
+    table["a"] = row()
+    table.get("a")
+    table.get("a")
+    table.get("zzz")
+    table["b"] = row()
+    table["c"] = row()
+    stats = table.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 1, 1)
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+    assert stats["mean_evicted_visits"] == 3  # a: added once, looked up twice
+
+
+def test_bad_settings_are_refused():
+    with pytest.raises(ValueError):
+        SparseQTable(0)
+    with pytest.raises(ValueError):
+        SparseQTable(10, "random")
+
+
+def test_capped_agent_forgets_what_was_evicted():
+    agent = QLearningAgent(max_states=2, seed=0)
+    agent.learn((0, 0), 1, 1.0, (0, 1), False)
+    agent.learn((0, 1), 3, 1.0, (1, 1), False)
+    assert len(agent.q_table) == 2
+    assert (0, 0) in agent.evicted_states and (0, 0) not in agent.dirty_states
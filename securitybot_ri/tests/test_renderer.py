@@ -0,0 +1,78 @@
+# Tests for the canvas renderer - items are made once and then only moved
+import pytest
+
+from grid_env import GridWorldEnv
+from renderer import GridRenderer
+import train
+
+
+class FakeCanvas:
+    """Just enough of tk.Canvas to count what the renderer asks for."""
+
+    def __init__(self):
+        self.items = {}
+        self.created = 0
+
+    def delete(self, tag):
+        self.items.clear()
+
+    def _create(self, kind, coords, options):
+        self.created += 1
+        self.items[self.created] = {"kind": kind, "coords": list(coords), **options}
+        return self.created
+
+    def create_line(self, *coords, **options):
+        return self._create("line", coords, options)
+
+    def create_rectangle(self, *coords, **options):
+        return self._create("rectangle", coords, options)
+
+    def create_text(self, *coords, **options):
+        return self._create("text", coords, options)
+
+    def coords(self, item, *coords):
+        self.items[item]["coords"] = list(coords)
+
+    def itemconfigure(self, item, **options):
+        self.items[item].update(options)
+
+
+def test_frames_move_items_instead_of_creating_them():
+    canvas = FakeCanvas()
+    renderer = GridRenderer(canvas, cell_size=10, grid_size=6)
+    built = canvas.created
+    env = GridWorldEnv(seed=0, grid_size=6)
+    for action in (0, 3, 1, 2):
+        env.step(action)
+        assert renderer.render(env)
+    assert canvas.created == built
+    assert canvas.items[renderer.robot_rect]["coords"] == [env.robot_col * 10, env.robot_row * 10,
+                                                           env.robot_col * 10 + 10, env.robot_row * 10 + 10]
+    assert f"Score: {env.score}" in canvas.items[renderer.hud]["text"]
+
+
+def test_tiny_cells_skip_grid_lines_and_labels():
+    canvas = FakeCanvas()
+    renderer = GridRenderer(canvas, cell_size=2, grid_size=100)
+    assert not [item for item in canvas.items.values() if item["kind"] == "line"]
+    assert canvas.items[renderer.robot_text]["text"] == ""
+
+
+def test_frame_skip_draws_every_kth_frame():
+    renderer = GridRenderer(FakeCanvas(), cell_size=10, grid_size=6, frame_skip=3)
+    env = GridWorldEnv(seed=0, grid_size=6)
+    drawn = [renderer.render(env) for _ in range(9)]
+    assert drawn == [False, False, True] * 3
+    assert renderer.render(env, force=True)
+
+
+@pytest.mark.parametrize("frame_skip", [0, -2])
+def test_frame_skip_below_one_is_rejected(frame_skip):
+    with pytest.raises(ValueError):
+        GridRenderer(FakeCanvas(), frame_skip=frame_skip)
+
+
+def test_cli_rejects_a_non_positive_frame_skip(capsys):
+    with pytest.raises(SystemExit):
+        train.main(["headless", "--frame-skip", "0"])
+    assert "--frame-skip" in capsys.readouterr().err
@@ -0,0 +1,67 @@
+# Tests for experience replay - the ring buffer and the sum tree behind prioritized sampling
+import numpy as np
+import pytest
+
+from replay import PrioritizedReplayBuffer, ReplayBuffer
+
+
+def fill(buffer, count, start=0):
+    for i in range(start, start + count):
+        buffer.add(i, i % 4, float(i), i + 1, False)
+
+
+def test_ring_overwrites_the_oldest_transitions():
+    buffer = ReplayBuffer(4, seed=0)
+    fill(buffer, 6)
+    assert len(buffer) == 4
+    assert sorted(buffer.states.tolist()) == [2, 3, 4, 5]
+    slots = buffer.add_batch([6, 7, 8], [0, 1, 2], [6.0, 7.0, 8.0], [7, 8, 9], [False] * 3)
+    assert slots.tolist() == [2, 3, 0]
+    assert sorted(buffer.states.tolist()) == [5, 6, 7, 8]
+
+
+def test_tuple_states_and_sampling_shapes():
+    buffer = ReplayBuffer(8, state_width=2, seed=0)
+    buffer.add((1, -1), 2, 0.5, (0, -1), True)
+    slots, states, actions, rewards, next_states, dones, weights = buffer.sample(5)
+    assert states.shape == (5, 2) and states[0].tolist() == [1, -1]
+    assert dones.all() and (weights == 1.0).all()
+    with pytest.raises(ValueError):
+        ReplayBuffer(8).sample(1)
+
+
+def test_sum_tree_keeps_every_partial_sum():
+    buffer = PrioritizedReplayBuffer(5, seed=0, alpha=1.0)  # 8 leaves, 3 unused
+    fill(buffer, 5)
+    buffer.update_priorities(np.arange(5), np.array([1.0, 2.0, 3.0, 4.0, 5.0]) - buffer.eps)
+    tree, leaves = buffer.tree, buffer.leaves
+    for node in range(1, leaves):
+        assert tree[node] == pytest.approx(tree[2 * node] + tree[2 * node + 1])
+    assert tree[1] == pytest.approx(15.0)
+
+
+def test_samples_follow_the_priorities():
+    buffer = PrioritizedReplayBuffer(4, seed=0, alpha=1.0, beta=1.0)
+    fill(buffer, 4)
+    priorities = np.array([1.0, 2.0, 3.0, 4.0])
+    buffer.update_priorities(np.arange(4), priorities - buffer.eps)
+    draws = np.concatenate([buffer.sample(100)[0] for _ in range(200)])
+    counts = np.bincount(draws, minlength=4) / len(draws)
+    assert counts == pytest.approx(priorities / priorities.sum(), abs=0.01)
+
+
+def test_importance_weights_undo_the_bias():
+    buffer = PrioritizedReplayBuffer(4, seed=0, alpha=1.0, beta=1.0)
+    fill(buffer, 4)
+    buffer.update_priorities(np.arange(4), np.array([1.0, 2.0, 3.0, 4.0]) - buffer.eps)
+    slots, *_, weights = buffer.sample(64)
+    # with beta=1, weight * probability is the same for every sample
+    assert (weights * (slots + 1)).tolist() == pytest.approx([1.0] * 64)
+
+
+def test_new_transitions_get_the_max_priority():
+    buffer = PrioritizedReplayBuffer(4, seed=0, alpha=1.0)
+    fill(buffer, 2)
+    buffer.update_priorities(np.array([0]), np.array([9.0]))
+    fill(buffer, 1, start=2)
+    assert buffer.tree[buffer.leaves + 2] == pytest.approx(9.0 + buffer.eps)
@@ -0,0 +1,89 @@
+# Tests for the exact solver - Kenobi's answer key
+import itertools
+
+import numpy as np
+import pytest
+
+import solver
+from grid_env import ACTION_DELTAS, reward_values
+from q_agent import QLearningAgent
+from state_encoding import make_encoding
+
+
+def brute_force_values(grid_size, discount, sweeps=300):
+    """Value iteration one state and one move at a time, straight from GridWorldEnv.step's rules."""
+    rewards = reward_values(None)
+    cells = list(itertools.product(range(grid_size), repeat=2))
+    states = [(r, c, fr, fc) for (r, c), (fr, fc) in itertools.product(cells, cells) if (r, c) != (fr, fc)]
+    values = dict.fromkeys(states, 0.0)
+    for _ in range(sweeps):
+        new = {}
+        for r, c, fr, fc in states:
+            best = -np.inf
+            for d_row, d_col in ACTION_DELTAS:
+                nr, nc = r + d_row, c + d_col
+                if not (0 <= nr < grid_size and 0 <= nc < grid_size):
+                    q = rewards["wall"]  # the episode ends
+                elif (nr, nc) == (fr, fc):
+                    respawns = [values[(nr, nc) + cell] for cell in cells if cell != (nr, nc)]
+                    q = rewards["food"] + discount * sum(respawns) / len(respawns)
+                else:
+                    old, now = abs(r - fr) + abs(c - fc), abs(nr - fr) + abs(nc - fc)
+                    shaping = rewards["closer"] if now < old else rewards["farther"]
+                    q = rewards["step"] + shaping + discount * values[(nr, nc, fr, fc)]
+                best = max(best, q)
+            new[(r, c, fr, fc)] = best
+        values = new
+    return values
+
+
+def test_solve_refuses_grids_too_big_for_memory():
+    with pytest.raises(ValueError, match="512x512"):
+        solver.solve(512)
+    with pytest.raises(ValueError):
+        solver.GridMDP(grid_size=100)
+
+
+def test_solve_uses_the_rewards_it_is_given():
+    shaped = solver.solve(4)
+    sparse = solver.solve(4, rewards={"closer": 0.0, "farther": 0.0})
+    assert sparse.mdp.rewards["closer"] == 0.0
+    assert not (shaped.values == sparse.values).all()
+    # the optimal policy has no regret against its own problem...
+    assert sparse.regret(sparse.policy)["all"] == pytest.approx(0.0, abs=1e-5)
+    # ...and nothing to gain where every reward is 0
+    nothing = solver.solve(3, rewards={"food": 0.0, "closer": 0.0, "farther": 0.0, "wall": 0.0})
+    assert not nothing.values.any()
+
+
+def test_values_match_a_brute_force_bellman_backup():
+    solution = solver.solve(3, tol=1e-10)
+    for state, value in brute_force_values(3, solver.DEFAULT_DISCOUNT).items():
+        assert solution.values[state] == pytest.approx(value, abs=1e-6)
+
+
+def test_value_and_policy_iteration_agree():
+    by_value = solver.solve(4, method="value", tol=1e-9)
+    by_policy = solver.solve(4, method="policy", tol=1e-9)
+    valid = by_value.mdp.valid
+    assert np.allclose(by_value.values[valid], by_policy.values[valid], atol=1e-6)
+    assert by_value.regret(by_policy.policy)["all"] == pytest.approx(0.0, abs=1e-5)
+
+
+def test_initial_values_skip_most_of_the_work():
+    cold = solver.solve(4, discount=0.9)
+    warm = solver.solve(4, discount=0.9, initial_values=cold.values)
+    assert warm.iterations < cold.iterations
+    assert np.allclose(warm.values, cold.values, atol=1e-5)
+
+
+def test_warm_started_full_view_agent_has_no_regret():
+    solution = solver.solve(4)
+    agent = QLearningAgent(encoding=make_encoding("full", 4))
+    assert solution.regret(agent)["all"] > 0.0
+    assert solution.warm_start(agent) == int(solution.mdp.valid.sum())
+    assert solution.regret(agent)["all"] == pytest.approx(0.0, abs=1e-5)
+
+    plain = QLearningAgent()
+    solution.warm_start(plain, kind="full")
+    assert solution.regret(plain, kind="full")["all"] == pytest.approx(0.0, abs=1e-5)
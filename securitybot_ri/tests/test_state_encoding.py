@@ -0,0 +1,44 @@
+# Tests for the state encodings and the dense Q-table behind them
+import pickle
+
+import numpy as np
+import pytest
+
+from grid_env import GridWorldEnv
+from q_agent import QLearningAgent
+from state_encoding import STATE_GETTERS, make_encoding
+
+
+@pytest.mark.parametrize("kind", ["simple", "relative", "full"])
+def test_every_index_round_trips(kind):
+    encoding = make_encoding(kind, 5)
+    indices = np.arange(encoding.n_states)
+    states = encoding.decode_batch(indices)
+    assert [encoding.encode(tuple(s)) for s in states.tolist()] == indices.tolist()
+    assert encoding.encode_batch(states).tolist() == indices.tolist()
+    assert [encoding.decode(i) for i in (0, encoding.n_states - 1)] == [tuple(s) for s in states[[0, -1]].tolist()]
+    clone = pickle.loads(pickle.dumps(encoding))  # the fast encode() closure is rebuilt
+    assert clone.encode(tuple(states[-1].tolist())) == encoding.n_states - 1
+
+
+@pytest.mark.parametrize("kind", ["simple", "relative", "full"])
+def test_dense_and_dict_agents_learn_the_same_values(kind):
+    dense = QLearningAgent(learning_rate=0.5, discount=0.9, epsilon=0.3, seed=0, encoding=make_encoding(kind, 6))
+    plain = QLearningAgent(learning_rate=0.5, discount=0.9, epsilon=0.3, seed=0)
+    for agent in (dense, plain):
+        env = GridWorldEnv(seed=1, grid_size=6)
+        get_state = getattr(env, STATE_GETTERS[kind])
+        for _ in range(30):
+            env.reset()
+            state = get_state()
+            for _ in range(20):
+                action = agent.choose_action(state)
+                _, reward, done = env.step(action)
+                next_state = get_state()
+                agent.learn(state, action, reward, next_state, done)
+                state = next_state
+                if done:
+                    break
+    assert sorted(dense.q_table.keys()) == sorted(plain.q_table.keys())
+    for state in plain.q_table.keys():
+        assert list(dense.q_table[state]) == pytest.approx(plain.q_table[state])
@@ -0,0 +1,73 @@
+# Tests for hyperparameter sweeps - parsing, search spaces, seeding, caching and ranking
+import os
+
+import pytest
+
+import sweep
+from sweep import config_hash, grid_configs, make_trial, parse_param, random_configs, run_sweep, run_trial, summarize
+
+
+def test_parse_param_lists_and_ranges():
+    assert parse_param("learning_rate=0.1,0.5") == ("learning_rate", [0.1, 0.5])
+    assert parse_param("max_steps=20,40") == ("max_steps", [20, 40])
+    assert parse_param("reward.wall=-20:-5") == ("reward.wall", (-20.0, -5.0, False))
+    assert parse_param("epsilon_decay=log:0.9:0.999") == ("epsilon_decay", (0.9, 0.999, True))
+    for bad in ("learning_rate", "speed=1,2", "discount=log:0:1"):
+        with pytest.raises(ValueError):
+            parse_param(bad)
+
+
+def test_grid_and_random_search_spaces():
+    configs = list(grid_configs({"learning_rate": [0.1, 0.5], "max_steps": [20, 30, 40]}))
+    assert len(configs) == 6 and {"learning_rate": 0.5, "max_steps": 40} in configs
+    with pytest.raises(ValueError):
+        list(grid_configs({"learning_rate": (0.1, 0.5, False)}))
+
+    space = {"learning_rate": (0.05, 1.0, True), "max_steps": (10, 50, False), "discount": [0.9, 0.95]}
+    drawn = list(random_configs(space, 50, seed=3))
+    assert drawn == list(random_configs(space, 50, seed=3))
+    assert all(0.05 <= c["learning_rate"] <= 1.0 and 10 <= c["max_steps"] <= 50 for c in drawn)
+    assert all(isinstance(c["max_steps"], int) and c["discount"] in (0.9, 0.95) for c in drawn)
+
+
+def test_trials_are_reproducible_and_cached(tmp_path):
+    config = make_trial({"learning_rate": 0.5, "reward.wall": -5.0}, episodes=20, state_kind="simple",
+                        grid_size=6, seed=0, repeat=0)
+    assert config["rewards"] == {"wall": -5.0} and config["agent"]["learning_rate"] == 0.5
+    first = run_trial(config, str(tmp_path), check_every=10, eval_episodes=10)
+    again = run_trial(config, None, check_every=10, eval_episodes=10)
+    assert (first["eval_score"], first["curve"]) == (again["eval_score"], again["curve"])
+    assert os.path.exists(tmp_path / f"{config_hash(config)}.json")
+    other_repeat = dict(config, repeat=1)
+    assert config_hash(other_repeat) != config_hash(config)
+    assert sweep._seeds(other_repeat) != sweep._seeds(config)
+
+
+def test_a_second_sweep_only_reads_the_cache(tmp_path, monkeypatch):
+    options = dict(episodes=20, repeats=2, grid_size=6, workers=1, cache_dir=str(tmp_path),
+                   check_every=10, eval_episodes=10)
+    param_sets = [{"learning_rate": 0.1}, {"learning_rate": 0.8}]
+    first = run_sweep(param_sets, **options)
+    assert len(first) == 4
+
+    def no_new_trials(*args, **kwargs):
+        raise AssertionError("cached trials were run again")
+
+    monkeypatch.setattr(sweep, "run_trial", no_new_trials)
+    second = run_sweep(param_sets, **options)
+    assert sorted(r["hash"] for r in second) == sorted(r["hash"] for r in first)
+
+    rows = summarize(second, ["learning_rate"])
+    assert [row["trials"] for row in rows] == [2, 2]
+    assert {row["params"]["learning_rate"] for row in rows} == {0.1, 0.8}
+
+
+def test_pruned_configs_rank_last():
+    def result(lr, repeat, score, status):
+        config = make_trial({"learning_rate": lr}, 10, "simple", 6, 0, repeat)
+        return {"config": config, "eval_score": score, "train_score": score, "status": status, "seconds": 1.0}
+
+    rows = summarize([result(0.1, 0, 9.0, "pruned"), result(0.1, 1, 9.0, "complete"),
+                      result(0.5, 0, 1.0, "complete")], ["learning_rate"])
+    assert [row["params"]["learning_rate"] for row in rows] == [0.5, 0.1]
+    assert rows[1]["pruned"] == 1
@@ -0,0 +1,71 @@
+# Tests for Kenobi's fitness tracker - counts, exports and a clean unwrap
+import csv
+import json
+
+import pytest
+
+from grid_env import GridWorldEnv
+from q_agent import QLearningAgent
+from telemetry import EPISODE_DTYPE, Telemetry, Timer
+
+
+def run(telemetry, env, agent, episodes, max_steps=10):
+    for episode in range(1, episodes + 1):
+        env.reset()
+        state = env.get_state()
+        for _ in range(max_steps):
+            action = agent.choose_action(state)
+            _, reward, done = env.step(action)
+            next_state = env.get_state()
+            agent.learn(state, action, reward, next_state, done)
+            state = next_state
+            if done:
+                break
+        telemetry.end_episode(episode, env, agent)
+
+
+def test_timer_percentiles_use_power_of_two_buckets():
+    timer = Timer("step")
+    for ns in [100] * 90 + [5000] * 10:
+        timer.record(ns)
+    assert timer.percentile(50) == 128
+    assert timer.percentile(99) == 8192
+    assert timer.summary()["max_us"] == 5.0
+
+
+@pytest.mark.parametrize("suffix", ["csv", "jsonl"])
+def test_every_episode_reaches_the_file(tmp_path, suffix):
+    path = str(tmp_path / f"run.{suffix}")
+    env, agent = GridWorldEnv(seed=0, grid_size=6), QLearningAgent(seed=0)
+    telemetry = Telemetry(path, export_every=4, capacity=8).instrument(env, agent)
+    run(telemetry, env, agent, 10)
+    telemetry.close()
+
+    with open(path) as f:
+        if suffix == "csv":
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f]
+    assert [int(row["episode"]) for row in rows] == list(range(1, 11))
+    assert set(rows[0]) == set(EPISODE_DTYPE.names)
+    assert sum(int(row["steps"]) for row in rows) == telemetry.timers["step"].count
+    with open(path + ".timers.json") as f:
+        assert json.load(f)["episodes"] == 10
+
+
+def test_uninstrument_restores_the_original_methods():
+    env, agent = GridWorldEnv(seed=0), QLearningAgent(seed=0)
+    telemetry = Telemetry().instrument(env, agent)
+    assert "step" in vars(env) and "learn" in vars(agent)
+    telemetry.uninstrument()
+    assert "step" not in vars(env) and "learn" not in vars(agent)
+    assert env.step.__func__ is GridWorldEnv.step
+
+
+def test_ring_keeps_the_newest_rows_and_counts_the_dropped_ones(tmp_path):
+    env, agent = GridWorldEnv(seed=0), QLearningAgent(seed=0)
+    telemetry = Telemetry(str(tmp_path / "run.jsonl"), export_every=100, capacity=4).instrument(env, agent)
+    run(telemetry, env, agent, 6)
+    assert telemetry.rows()["episode"].tolist() == [3, 4, 5, 6]
+    telemetry.close()
+    assert telemetry.dropped == 2
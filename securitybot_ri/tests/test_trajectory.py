@@ -0,0 +1,110 @@
+# Tests for trajectory logs - every recorded episode comes back, by index, even after a crash
+import os
+
+import numpy as np
+import pytest
+
+from grid_env import GridWorldEnv
+from q_agent import QLearningAgent
+from trajectory import (
+    TrajectoryError,
+    TrajectoryLog,
+    TrajectoryWriter,
+    index_filename,
+    learn_offline,
+)
+
+
+def record(filename, episodes, seed=0, chunk_frames=64, agent=None):
+    """Play random (or agent) episodes into a log; returns each episode's frames and simple transitions."""
+    env = GridWorldEnv(seed=seed, grid_size=6)
+    rng = np.random.default_rng(seed)
+    played = []
+    with TrajectoryWriter(filename, grid_size=6, chunk_frames=chunk_frames) as log:
+        for _ in range(episodes):
+            env.reset()
+            if agent:
+                agent.reset_traces()  # like train()
+            log.start(env)
+            frames = [(env.robot_row, env.robot_col, env.food_row, env.food_col, env.score)]
+            transitions = []
+            state = env.get_simple_state()
+            for _ in range(15):
+                action = agent.choose_action(state) if agent else int(rng.integers(4))
+                _, reward, done = env.step(action)
+                log.step(env, action, reward, done)
+                next_state = env.get_simple_state()
+                if agent:
+                    agent.learn(state, action, reward, next_state, done)
+                transitions.append((state, action, reward, next_state, done))
+                state = next_state
+                frames.append((env.robot_row, env.robot_col, env.food_row, env.food_col, env.score))
+                if done:
+                    break
+            log.end()
+            played.append((frames, transitions))
+    return played
+
+
+def frame_tuples(frames):
+    names = ("robot_row", "robot_col", "food_row", "food_col", "score")
+    return list(zip(*(frames[name].tolist() for name in names)))
+
+
+def test_every_episode_round_trips_by_index(tmp_path):
+    filename = str(tmp_path / "run.ktj")
+    played = record(filename, 40)
+    log = TrajectoryLog(filename)
+    assert len(log) == 40
+    for n in (0, 17, 39, -1):
+        assert frame_tuples(log.episode(n)) == played[n][0]
+    assert log.scores().tolist() == [frames[-1][4] for frames, _ in played]
+    assert log.lengths.tolist() == [len(frames) for frames, _ in played]
+    with pytest.raises(IndexError):
+        log.episode(40)
+
+
+def test_appends_and_chunked_streams_see_everything(tmp_path):
+    filename = str(tmp_path / "run.ktj")
+    played = record(filename, 10) + record(filename, 10, seed=1)
+    log = TrajectoryLog(filename)
+    assert len(log) == 20
+    assert frame_tuples(log.episode(12)) == played[12][0]
+    streamed = [t for chunk in log.transitions("simple", start=5, stop=15)
+                for t in zip(map(tuple, chunk[0].tolist()), chunk[1].tolist(), chunk[2].tolist(),
+                             map(tuple, chunk[3].tolist()), chunk[4].tolist())]
+    expected = [t for _, transitions in played[5:15] for t in transitions]
+    assert [t[:2] + t[3:] for t in streamed] == [t[:2] + t[3:] for t in expected]
+    assert [t[2] for t in streamed] == pytest.approx([t[2] for t in expected])
+
+
+@pytest.mark.parametrize("trace_lambda", [0.0, 0.8])  # traces: cut-off episodes mustn't leak into the next
+def test_offline_learning_matches_learning_live(tmp_path, trace_lambda):
+    filename = str(tmp_path / "run.ktj")
+    live = QLearningAgent(learning_rate=0.5, discount=0.9, epsilon=0.3, seed=0, trace_lambda=trace_lambda)
+    record(filename, 30, agent=live)
+    offline = QLearningAgent(learning_rate=0.5, discount=0.9, trace_lambda=trace_lambda)
+    assert learn_offline(offline, TrajectoryLog(filename)) == TrajectoryLog(filename).n_frames - 30
+    assert offline.q_table.keys() == live.q_table.keys()
+    for state, q_values in live.q_table.items():
+        assert offline.q_table[state] == pytest.approx(q_values, abs=1e-6)  # rewards are stored as float32
+
+
+def test_torn_chunk_and_stale_index_are_recovered(tmp_path):
+    filename = str(tmp_path / "run.ktj")
+    played = record(filename, 20, chunk_frames=32)
+    with open(filename, "ab") as f:
+        f.write(b"KTRC\x05\x00\x00\x00")  # a crash in the middle of the next chunk
+    os.remove(index_filename(filename))
+    log = TrajectoryLog(filename)
+    assert len(log) == 20 and frame_tuples(log.episode(-1)) == played[-1][0]
+
+    record(filename, 5, seed=1)  # the next writer drops the torn chunk and carries on
+    assert len(TrajectoryLog(filename)) == 25
+
+
+def test_grid_size_must_match_to_append(tmp_path):
+    filename = str(tmp_path / "run.ktj")
+    record(filename, 1)
+    with pytest.raises(TrajectoryError):
+        TrajectoryWriter(filename, grid_size=8)
@@ -1,37 +1,106 @@
 # Training script for the Q-Learning Security Bot
 # Time to teach Kenobi how to find his snacks!
-import tkinter as tk
+import argparse
+import sys
 from q_agent import QLearningAgent
-
-# Import game environment (but don't start mainloop yet)
-# Kenobi's training ground awaits!
-import gui_main as game
+from grid_env import GridWorldEnv, GRID_SIZE
+from q_tables import SparseQTable
+from policy import compile_policy
+from state_encoding import make_encoding, STATE_GETTERS
+import event_log
+from event_log import events  # progress lines go through the rate-limited log
 
 # Kenobi's possible moves - WASD style but with numbers!
 ACTION_NAMES = ["UP", "DOWN", "LEFT", "RIGHT"]
 
-def show_optimal_demo(episodes=3, speed=100):
+# Kenobi's school settings (parallel_train uses these too)
+TRAIN_PARAMS = dict(
+    learning_rate=0.8,      # Learn VERY fast - Kenobi is a quick learner!
+    discount=0.9,           # Future rewards matter - think ahead Kenobi!
+    epsilon=0.1,            # Only 10% random moves - trust the reward signals!
+    epsilon_decay=0.95,     # Get less random over time as Kenobi gets smarter
+    epsilon_min=0.01,       # Always keep a tiny bit of curiosity!
+)
+
+DENSE_STATE_LIMIT = 10_000_000   # bigger views than this get a capped sparse table instead
+DEFAULT_MAX_STATES = 1_000_000   # ...holding at most this many states unless told otherwise
+PRINT_STATE_LIMIT = 20           # only small brains get printed state by state
+
+def make_agent(state_kind="simple", grid_size=GRID_SIZE, max_states=None, eviction="lru",
+               planning_steps=0, planning="sweeping", trace_lambda=0.0, batched=False, exploration_bonus=0.0):
+    """
+    Kenobi's brain for a state view and grid size. One transition at a time a
+    plain dict is quickest (a tuple lookup beats encoding the state and boxing
+    floats out of an array); batched=True - replay's learn_batch - gets a
+    dense array, where whole batches are array operations. Views too big for
+    that, or any explicit max_states, get a SparseQTable capped at max_states
+    (LRU or least-visited eviction).
+    planning_steps > 0 adds Dyna-style planning ("sweeping" or "dyna") to every learn(),
+    trace_lambda > 0 makes learn() Watkins Q(lambda) with eligibility traces,
+    exploration_bonus > 0 makes greedy choices try untried moves first (see QLearningAgent).
+    """
+    encoding = make_encoding(state_kind, grid_size)
+    planner = dict(planning_steps=planning_steps, planning=planning, trace_lambda=trace_lambda,
+                   exploration_bonus=exploration_bonus)
+    if max_states is None and encoding.n_states <= DENSE_STATE_LIMIT:
+        if batched:
+            return QLearningAgent(**TRAIN_PARAMS, encoding=encoding, **planner)
+        return QLearningAgent(**TRAIN_PARAMS, **planner)
+    return QLearningAgent(**TRAIN_PARAMS, max_states=max_states or DEFAULT_MAX_STATES, eviction=eviction,
+                          **planner)
+
+def open_recorder(record, grid_size, mode, state_kind):
+    """A TrajectoryWriter appending to the log named record, or None when not recording."""
+    if not record:
+        return None
+    from trajectory import TrajectoryWriter
+    return TrajectoryWriter(record, grid_size, meta={"mode": mode, "state": state_kind})
+
+def load_game(grid_size=None):
+    """
+    Import the game window and open it - only when we actually want to watch.
+    Headless runs never get here, so they need no display (and no Tk at all).
+    Kenobi's training ground awaits!
+    """
+    import gui_main as game
+    game.start_gui(grid_size)
+    if game.pacer is None:
+        from live_training import FramePacer
+        game.pacer = FramePacer(game.window)  # every visual loop waits through it, so Tk never freezes
+    return game
+
+
+def window_closed():
+    """True once the game window was closed - visual runs then wrap up (and save) instead of carrying on."""
+    game = sys.modules.get("gui_main")
+    return game is not None and game.pacer is not None and game.pacer.closed
+
+def show_optimal_demo(episodes=3, speed=100, solution=None, grid_size=None):
     """
     Demo the OPTIMAL policy - robot goes directly to food.
     This shows what the Q-learning agent SHOULD learn to do.
     Like showing Kenobi a video of a pro player before he tries!
+    With a solver.Solution the exact optimal policy is used instead of the cheat sheet.
     """
     print("\n=== OPTIMAL POLICY DEMO ===")
     print("Watch how the robot SHOULD behave:\n")
 
+    game = load_game(grid_size)
+    max_demo_steps = max(30, 2 * game.env.grid_size)  # 30 is plenty for a 16x16 grid, bigger grids need more
     for episode in range(1, episodes + 1):
         game.reset_game()  # fresh start for the demo!
         steps = 0
 
-        while steps < 30:  # max 30 steps should be plenty for a 16x16 grid!
+        while steps < max_demo_steps:
             # Use the optimal action (always moves toward food)
             # This is Kenobi on his best day - no mistakes!
-            action = game.get_optimal_action()
+            action = game.get_optimal_action() if solution is None else solution.action(game.get_state())
             _, reward, done = game.step(action)
             steps += 1
 
-            game.window.update()  # show the magic happening!
-            game.window.after(speed)  # slow down so humans can see
+            # show the magic happening - slow enough for humans to see, without freezing the window
+            if not game.pacer.wait(speed):
+                break
 
             if done:  # uh oh, hit a wall somehow?
                 break
@@ -39,68 +108,167 @@ def show_optimal_demo(episodes=3, speed=100):
             # Check if we got food (score increased means new food spawned)
             # Yummy! Kenobi found his snack!
             if reward == game.REWARD_FOOD:
-                print(f"  Episode {episode}: Found food in {steps} steps!")
+                events.info("demo", "  Episode {episode}: Found food in {steps} steps!", episode=episode, steps=steps)
                 break
 
-        print(f"  Episode {episode}: Score {game.score} in {steps} steps")
+        events.info("demo", "  Episode {episode}: Score {score} in {steps} steps",
+                    episode=episode, score=game.score, steps=steps)
+        if game.pacer.closed:
+            break  # window closed - the show's over
+    events.flush()
 
 
-def train(episodes=100, max_steps=30, visualize=True, speed=50):
+def train(episodes=100, max_steps=30, visualize=True, speed=50, filename="q_table.qtb",
+          frame_skip=1, target_fps=None, telemetry=None, warm_start=False,
+          grid_size=GRID_SIZE, state_kind="simple", max_states=None, eviction="lru",
+          replay_capacity=None, batch_size=32, replay_every=1, prioritized=False,
+          planning_steps=0, planning="sweeping", record=None, monitor=None, trace_lambda=0.0,
+          exploration_bonus=0.0):
     """
     Train the Q-learning agent.
     This is where Kenobi goes to school and learns to find food!
+    When visualizing, frame_skip=k only draws every k-th step and target_fps
+    caps the redraw rate, so watching doesn't slow training down as much.
+    Pass a telemetry.Telemetry to time the hot paths and log every episode.
+    warm_start=True seeds Kenobi's brain with the exact solver's Q-values and
+    reports his regret against the optimal policy at the end.
+    grid_size and state_kind pick the arena and what Kenobi sees of it;
+    max_states caps his memory (see make_agent).
+    replay_capacity turns on experience replay: transitions go into a replay
+    buffer and every replay_every steps a minibatch of batch_size (uniform, or
+    by TD error with prioritized=True) is learned in one batched update.
+    planning_steps > 0 lets Kenobi rehearse that many imagined updates from his
+    model after every real step ("sweeping": biggest surprises first, "dyna": random).
+    Planning pushes tried moves far above untried ones still at 0, so pair it with
+    exploration_bonus > 0 or greedy Kenobi may never try the right move.
+    trace_lambda > 0 spreads every update back over the episode's recent greedy moves
+    (Watkins Q(lambda)) - about twice as fast on the simple view with sparse rewards,
+    but no help on views that hide the walls (see benchmark.bench_traces). Replay
+    updates stay one-step.
+    record names a trajectory log (trajectory.py) that every episode is appended to,
+    for replaying in trajectory_viewer.py or learning from offline.
+    Pass a convergence.ConvergenceMonitor to stop early (or cool exploration
+    down fast) once Kenobi's Q-values, greedy policy and score settle.
     """
+    if warm_start:
+        import solver
+        solver.check_size(grid_size)  # the exact answer key only fits in memory for small arenas
     # Create Kenobi's brain - the Q-learning agent!
-    agent = QLearningAgent(
-        learning_rate=0.8,      # Learn VERY fast - Kenobi is a quick learner!
-        discount=0.9,           # Future rewards matter - think ahead Kenobi!
-        epsilon=0.1,            # Only 10% random moves - trust the reward signals!
-        epsilon_decay=0.95,     # Get less random over time as Kenobi gets smarter
-        epsilon_min=0.01        # Always keep a tiny bit of curiosity!
-    )
+    # 9 simple states -> a tiny dict (or a dense array when replay learns whole batches)
+    agent = make_agent(state_kind, grid_size, max_states, eviction, planning_steps, planning, trace_lambda,
+                       batched=bool(replay_capacity), exploration_bonus=exploration_bonus)
+    solution = None
+    if warm_start:
+        solution = solver.solve(grid_size, discount=agent.discount)
+        solution.warm_start(agent, kind=state_kind)  # Kenobi starts with the answer key!
 
     print(f"\n=== Starting Training: {episodes} episodes ===\n")
     print("Kenobi is entering the training arena!\n")
 
+    # Headless runs get their own env - no canvas redraws slowing Kenobi down!
+    if visualize:
+        game = load_game(grid_size)
+        env = game.env
+        game.renderer.frame_skip = frame_skip
+        game.renderer.target_fps = target_fps
+    else:
+        env = GridWorldEnv(grid_size=grid_size)
+    get_state = getattr(env, STATE_GETTERS[state_kind])
+
+    replay = None
+    if replay_capacity:
+        from replay import ReplayBuffer, PrioritizedReplayBuffer
+        # dense brains store row numbers, dict brains store the state tuples
+        encode = agent.encoding.encode if agent.encoding is not None else None
+        state_width = None if encode is not None else len(get_state())
+        buffer_class = PrioritizedReplayBuffer if prioritized else ReplayBuffer
+        replay = buffer_class(replay_capacity, state_width)
+        total_steps = 0
+
+    recorder = open_recorder(record, grid_size, "train", state_kind)
+
+    if monitor is not None:
+        monitor.instrument(agent)  # before telemetry, so telemetry's timers include it
+    if telemetry is not None:
+        telemetry.instrument(env, agent, game.renderer if visualize else None)
+
     total_scores = []  # keep track of how well Kenobi is doing!
 
     for episode in range(1, episodes + 1):
-        game.reset_game()  # new episode, new chances to find food!
-        state = game.get_simple_state()  # where's the food relative to Kenobi?
+        env.reset()  # new episode, new chances to find food!
+        state = get_state()  # where's the food relative to Kenobi?
+        agent.reset_traces()  # last episode's moves earn nothing from this one
+        if recorder is not None:
+            recorder.start(env)
         steps = 0
 
         while steps < max_steps:  # don't let Kenobi wander forever!
             # Agent chooses action - what does Kenobi's brain say to do?
             action = agent.choose_action(state)
 
-            # What SHOULD the action be? (for debugging Kenobi's choices)
-            optimal = game.get_optimal_action()
-
             # Take action in environment - Kenobi makes his move!
-            _, reward, done = game.step(action)
-            next_state = game.get_simple_state()
+            _, reward, done = env.step(action)
+            next_state = get_state()
+            if recorder is not None:
+                recorder.step(env, action, reward, done)
 
             # Agent learns from this experience - updating Kenobi's brain!
             # This is where the magic happens!
-            agent.learn(state, action, reward, next_state, done)
+            if replay is None:
+                agent.learn(state, action, reward, next_state, done)
+            else:
+                # into the diary, then study a random page (or the most surprising ones)
+                if encode is not None:
+                    replay.add(encode(state), action, reward, encode(next_state), done)
+                else:
+                    replay.add(state, action, reward, next_state, done)
+                total_steps += 1
+                if len(replay) >= batch_size and total_steps % replay_every == 0:
+                    slots, *batch, weights = replay.sample(batch_size)
+                    replay.update_priorities(slots, agent.learn_batch(*batch, weights=weights))
 
             state = next_state  # remember the new state
             steps += 1
 
-            if visualize:  # show Kenobi moving around
-                game.window.update()
-                game.window.after(speed)
+            if visualize and game.renderer.frame_drawn and not game.pacer.wait(speed):  # show Kenobi moving around
+                break  # window closed - finish up and save what he learned so far
 
             if done:  # episode over (probably hit a wall, ouch!)
                 break
 
         agent.decay_epsilon()  # Kenobi gets a bit less random each episode
-        total_scores.append(game.score)  # how many foods did Kenobi find?
+        total_scores.append(env.score)  # how many foods did Kenobi find?
+        if recorder is not None:
+            recorder.end()
+        if telemetry is not None:
+            telemetry.end_episode(episode, env, agent)
+        if monitor is not None and monitor.end_episode(episode, env.score, steps):
+            break  # Kenobi stopped learning anything new - school's out!
+        if visualize and game.pacer.closed:
+            print(f"\nWindow closed - training stops after {episode} episodes")
+            break
 
         # Print every episode for visibility
         if episode % 5 == 0:
             avg = sum(total_scores[-5:]) / 5
-            print(f"Ep {episode:3d} | Avg Score: {avg:.1f} | Epsilon: {agent.epsilon:.2f}")
+            events.info("progress", "Ep {episode:3d} | Avg Score: {avg:.1f} | Epsilon: {epsilon:.2f}",
+                        episode=episode, avg=avg, epsilon=agent.epsilon)
+    events.flush(summary=True)  # everything out before the summary below
+    if recorder is not None:
+        recorder.close()
+        print(f"Recorded {recorder.episodes} episodes to {record}")
+
+    if telemetry is not None:
+        telemetry.close()  # unwrap, last export
+        telemetry.report()
+    if monitor is not None:
+        monitor.close()
+        monitor.report(episodes)
+
+    if visualize:
+        # back to drawing every frame for demos and tests
+        game.renderer.frame_skip = 1
+        game.renderer.target_fps = None
 
     # Show what the agent learned - peek inside Kenobi's brain!
     print("\n=== What Kenobi learned ===")
@@ -122,84 +290,294 @@ def train(episodes=100, max_steps=30, visualize=True, speed=50):
     }
 
     # Print out what Kenobi thinks is the best move for each situation!
-    for state in sorted(agent.q_table.keys()):
-        q_vals = agent.q_table[state]
-        best_action = q_vals.index(max(q_vals))  # highest Q-value = best choice!
-        meaning = state_meanings.get(state, str(state))
-        print(f"  {meaning:20s} -> {ACTION_NAMES[best_action]:5s}  Q={[f'{q:.1f}' for q in q_vals]}")
-
-    agent.save()  # save Kenobi's brain to disk for later!
-    print("\nKenobi's brain has been saved to q_table.pkl!")
+    if len(agent.q_table) > PRINT_STATE_LIMIT:
+        print(f"  ({len(agent.q_table)} states - too many to list)")
+    else:
+        for state in sorted(agent.q_table.keys()):
+            q_vals = [float(q) for q in agent.q_table[state]]
+            best_action = q_vals.index(max(q_vals))  # highest Q-value = best choice!
+            meaning = state_meanings.get(state, str(state)) if state_kind == "simple" else str(state)
+            print(f"  {meaning:20s} -> {ACTION_NAMES[best_action]:5s}  Q={[f'{q:.1f}' for q in q_vals]}")
+
+    if isinstance(agent.q_table, SparseQTable):
+        stats = agent.q_table.stats()
+        print(f"\nMemory: {stats['states']}/{stats['max_states']} states | hit rate {stats['hit_rate']:.1%} | "
+              f"{stats['evictions']} evicted ({stats['eviction']})")
+
+    if solution is not None:
+        regret = solution.regret(agent, kind=state_kind)
+        print(f"\nRegret vs optimal policy: {regret['start']:.3f} from the start, {regret['all']:.3f} on average")
+
+    agent.save(filename)  # save Kenobi's brain to disk for later!
+    print(f"\nKenobi's brain has been saved to {filename}!")
     return agent
 
 
-def test(agent, episodes=5, speed=100):
-    """Test the trained agent (no exploration).
+def test(agent, episodes=5, speed=100, visualize=True, grid_size=GRID_SIZE, state_kind="simple", record=None):
+    """Test the trained agent (no exploration) with its compiled greedy policy.
     Time to see if Kenobi actually learned something!
+    record appends the test episodes to a trajectory log, like train().
     """
     print(f"\n=== Testing Kenobi's Skills ===\n")
     print("No more random moves - pure skill only!\n")
 
     agent.epsilon = 0  # No random moves - Kenobi uses only what he learned!
+    # ...so freeze it: one look-up per move instead of Q-values, max() and ties
+    act = compile_policy(agent, state_kind, grid_size).act
+
+    if visualize:
+        game = load_game(grid_size)
+        env = game.env
+    else:
+        env = GridWorldEnv(grid_size=grid_size)
+    get_state = getattr(env, STATE_GETTERS[state_kind])
+    recorder = open_recorder(record, grid_size, "test", state_kind)
 
     for episode in range(1, episodes + 1):
-        game.reset_game()  # fresh test environment!
-        state = game.get_simple_state()
+        env.reset()  # fresh test environment!
+        state = get_state()
         steps = 0
+        if recorder is not None:
+            recorder.start(env)
 
         while steps < 30:  # give Kenobi 30 steps to show off
-            action = agent.choose_action(state)  # what did Kenobi learn to do?
-            _, reward, done = game.step(action)
-            state = game.get_simple_state()
+            action = act(state)  # what did Kenobi learn to do?
+            _, reward, done = env.step(action)
+            state = get_state()
             steps += 1
+            if recorder is not None:
+                recorder.step(env, action, reward, done)
 
-            game.window.update()  # show Kenobi in action!
-            game.window.after(speed)
+            if visualize and not game.pacer.wait(speed):  # show Kenobi in action!
+                break  # window closed
 
             if done:  # oops, Kenobi hit a wall - needs more training!
-                print(f"  Test {episode}: HIT WALL after {steps} steps, score {game.score}")
+                events.info("test", "  Test {episode}: HIT WALL after {steps} steps, score {score}",
+                            episode=episode, steps=steps, score=env.score)
                 break
 
         if not done:  # Kenobi survived! How many foods did he find?
-            print(f"  Test {episode}: Score {game.score} in {steps} steps - Good job Kenobi!")
-
-
-# Main program - where the training adventure begins!
-if __name__ == "__main__":
-    print("=" * 50)
-    print("   Q-Learning Training for Security Bot")
-    print("   Teaching Kenobi to find his food!")
-    print("=" * 50)
+            events.info("test", "  Test {episode}: Score {score} in {steps} steps - Good job Kenobi!",
+                        episode=episode, score=env.score, steps=steps)
+        if recorder is not None:
+            recorder.end()
+        if visualize and game.pacer.closed:
+            break  # window closed - no one left to show off to
+    events.flush(summary=True)
+    if recorder is not None:
+        recorder.close()
+
+
+# Menu numbers from the old interactive prompt -> CLI modes
+MENU_CHOICES = {"1": "demo", "2": "watch", "3": "fast"}
+
+def ask_mode():
+    """The friendly menu, for when train.py is started from a terminal with no mode."""
     print("\nOptions:")
     print("1. Show OPTIMAL demo first (see how it SHOULD work)")
     print("2. Train the agent (watch Kenobi learn)")
     print("3. Train fast, then test (for the impatient!)")
-
     choice = input("\nChoose (1/2/3): ").strip()
+    return MENU_CHOICES.get(choice, "optimal")
+
+
+def positive_int(text):
+    """argparse type for counts that must be at least 1."""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Q-Learning training for Kenobi the Security Bot",
+        epilog="With no mode, an interactive menu is shown (terminals only).",
+    )
+    parser.add_argument(
+        "mode", nargs="?", choices=["demo", "watch", "live", "fast", "headless", "optimal"],
+        help="demo: optimal demo then training | watch: visualized training | "
+             "live: full-speed training in the background with a live window | "
+             "fast: train without drawing, then watch a test | "
+             "headless: train and test with no display at all | optimal: optimal demo only",
+    )
+    parser.add_argument("--episodes", type=int, default=None, help="training episodes (default depends on mode)")
+    parser.add_argument("--max-steps", type=int, default=30, help="step limit per training episode")
+    parser.add_argument("--test-episodes", type=int, default=None, help="test episodes after training")
+    parser.add_argument("--output", default="q_table.qtb", help="where to save Kenobi's brain")
+    parser.add_argument("--frame-skip", type=positive_int, default=1, help="visualized training draws every k-th step")
+    parser.add_argument("--fps", type=float, default=None, help="cap on frames drawn per second during training")
+    parser.add_argument("--telemetry", metavar="FILE", default=None,
+                        help="log per-episode stats and hot-path timings (.csv or JSON lines)")
+    parser.add_argument("--telemetry-every", type=int, default=100, help="episodes between telemetry exports")
+    parser.add_argument("--warm-start", action="store_true",
+                        help="start from the exact solver's Q-values (and report regret)")
+    parser.add_argument("--exact", action="store_true",
+                        help="optimal demos use the value-iteration policy instead of the greedy rule")
+    parser.add_argument("--grid-size", type=int, default=GRID_SIZE, help="side of the square arena")
+    parser.add_argument("--state", choices=list(STATE_GETTERS), default="simple",
+                        help="what Kenobi sees: food direction, food offset, or both positions")
+    parser.add_argument("--max-states", type=int, default=None,
+                        help="cap Kenobi's memory at this many states (sparse table with eviction)")
+    parser.add_argument("--eviction", choices=["lru", "least-visited"], default="lru",
+                        help="which states a capped memory forgets first")
+    parser.add_argument("--replay", type=int, default=None, metavar="CAPACITY",
+                        help="learn from a replay buffer of this many transitions instead of one at a time")
+    parser.add_argument("--batch-size", type=int, default=32, help="replay minibatch size")
+    parser.add_argument("--replay-every", type=int, default=1, help="env steps between replay updates")
+    parser.add_argument("--prioritized", action="store_true", help="sample replay by TD error")
+    parser.add_argument("--planning-steps", type=int, default=0,
+                        help="imagined updates from Kenobi's learned model after every real step")
+    parser.add_argument("--planning", choices=["sweeping", "dyna"], default="sweeping",
+                        help="planning order: biggest TD error first (prioritized sweeping) or random (Dyna-Q)")
+    parser.add_argument("--trace-lambda", type=float, default=0.0, metavar="LAMBDA",
+                        help="eligibility trace decay for Watkins Q(lambda), e.g. 0.5 (0 = one-step Q-learning)")
+    parser.add_argument("--exploration-bonus", type=float, default=0.0, metavar="BONUS",
+                        help="greedy moves try untried actions first, then favour rarely tried ones by "
+                             "BONUS/sqrt(tries) - recommended with --planning-steps (0 = off)")
+    parser.add_argument("--record", metavar="LOG", default=None,
+                        help="append every training episode to this trajectory log (see trajectory_viewer.py)")
+    parser.add_argument("--record-test", metavar="LOG", default=None,
+                        help="append the test episodes to this trajectory log")
+    parser.add_argument("--evaluate", action="store_true",
+                        help="after the test, score the policy over thousands of seeded episodes (evaluate.py)")
+    parser.add_argument("--early-stop", choices=["stop", "decay"], default=None,
+                        help="watch for convergence and then stop training, or decay epsilon fast")
+    parser.add_argument("--converge-window", type=int, default=10, help="episodes per convergence window")
+    parser.add_argument("--converge-patience", type=int, default=3,
+                        help="settled windows in a row before calling it converged")
+    parser.add_argument("--converge-max-dq", type=float, default=None,
+                        help="a window settles only if no Q-value moved more than this")
+    parser.add_argument("--converge-policy-changes", type=int, default=0,
+                        help="...and at most this many greedy actions changed (-1 = don't check)")
+    parser.add_argument("--converge-score-tol", type=float, default=None,
+                        help="...and the average score moved at most this much")
+    parser.add_argument("--converge-min-episodes", type=int, default=0, help="never stop before this many episodes")
+    event_log.add_verbosity_arguments(parser)
+    args = parser.parse_args(argv)
+    event_log.configure_from_args(args)
+    if args.warm_start or args.exact:
+        import solver
+        try:
+            solver.check_size(args.grid_size)
+        except ValueError as error:
+            parser.error(f"{error} - drop --warm-start/--exact or pick a smaller --grid-size")
+
+    mode = args.mode
+    if mode is None:
+        if not sys.stdin.isatty():
+            parser.error("no mode given and no terminal to ask - try 'headless'")
+        print("=" * 50)
+        print("   Q-Learning Training for Security Bot")
+        print("   Teaching Kenobi to find his food!")
+        print("=" * 50)
+        mode = ask_mode()
+
+    def episodes(default):
+        return args.episodes if args.episodes is not None else default
+
+    def test_episodes(default):
+        return args.test_episodes if args.test_episodes is not None else default
+
+    def exact_solution():
+        if not args.exact:
+            return None
+        import solver
+        return solver.solve(args.grid_size, discount=TRAIN_PARAMS["discount"])
+
+    # the arena and Kenobi's view of it, for every train() / test() call
+    arena = dict(grid_size=args.grid_size, state_kind=args.state)
+    memory = dict(max_states=args.max_states, eviction=args.eviction,
+                  replay_capacity=args.replay, batch_size=args.batch_size,
+                  replay_every=args.replay_every, prioritized=args.prioritized,
+                  planning_steps=args.planning_steps, planning=args.planning, trace_lambda=args.trace_lambda,
+                  exploration_bonus=args.exploration_bonus, record=args.record)
+
+    def run_tests(agent, **options):
+        if options.get("visualize", True) and window_closed():
+            return  # the window went away during training - nothing to show the tests in
+        test(agent, record=args.record_test, **arena, **options)
+        if args.evaluate:
+            # a handful of test episodes is just for show - this is the real grade
+            from evaluate import evaluate_agent, report
+            report(evaluate_agent(agent, args.state, args.grid_size, max_steps=args.max_steps))
+
+    def make_monitor():
+        if args.early_stop is None:
+            return None
+        from convergence import ConvergenceMonitor
+        return ConvergenceMonitor(
+            window=args.converge_window, patience=args.converge_patience, max_delta_q=args.converge_max_dq,
+            max_policy_changes=None if args.converge_policy_changes < 0 else args.converge_policy_changes,
+            score_tolerance=args.converge_score_tol, min_episodes=args.converge_min_episodes,
+            action=args.early_stop)
+
+    def make_telemetry():
+        if args.telemetry is None:
+            return None
+        from telemetry import Telemetry
+        return Telemetry(args.telemetry, export_every=args.telemetry_every)
+
+    if mode == "headless":
+        # No window, no Tk - runs anywhere, even on a server!
+        agent = train(episodes=episodes(100), max_steps=args.max_steps, visualize=False, filename=args.output,
+                      telemetry=make_telemetry(), monitor=make_monitor(), warm_start=args.warm_start, **arena, **memory)
+        run_tests(agent, episodes=test_episodes(5), visualize=False)
+        return
+
+    if mode == "live":
+        # Kenobi trains at full speed in a background thread, the window just peeks in
+        from live_training import TrainingWorker, LiveTrainingView
+        game = load_game(args.grid_size)
+        agent = make_agent(args.state, args.grid_size, args.max_states, args.eviction,
+                           args.planning_steps, args.planning, args.trace_lambda,
+                           exploration_bonus=args.exploration_bonus)
+        worker = TrainingWorker(agent, episodes=episodes(1000), max_steps=args.max_steps, **arena)
+        view = LiveTrainingView(game.window, game.renderer, worker,
+                                on_finish=lambda finished: agent.save(args.output))
+        view.start()
+        game.window.mainloop()
+        worker.stop()  # window closed early? let Kenobi finish his episode and stop
+        worker.join()
+        return
 
-    if choice == "1":
+    if mode == "demo":
         # First show the perfect robot, then train Kenobi to match it!
-        show_optimal_demo(episodes=3, speed=80)
+        show_optimal_demo(episodes=3, speed=80, solution=exact_solution(), grid_size=args.grid_size)
+        if window_closed():
+            return
         input("\nPress Enter to start training Kenobi...")
-        agent = train(episodes=30, max_steps=30, visualize=True, speed=30)
-        test(agent, episodes=3, speed=100)
-        game.window.mainloop()
+        agent = train(episodes=episodes(30), max_steps=args.max_steps, visualize=True, speed=30,
+                      filename=args.output, frame_skip=args.frame_skip, target_fps=args.fps,
+                      telemetry=make_telemetry(), monitor=make_monitor(), warm_start=args.warm_start, **arena, **memory)
+        run_tests(agent, episodes=test_episodes(3), speed=100)
 
-    elif choice == "2":
+    elif mode == "watch":
         # Watch Kenobi learn in real-time - educational and fun!
-        agent = train(episodes=50, max_steps=30, visualize=True, speed=20)
-        test(agent, episodes=3, speed=100)
-        game.window.mainloop()
+        agent = train(episodes=episodes(50), max_steps=args.max_steps, visualize=True, speed=20,
+                      filename=args.output, frame_skip=args.frame_skip, target_fps=args.fps,
+                      telemetry=make_telemetry(), monitor=make_monitor(), warm_start=args.warm_start, **arena, **memory)
+        run_tests(agent, episodes=test_episodes(3), speed=100)
 
-    elif choice == "3":
+    elif mode == "fast":
         # Speed run! Train fast then show off Kenobi's skills
         print("\nTraining Kenobi in hyperspeed mode...")
-        agent = train(episodes=100, max_steps=30, visualize=False, speed=1)
+        agent = train(episodes=episodes(100), max_steps=args.max_steps, visualize=False, filename=args.output,
+                      telemetry=make_telemetry(), monitor=make_monitor(), warm_start=args.warm_start, **arena, **memory)
         print("\nNow watch the trained Kenobi in action:")
-        test(agent, episodes=5, speed=80)
-        game.window.mainloop()
+        run_tests(agent, episodes=test_episodes(5), speed=80)
 
     else:
         # Default: just show the optimal demo
-        show_optimal_demo(episodes=2, speed=100)
-        game.window.mainloop()
+        show_optimal_demo(episodes=2, speed=100, solution=exact_solution(), grid_size=args.grid_size)
+
+    game = load_game(args.grid_size)
+    if game.pacer.closed:
+        game.pacer.close_window()  # closed mid-run - everything's saved, nothing left to show
+        return
+    game.window.mainloop()
+
+
+# Main program - where the training adventure begins!
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+# Trajectory logs for the Security Bot
+# Every move Kenobi ever made, on disk - rewatch or relearn any episode without re-running it!
+"""
+A trajectory log stores whole episodes as frames: where Kenobi and the food
+were, his score, and the action/reward/done that brought him there. Frame 0
+of an episode is the position after reset() (action -1), so an episode with
+n steps has n + 1 frames and every state view can be rebuilt from it.
+
+    with TrajectoryWriter("run.ktj", grid_size=16) as log:
+        env.reset(); log.start(env)
+        _, reward, done = env.step(action); log.step(env, action, reward, done)
+        ...
+        log.end()                        # once per episode
+
+    log = TrajectoryLog("run.ktj")
+    frames = log.episode(1234)           # straight from the index, no re-simulation
+    learn_offline(agent, log, "simple")  # stream the transitions through agent.learn
+
+File layout (little-endian), append-only:
+
+    b"KTRJ" | uint16 version | uint32 header length | JSON header
+    chunks: b"KTRC" | uint32 episode count | uint32 frame count
+            | episode lengths (episode count,) uint32 | frames (frame count,) FRAME_DTYPE
+
+"<log>.idx" holds one (frame byte offset, frame count) uint64 pair per
+episode. Readers rebuild it in memory from the chunk headers if it doesn't
+match the log (e.g. after a crash); a half-written last chunk is ignored, and
+dropped by the next writer, which also rewrites the .idx file.
+
+Usage:
+    python trajectory.py info run.ktj
+    python trajectory.py learn run.ktj --state simple --output offline.qtb
+    python trajectory_viewer.py run.ktj --episode 1234     # the replay window
+"""
+import argparse
+import itertools
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+from grid_env import GRID_SIZE
+from state_encoding import STATE_GETTERS
+
+MAGIC = b"KTRJ"
+CHUNK_MAGIC = b"KTRC"
+VERSION = 1
+DEFAULT_CHUNK_FRAMES = 1 << 16  # ~1 MB of frames per chunk
+
+_PREAMBLE = struct.Struct("<4sHI")  # magic, version, header length
+_CHUNK = struct.Struct("<4sII")     # magic, episode count, frame count
+
+# 16 bytes per frame; uint16 positions and score are plenty for any grid we can draw
+FRAME_DTYPE = np.dtype([
+    ("robot_row", "<u2"),
+    ("robot_col", "<u2"),
+    ("food_row", "<u2"),
+    ("food_col", "<u2"),
+    ("score", "<u2"),
+    ("action", "i1"),     # -1 on the first frame of an episode
+    ("done", "u1"),
+    ("reward", "<f4"),
+])
+
+
+class TrajectoryError(ValueError):
+    """Raised when a trajectory log is not one we can read."""
+
+
+def index_filename(filename):
+    return filename + ".idx"
+
+
+def _read_header(f, filename):
+    preamble = f.read(_PREAMBLE.size)
+    if len(preamble) != _PREAMBLE.size:
+        raise TrajectoryError(f"{filename} is too short to be a trajectory log")
+    magic, version, header_length = _PREAMBLE.unpack(preamble)
+    if magic != MAGIC:
+        raise TrajectoryError(f"{filename} is not a Kenobi trajectory log (magic {magic!r})")
+    if version != VERSION:
+        raise TrajectoryError(f"{filename} has trajectory version {version}, expected {VERSION}")
+    header = json.loads(f.read(header_length).decode("utf-8"))
+    return header, _PREAMBLE.size + header_length
+
+
+def _scan_chunks(f, start, end):
+    """
+    Walk the chunk headers from start. Yields (chunk offset, episode lengths,
+    frames offset) for every complete chunk; stops at a truncated one.
+    """
+    offset = start
+    while offset + _CHUNK.size <= end:
+        f.seek(offset)
+        magic, n_episodes, n_frames = _CHUNK.unpack(f.read(_CHUNK.size))
+        if magic != CHUNK_MAGIC:
+            return
+        frames_offset = offset + _CHUNK.size + 4 * n_episodes
+        chunk_end = frames_offset + n_frames * FRAME_DTYPE.itemsize
+        if chunk_end > end:
+            return
+        lengths = np.frombuffer(f.read(4 * n_episodes), dtype="<u4").astype(np.int64)
+        if lengths.sum() != n_frames:
+            return
+        yield offset, lengths, frames_offset
+        offset = chunk_end
+
+
+def _chunk_index(lengths, frames_offset):
+    """(frame byte offset, frame count) of every episode in one chunk."""
+    starts = frames_offset + np.concatenate(([0], np.cumsum(lengths)[:-1])) * FRAME_DTYPE.itemsize
+    return np.stack((starts, lengths), axis=1).astype(np.uint64)
+
+
+def rebuild_index(filename, write=True):
+    """
+    Re-derive the episode index from the chunk headers (and save it as
+    "<log>.idx" unless write=False). Returns (index, end of the last good chunk).
+    """
+    size = os.path.getsize(filename)
+    with open(filename, "rb") as f:
+        _, data_start = _read_header(f, filename)
+        parts = [_chunk_index(lengths, frames_offset)
+                 for _, lengths, frames_offset in _scan_chunks(f, data_start, size)]
+    index = np.concatenate(parts) if parts else np.zeros((0, 2), dtype=np.uint64)
+    end = _index_end(index, data_start)
+    if not write:
+        return index, end
+    tmp_filename = index_filename(filename) + ".tmp"
+    index.tofile(tmp_filename)
+    os.replace(tmp_filename, index_filename(filename))
+    return index, end
+
+
+def _index_end(index, data_start):
+    if not len(index):
+        return data_start
+    offset, count = index[-1].tolist()
+    return offset + count * FRAME_DTYPE.itemsize
+
+
+def _load_index(filename, data_start):
+    """The episode index, rebuilt first if it's missing or doesn't match the log."""
+    try:
+        index = np.fromfile(index_filename(filename), dtype=np.uint64)
+    except FileNotFoundError:
+        index = None
+    if index is not None and len(index) % 2 == 0:
+        index = index.reshape(-1, 2)
+        # chunks always end on a whole episode, so a good index ends exactly at the end of the file
+        if _index_end(index, data_start) == os.path.getsize(filename):
+            return index
+    # only writers touch the .idx file - one may be appending to it right now
+    return rebuild_index(filename, write=False)[0]
+
+
+class TrajectoryWriter:
+    """
+    Records episodes into a trajectory log (appending if it already exists).
+
+    Frames are gathered as plain tuples and written one chunk at a time, so
+    recording costs an append per step. Use it as a context manager so the
+    last chunk always reaches the disk; an episode still open at close() is dropped.
+    """
+
+    def __init__(self, filename, grid_size=GRID_SIZE, chunk_frames=DEFAULT_CHUNK_FRAMES, meta=None):
+        self.filename = filename
+        self.grid_size = grid_size
+        self.chunk_frames = chunk_frames
+        self._frames = []      # frame tuples of finished episodes waiting for the next chunk
+        self._lengths = []     # ...and their episode lengths
+        self._episode = None   # frames of the episode being recorded
+        if os.path.exists(filename) and os.path.getsize(filename) > 0:
+            self._open_existing()
+        else:
+            self._file = open(filename, "w+b")
+            header = {"grid_size": grid_size, "frame": FRAME_DTYPE.descr, "created": time.time(),
+                      "meta": meta or {}}
+            header_bytes = json.dumps(header).encode("utf-8")
+            self._file.write(_PREAMBLE.pack(MAGIC, VERSION, len(header_bytes)))
+            self._file.write(header_bytes)
+            self._file.flush()
+            self.episodes = 0
+            np.zeros((0, 2), dtype=np.uint64).tofile(index_filename(filename))
+        self._index = open(index_filename(filename), "ab")
+
+    def _open_existing(self):
+        self._file = open(self.filename, "r+b")
+        header, _ = _read_header(self._file, self.filename)
+        if header["grid_size"] != self.grid_size:
+            self._file.close()
+            raise TrajectoryError(f"{self.filename} records a {header['grid_size']}x{header['grid_size']} "
+                                  f"grid, not {self.grid_size}x{self.grid_size}")
+        # always rebuild: it's cheap (chunk headers only) and drops a half-written last chunk
+        index, end = rebuild_index(self.filename)
+        self.episodes = len(index)
+        self._file.seek(end)
+        self._file.truncate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self, env):
+        """Begin an episode at env's current (just reset) position."""
+        self._episode = [(env.robot_row, env.robot_col, env.food_row, env.food_col, env.score, -1, 0, 0.0)]
+
+    def step(self, env, action, reward, done):
+        """Record one step: env is the position after taking action."""
+        self._episode.append((env.robot_row, env.robot_col, env.food_row, env.food_col, env.score,
+                              action, done, reward))
+
+    def end(self):
+        """Finish the current episode."""
+        episode, self._episode = self._episode, None
+        if not episode:
+            return
+        self._frames.extend(episode)
+        self._lengths.append(len(episode))
+        if len(self._frames) >= self.chunk_frames:
+            self.flush()
+
+    def flush(self):
+        """Write the finished episodes as one chunk and index them."""
+        if not self._lengths:
+            return
+        frames = np.array(self._frames, dtype=FRAME_DTYPE)
+        lengths = np.array(self._lengths, dtype="<u4")
+        f = self._file
+        chunk_offset = f.seek(0, os.SEEK_END)
+        f.write(_CHUNK.pack(CHUNK_MAGIC, len(lengths), len(frames)))
+        f.write(lengths.tobytes())
+        f.write(frames.tobytes())
+        f.flush()
+        # the index goes second: if we die in between, readers just rebuild it
+        frames_offset = chunk_offset + _CHUNK.size + lengths.nbytes
+        self._index.write(_chunk_index(lengths.astype(np.int64), frames_offset).tobytes())
+        self._index.flush()
+        self.episodes += len(lengths)
+        self._frames, self._lengths = [], []
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+        self._index.close()
+
+
+def state_views(positions, kind):
+    """(N, 4) robot/food positions -> (N, k) states, exactly as the env's get_*_state would give."""
+    if kind == "full":
+        return positions
+    relative = positions[:, 2:] - positions[:, :2]
+    if kind == "relative":
+        return relative
+    if kind == "simple":
+        return np.sign(relative)
+    raise ValueError(f"unknown state view {kind!r}, expected one of {tuple(STATE_GETTERS)}")
+
+
+def positions(frames):
+    """(N, 4) int64 array of (robot_row, robot_col, food_row, food_col) for some frames."""
+    return np.stack([frames[name].astype(np.int64) for name in ("robot_row", "robot_col", "food_row", "food_col")],
+                    axis=1)
+
+
+class TrajectoryLog:
+    """
+    Read side of a trajectory log. The file is memory-mapped and episodes are
+    found through the index, so episode(n) is a slice, wherever n is.
+    Only what was on disk at open time is visible.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            self.header, self._data_start = _read_header(f, filename)
+        self.grid_size = self.header["grid_size"]
+        self.index = _load_index(filename, self._data_start)
+        self._data = np.memmap(filename, dtype=np.uint8, mode="r") if len(self.index) else None
+
+    def __len__(self):
+        return len(self.index)
+
+    def __repr__(self):
+        return f"TrajectoryLog({self.filename!r}, episodes={len(self)}, frames={self.n_frames})"
+
+    @property
+    def n_frames(self):
+        return int(self.index[:, 1].sum())
+
+    @property
+    def lengths(self):
+        """Frames per episode (steps + 1)."""
+        return self.index[:, 1].astype(np.int64)
+
+    def episode(self, n):
+        """All frames of episode n (negative n counts from the end) as a read-only FRAME_DTYPE array."""
+        if not -len(self) <= n < len(self):
+            raise IndexError(f"episode {n} out of range, the log has {len(self)}")
+        offset, count = self.index[n].tolist()
+        return np.frombuffer(self._data, dtype=FRAME_DTYPE, count=count, offset=offset)
+
+    def scores(self):
+        """Final score of every episode."""
+        if not len(self):
+            return np.zeros(0, dtype=np.int64)
+        last = self.index[:, 0] + (self.index[:, 1] - 1) * FRAME_DTYPE.itemsize
+        offsets = last.astype(np.int64) + FRAME_DTYPE.fields["score"][1]
+        return self._data[offsets[:, None] + np.arange(2)].view("<u2")[:, 0].astype(np.int64)
+
+    def iter_chunks(self, start=0, stop=None):
+        """
+        Stream (episode lengths, frames) one chunk at a time for episodes in
+        [start, stop) - never more than a chunk in memory.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        first = 0  # log episode number of the chunk's first episode
+        with open(self.filename, "rb") as f:
+            end = _index_end(self.index, self._data_start)
+            for _, lengths, frames_offset in _scan_chunks(f, self._data_start, end):
+                last = first + len(lengths)
+                if last > start and first < stop:
+                    lo, hi = max(start - first, 0), min(stop, last) - first
+                    skip = int(lengths[:lo].sum())
+                    count = int(lengths[lo:hi].sum())
+                    frames = np.frombuffer(self._data, dtype=FRAME_DTYPE, count=count,
+                                           offset=frames_offset + skip * FRAME_DTYPE.itemsize)
+                    yield lengths[lo:hi], frames
+                if last >= stop:
+                    return
+                first = last
+
+    def transitions(self, kind="simple", start=0, stop=None):
+        """
+        Stream (states, actions, rewards, next_states, dones) arrays, one
+        chunk at a time, with states in the given view.
+        """
+        for lengths, frames in self.iter_chunks(start, stop):
+            yield _chunk_transitions(lengths, frames, kind)
+
+    def close(self):
+        self._data = None
+
+
+def _chunk_transitions(lengths, frames, kind):
+    """(states, actions, rewards, next_states, dones) of every step in one chunk, in order."""
+    is_step = np.ones(len(frames), dtype=bool)
+    is_step[np.concatenate(([0], np.cumsum(lengths)[:-1]))] = False  # first frames aren't steps
+    steps = np.flatnonzero(is_step)
+    views = state_views(positions(frames), kind)
+    return (views[steps - 1], frames["action"][steps].astype(np.int64),
+            frames["reward"][steps].astype(np.float64), views[steps], frames["done"][steps].astype(bool))
+
+
+def learn_offline(agent, log, state_kind="simple", passes=1, start=0, stop=None):
+    """
+    Q-learning from a log instead of an env: every recorded transition goes
+    through agent.learn, in order. Returns how many updates were made.
+    Traces are reset at every episode start, like train() does - an episode
+    cut off by the step limit must not hand its traces to the next one.
+    """
+    learn = agent.learn
+    reset_traces = agent.reset_traces
+    updates = 0
+    for _ in range(passes):
+        for lengths, frames in log.iter_chunks(start, stop):
+            states, actions, rewards, next_states, dones = _chunk_transitions(lengths, frames, state_kind)
+            transitions = zip(map(tuple, states.tolist()), actions.tolist(), rewards.tolist(),
+                              map(tuple, next_states.tolist()), dones.tolist())
+            for n_steps in (lengths.astype(np.int64) - 1).tolist():  # an episode of n steps has n + 1 frames
+                reset_traces()
+                for state, action, reward, next_state, done in itertools.islice(transitions, n_steps):
+                    learn(state, action, reward, next_state, done)
+            updates += len(actions)
+    return updates
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and learn from Kenobi's trajectory logs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    info = commands.add_parser("info", help="episodes, frames and scores in a log")
+    info.add_argument("log")
+
+    offline = commands.add_parser("learn", help="offline Q-learning from a log")
+    offline.add_argument("log")
+    offline.add_argument("--state", choices=list(STATE_GETTERS), default="simple")
+    offline.add_argument("--passes", type=int, default=1, help="times to go through the log")
+    offline.add_argument("--start", type=int, default=0, help="first episode to learn from")
+    offline.add_argument("--stop", type=int, default=None, help="episode to stop before")
+    offline.add_argument("--max-states", type=int, default=None)
+    offline.add_argument("--output", default="q_table.qtb", help="where to save the learned brain")
+    offline.add_argument("--eval-episodes", type=int, default=200, help="greedy rollouts to score the result")
+    args = parser.parse_args(argv)
+
+    try:
+        log = TrajectoryLog(args.log)
+    except (OSError, TrajectoryError) as exc:
+        parser.exit(1, f"{parser.prog}: {exc}\n")
+
+    if args.command == "info":
+        lengths = log.lengths
+        scores = log.scores()
+        size = os.path.getsize(args.log)
+        print(f"{log!r}: {log.grid_size}x{log.grid_size} grid, {size / 1e6:.1f} MB")
+        if len(log):
+            print(f"  steps/episode {(lengths - 1).mean():.1f} | score avg {scores.mean():.2f} "
+                  f"max {scores.max()} | last 100 avg {scores[-100:].mean():.2f}")
+        return
+
+    from train import make_agent  # only learning needs the agent code
+    from policy import compile_policy, rollout
+    agent = make_agent(args.state, log.grid_size, args.max_states)
+    began = time.perf_counter()
+    updates = learn_offline(agent, log, args.state, args.passes, args.start, args.stop)
+    elapsed = time.perf_counter() - began
+    print(f"{updates:,} offline updates in {elapsed:.2f}s ({updates / max(elapsed, 1e-9):,.0f}/s), "
+          f"{len(agent.q_table)} states")
+    if args.eval_episodes:
+        scores = rollout(compile_policy(agent, args.state, log.grid_size), args.eval_episodes,
+                         kind=args.state, grid_size=log.grid_size)
+        print(f"Greedy policy: avg score {sum(scores) / len(scores):.2f} over {len(scores)} episodes")
+    agent.save(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# Replay viewer for the Security Bot
+# Kenobi's highlight reel - jump to any episode and scrub through it, no re-running needed!
+"""
+Plays back a trajectory log (trajectory.py) in the usual grid window. Every
+frame comes straight from the log, so jumping to episode 1,000,000 is as fast
+as jumping to episode 1, and playback can run forwards or backwards at any speed.
+
+Controls:
+    Space            play / pause
+    Left / Right     one frame back / forward
+    PageUp / Down    previous / next episode
+    Home / End       first / last frame of the episode
+    speed slider     frames per second, negative plays backwards
+
+Usage:
+    python trajectory_viewer.py run.ktj --episode 1234 --speed 20
+"""
+import argparse
+import time
+from collections import namedtuple
+
+import tkinter as tk
+
+from renderer import GridRenderer
+from trajectory import TrajectoryLog, TrajectoryError
+
+ACTION_NAMES = ["UP", "DOWN", "LEFT", "RIGHT"]
+
+MAX_SPEED = 1000      # frames per second either way on the speed slider
+TICK_MS = 30          # how often playback moves the cursor
+MAX_BOARD_PIXELS = 800
+
+# What GridRenderer.draw needs, read from one recorded frame
+ReplayFrame = namedtuple("ReplayFrame", "robot_row robot_col food_row food_col score episode_count last_reward")
+
+
+class ReplayCursor:
+    """
+    A position (episode, frame) in a trajectory log. Moving it only does
+    index arithmetic; the frames of the current episode are one memory-mapped slice.
+    """
+
+    def __init__(self, log, episode=0):
+        if not len(log):
+            raise ValueError(f"{log.filename} has no episodes to replay")
+        self.log = log
+        self.lengths = log.lengths
+        self.episode = 0
+        self.frame = 0
+        self.frames = None
+        self.seek(episode)
+
+    def seek(self, episode, frame=0):
+        """Jump to frame of episode (both clamped; a negative frame counts from the end)."""
+        episode = min(max(episode, 0), len(self.lengths) - 1)
+        if self.frames is None or episode != self.episode:
+            self.frames = self.log.episode(episode)
+        self.episode = episode
+        if frame < 0:
+            frame += len(self.frames)
+        self.frame = min(max(frame, 0), len(self.frames) - 1)
+
+    def move(self, frames):
+        """
+        Step frames forward (or back, if negative), running on into the next
+        (or previous) episodes. Returns False once the start or end of the log stops it.
+        """
+        lengths = self.lengths
+        episode = self.episode
+        target = self.frame + frames
+        while target >= lengths[episode] and episode < len(lengths) - 1:
+            target -= lengths[episode]
+            episode += 1
+        while target < 0 and episode > 0:
+            episode -= 1
+            target += lengths[episode]
+        self.seek(episode, min(max(target, 0), lengths[episode] - 1))
+        return 0 <= target < lengths[episode]
+
+    def current(self):
+        f = self.frames[self.frame]
+        return ReplayFrame(int(f["robot_row"]), int(f["robot_col"]), int(f["food_row"]), int(f["food_col"]),
+                           int(f["score"]), self.episode, float(f["reward"]))
+
+    def action(self):
+        """Name of the action that led to the current frame ("START" on an episode's first frame)."""
+        action = int(self.frames[self.frame]["action"])
+        return ACTION_NAMES[action] if action >= 0 else "START"
+
+    def done(self):
+        return bool(self.frames[self.frame]["done"])
+
+
+class ReplayViewer:
+    """
+    The replay window: the grid drawn by a GridRenderer, a frame slider for
+    scrubbing, a speed slider and an episode box. Playback is an after()
+    loop that moves the cursor by speed * elapsed time, so fast speeds skip
+    frames instead of falling behind.
+    """
+
+    def __init__(self, window, log, episode=0, speed=10.0):
+        self.window = window
+        self.log = log
+        self.cursor = ReplayCursor(log, episode)
+        self.playing = False
+        self._carry = 0.0        # fractional frames owed to the next tick
+        self._last_tick = None
+        self._updating = False   # set while we move the slider ourselves
+
+        grid_size = log.grid_size
+        cell = max(1, min(25, MAX_BOARD_PIXELS // grid_size))
+        board = cell * grid_size
+        window.title(f"Kenobi replay - {log.filename}")
+        canvas = tk.Canvas(window, width=board, height=board + 20, bg="grey")
+        canvas.pack()
+        self.renderer = GridRenderer(canvas, cell, grid_size=grid_size)
+
+        controls = tk.Frame(window)
+        controls.pack()
+        for text, command in (("|<", lambda: self.jump_episode(-1)), ("<", lambda: self.step(-1)),
+                              ("Play", self.toggle), (">", lambda: self.step(1)),
+                              (">|", lambda: self.jump_episode(1))):
+            button = tk.Button(controls, text=text, width=5, command=command)
+            button.pack(side=tk.LEFT)
+            if text == "Play":
+                self.play_button = button
+        tk.Label(controls, text="  Episode:").pack(side=tk.LEFT)
+        self.episode_entry = tk.Entry(controls, width=10)
+        self.episode_entry.pack(side=tk.LEFT)
+        self.episode_entry.bind("<Return>", lambda event: self.go_to_entry())
+        tk.Button(controls, text="Go", command=self.go_to_entry).pack(side=tk.LEFT)
+
+        self.frame_scale = tk.Scale(window, from_=0, to=0, orient=tk.HORIZONTAL, length=max(board, 300),
+                                    label="frame", command=self._on_scrub)
+        self.frame_scale.pack()
+        self.speed_scale = tk.Scale(window, from_=-MAX_SPEED, to=MAX_SPEED, orient=tk.HORIZONTAL,
+                                    length=max(board, 300), label="speed (frames/s, negative = backwards)")
+        self.speed_scale.set(speed)
+        self.speed_scale.pack()
+        self.status = tk.Label(window, text="", font=("Arial", 10))
+        self.status.pack()
+
+        window.bind("<space>", lambda event: self.toggle())
+        window.bind("<Left>", lambda event: self.step(-1))
+        window.bind("<Right>", lambda event: self.step(1))
+        window.bind("<Prior>", lambda event: self.jump_episode(-1))
+        window.bind("<Next>", lambda event: self.jump_episode(1))
+        window.bind("<Home>", lambda event: self.seek(self.cursor.episode, 0))
+        window.bind("<End>", lambda event: self.seek(self.cursor.episode, -1))
+        self.show()
+
+    def show(self):
+        cursor = self.cursor
+        self.renderer.draw(cursor.current())
+        self._updating = True
+        try:
+            self.frame_scale.configure(to=len(cursor.frames) - 1)
+            self.frame_scale.set(cursor.frame)
+            self.status.config(text=f"Episode {cursor.episode + 1:,}/{len(self.log):,} | "
+                                    f"step {cursor.frame}/{len(cursor.frames) - 1} | {cursor.action()}"
+                                    + (" | WALL" if cursor.done() else ""))
+        except tk.TclError:
+            pass  # window was closed
+        finally:
+            self._updating = False
+
+    def seek(self, episode, frame=0):
+        self.cursor.seek(episode, frame)
+        self.show()
+
+    def step(self, frames):
+        self.cursor.move(frames)
+        self.show()
+
+    def jump_episode(self, offset):
+        self.seek(self.cursor.episode + offset)
+
+    def go_to_entry(self):
+        try:
+            episode = int(self.episode_entry.get()) - 1  # the box counts from 1, like the status line
+        except ValueError:
+            return
+        self.seek(episode)
+
+    def _on_scrub(self, value):
+        if not self._updating:
+            self.seek(self.cursor.episode, int(float(value)))
+
+    def toggle(self):
+        self.playing = not self.playing
+        self.play_button.config(text="Pause" if self.playing else "Play")
+        if self.playing:
+            self._carry = 0.0
+            self._last_tick = time.perf_counter()
+            self.window.after(TICK_MS, self._tick)
+
+    def _tick(self):
+        if not self.playing:
+            return
+        now = time.perf_counter()
+        self._carry += self.speed_scale.get() * (now - self._last_tick)
+        self._last_tick = now
+        frames = int(self._carry)  # whole frames only, the rest waits for the next tick
+        if frames:
+            self._carry -= frames
+            if not self.cursor.move(frames):
+                self.toggle()  # ran off the start or end of the log
+            self.show()
+        self.window.after(TICK_MS, self._tick)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay episodes from a trajectory log")
+    parser.add_argument("log")
+    parser.add_argument("--episode", type=int, default=1, help="episode to open at (1 = first, -1 = last)")
+    parser.add_argument("--speed", type=float, default=10.0, help="playback speed in frames per second")
+    parser.add_argument("--play", action="store_true", help="start playing right away")
+    args = parser.parse_args(argv)
+
+    try:
+        log = TrajectoryLog(args.log)
+    except (OSError, TrajectoryError) as exc:
+        parser.exit(1, f"{parser.prog}: {exc}\n")
+    if not len(log):
+        parser.exit(1, f"{parser.prog}: {args.log} has no episodes yet\n")
+    episode = args.episode - 1 if args.episode > 0 else len(log) + args.episode
+    window = tk.Tk()
+    viewer = ReplayViewer(window, log, episode, args.speed)
+    if args.play:
+        viewer.toggle()
+    window.mainloop()
+
+
+if __name__ == "__main__":
+    main()